@@ -4,15 +4,19 @@ such as retrieving the current nguoi_dung,
 validating tokens, and establishing a database session.
 """
 
+from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, Request, WebSocket
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
 
 from config.config import settings
 from config.database.database import AsyncSessionLocal
 from services.auth.security import ALGORITHM
+from services.auth.principal_cache import principal_cache
+from services.auth.token_denylist import DO_LECH_DONG_HO, token_denylist
 from services.crud.nguoi_dung import crud_nguoi_dung
 from schemas.ma_xac_thuc import ThongTinMaSchema
 
@@ -40,40 +44,106 @@ def get_ma_from_websocket(websocket: WebSocket) -> str:
     return auth_header.split(" ")[1]
 
 
+def giai_ma(ma: str) -> ThongTinMaSchema:
+    """
+    Verify a token and return its payload, from the principal cache when it was verified before.
+
+    thoi_gian_het_han is enforced here (tokens issued before the exp claim only carry
+    it), and tokens claiming a lifetime longer than ACCESS_TOKEN_EXPIRE_MINUTES are
+    refused: the token denylist forgets revocations after one lifetime.
+
+    Raises:
+        ExpiredSignatureError: If the token has expired.
+        jwt.JWTError: If the token is invalid.
+        ValidationError: If the payload is malformed.
+    """
+    thong_tin = principal_cache.lay_ma(ma)
+    da_luu = thong_tin is not None
+    if not da_luu:
+        thong_tin = ThongTinMaSchema(**jwt.decode(ma, settings.SECRET_KEY, algorithms=[ALGORITHM]))
+    het_han = thong_tin.thoi_gian_het_han
+    if het_han is None:
+        raise JWTClaimsError("Token has no thoi_gian_het_han")
+    now = datetime.now(het_han.tzinfo)
+    if het_han <= now:
+        raise ExpiredSignatureError("Token has expired")
+    if het_han > now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES, seconds=DO_LECH_DONG_HO):
+        raise JWTClaimsError("Token lifetime exceeds ACCESS_TOKEN_EXPIRE_MINUTES")
+    if not da_luu:
+        principal_cache.luu_ma(ma, thong_tin)
+    return thong_tin
+
+
 def get_thong_tin_ma(ma: str = Depends(get_ma_from_header)) -> ThongTinMaSchema:
     try:
         if ma is None:
             raise HTTPException(status_code=401, detail="Invalid or missing token")
-        thong_tin = jwt.decode(ma, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        return ThongTinMaSchema(**thong_tin)
+        thong_tin = giai_ma(ma)
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
     except (jwt.JWTError, ValidationError):
         raise HTTPException(status_code=403, detail="Could not validate credentials")
+    if token_denylist.da_thu_hoi(thong_tin):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return thong_tin
 
 # websockets
 def get_thong_tin_ma_websocket(ma: str = Depends(get_ma_from_websocket)) -> ThongTinMaSchema:
     try:
         if ma is None:
             return None
-        thong_tin = jwt.decode(ma, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        return ThongTinMaSchema(**thong_tin)
+        thong_tin = giai_ma(ma)
     except (jwt.JWTError, ValidationError):
         return None
+    if token_denylist.da_thu_hoi(thong_tin):
+        return None
+    return thong_tin
+
+
+async def lay_nguoi_dung(session: AsyncSession, nguoi_dung_id: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return the nguoi_dung as a dict without mat_khau_ma_hoa, from the principal cache when possible.
+    """
+    nguoi_dung_dict = principal_cache.lay_nguoi_dung(nguoi_dung_id)
+    if nguoi_dung_dict is None:
+        nguoi_dung = await crud_nguoi_dung.get(session, id=nguoi_dung_id)
+        if nguoi_dung is None:
+            return None
+        nguoi_dung_dict = nguoi_dung.dict()
+        nguoi_dung_dict.pop("mat_khau_ma_hoa")
+        principal_cache.luu_nguoi_dung(nguoi_dung_id, nguoi_dung_dict)
+    return nguoi_dung_dict
+
 
 async def get_nguoi_dung_hien_tai(
     thong_tin_ma_xac_thuc: ThongTinMaSchema = Depends(get_thong_tin_ma),
     session: AsyncSession = Depends(get_session),
 ):
-    print('thong_tin_ma_xac_thuc', thong_tin_ma_xac_thuc)
-    nguoi_dung = await crud_nguoi_dung.get(
-        session, id=thong_tin_ma_xac_thuc.nguoi_dung_id
-    )
+    nguoi_dung = await lay_nguoi_dung(session, thong_tin_ma_xac_thuc.nguoi_dung_id)
     if nguoi_dung is None:
         raise HTTPException(status_code=404, detail="NguoiDung not found")
-    if nguoi_dung.trang_thai != "hoat_dong":
+    if nguoi_dung["trang_thai"] != "hoat_dong":
         raise HTTPException(status_code=400, detail="Inactive nguoi_dung")
-    nguoi_dung_with_out_password = nguoi_dung.dict()
-    nguoi_dung_with_out_password.pop("mat_khau_ma_hoa")
-    return nguoi_dung_with_out_password
+    return nguoi_dung
+
+async def get_nguoi_dung_hien_tai_tuy_chon(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+) -> Optional[Dict[str, Any]]:
+    """
+    The current nguoi_dung on endpoints that also serve anonymous requests; None without a valid token.
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    try:
+        thong_tin_ma_xac_thuc = get_thong_tin_ma(auth_header.split(" ")[1])
+    except HTTPException:
+        return None
+    nguoi_dung = await lay_nguoi_dung(session, thong_tin_ma_xac_thuc.nguoi_dung_id)
+    if nguoi_dung is None or nguoi_dung["trang_thai"] != "hoat_dong":
+        return None
+    return nguoi_dung
 
 # websockets
 async def get_nguoi_dung_hien_tai_websocket(
@@ -82,17 +152,13 @@ async def get_nguoi_dung_hien_tai_websocket(
 ):
     if thong_tin_ma_xac_thuc is None:
         return None
-    nguoi_dung = await crud_nguoi_dung.get(
-        session, id=thong_tin_ma_xac_thuc.nguoi_dung_id
-    )
+    nguoi_dung = await lay_nguoi_dung(session, thong_tin_ma_xac_thuc.nguoi_dung_id)
     
     if nguoi_dung is None:
         return None
-    if nguoi_dung.trang_thai != "hoat_dong":
+    if nguoi_dung["trang_thai"] != "hoat_dong":
         return None
-    nguoi_dung_with_out_password = nguoi_dung.dict()
-    nguoi_dung_with_out_password.pop("mat_khau_ma_hoa")
-    return nguoi_dung_with_out_password
+    return nguoi_dung
 
 async def kiem_tra_quyen_quan_tri(nguoi_dung: dict = Depends(get_nguoi_dung_hien_tai)):
     if nguoi_dung["quyen"] != "quan_tri_vien":
@@ -12,6 +12,7 @@ from api.v1.phong_nghe_nhac import router as phong_nghe_nhac_router
 from api.v1.common_service import router as common_service_router
 from api.v1.websocket import router as websocket_router
 from api.v1.tin_nhan import router as tin_nhan_router
+from api.v1.cong_viec import router as cong_viec_router
 
 
 router = APIRouter(prefix="/v1")
@@ -26,3 +27,4 @@ router.include_router(phong_nghe_nhac_router)
 router.include_router(websocket_router)
 router.include_router(common_service_router)
 router.include_router(tin_nhan_router)
+router.include_router(cong_viec_router)
@@ -41,9 +41,9 @@ async def dang_xuat(
     session: AsyncSession = Depends(get_session),
 ):
     """
-    Endpoint to dang_xuat a nguoi_dung by revoking all active lam_moi tokens.
+    Endpoint to dang_xuat a nguoi_dung by revoking all active lam_moi tokens and access tokens.
     """
-    return await dang_xuat_service(session, thong_tin_ma.nguoi_dung_id)
+    return await dang_xuat_service(session, thong_tin_ma)
 
 
 @router.post("/lam_moi_ma_xac_thuc")
@@ -1,151 +1,114 @@
-from fastapi import APIRouter, Depends, Request, Query, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Response, Query, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-import boto3
 from botocore.exceptions import NoCredentialsError
 import json
-import tempfile
-import os
+from typing import Optional
 from config.config import settings
 from schemas.nguoi_dung import NguoiDungCreate, NguoiDungUpdateDB
 from schemas.bai_hat import BaiHatCreate, BaiHatUpdateDB
-from api.deps import get_session, get_nguoi_dung_hien_tai
+from api.deps import get_session, get_nguoi_dung_hien_tai, get_nguoi_dung_hien_tai_tuy_chon
 from services.crud.nguoi_dung import crud_nguoi_dung
-from services.crud.bai_hat import crud_bai_hat
-from openai import OpenAI
-import openai
+from services.crud.bai_hat import crud_bai_hat, bai_hat_list_spec
+from models.bai_hat import BaiHat
+from services.search.autocomplete import autocomplete_index
+from services.storage.s3 import tai_len_s3, bam_noi_dung, ton_tai_s3, lien_ket_s3
+from services.crud.ket_qua_kiem_duyet import crud_ket_qua_kiem_duyet
+from services.jobs.queue import job_queue
+from services.jobs.bai_hat import KIEM_DUYET_BAI_HAT, ap_dung_ket_qua
 
 bucket_name = settings.BUCKET_NAME
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION_NAME
-)
-
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-async def transcribe_audio(file: UploadFile) -> tuple[str, bool]:
-    """
-    Transcribes audio using OpenAI's Whisper model with the updated API.
-    Returns tuple of (transcription text, success boolean)
-    """
-    temp_file_name = None
-    try:
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_name = temp_file.name
-
-        # Use the OpenAI API to transcribe the audio file
-        with open(temp_file_name, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-            
-        return transcript.text, True
-
-    except openai.RateLimitError:
-        print("OpenAI API quota exceeded")
-        return "", False
-    except openai.APIError as e:
-        print(f"OpenAI API Error: {e}")
-        return "", False
-    except Exception as e:
-        print(f"Error with OpenAI audio transcription: {e}")
-        return "", False
-    finally:
-        # Clean up temporary file
-        if temp_file_name and os.path.exists(temp_file_name):
-            os.unlink(temp_file_name)
-
-async def kiem_duyet_noi_dung(text: str) -> tuple[bool, bool, str]:
-    """
-    Content moderation using OpenAI API
-    Returns tuple of (is_appropriate, success boolean, reason string)
-    """
-    if not text:  # If no text to moderate, consider it appropriate
-        return True, True, ""
-        
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": """You are a content moderator. Evaluate if the content is appropriate.
-                If inappropriate, explain why. Check for:
-                - Offensive language
-                - Hate speech
-                - Explicit content
-                - Violence
-                - Copyright infringement hints
-                Respond in format: 'APPROPRIATE' or 'INAPPROPRIATE: [detailed reason]'"""},
-                {"role": "user", "content": f"Evaluate the following content: {text}"}
-            ]
-        )
-        result = response.choices[0].message.content.strip()
-        print(f"Content moderation result: {result}")
-        
-        is_appropriate = result.upper().startswith("APPROPRIATE")
-        reason = result.split(": ")[1] if ": " in result else ""
-        
-        return is_appropriate, True, reason
-        
-    except openai.RateLimitError:
-        print("OpenAI API quota exceeded during moderation")
-        return True, False, "Moderation service unavailable"
-    except openai.APIError as e:
-        print(f"OpenAI API Error during moderation: {e}")
-        return True, False, f"Moderation service error: {str(e)}"
-    except Exception as e:
-        print(f"Error with content moderation: {e}")
-        return True, False, f"Moderation error: {str(e)}"
-
-
 router = APIRouter(prefix="/bai_hat", tags=["Bai hat"])
 
 @router.get("/tim_kiem")
 async def tim_kiem_bai_hat(
     request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
+    q: Optional[str] = None,
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    nguoi_dung_hien_tai: Optional[dict] = Depends(get_nguoi_dung_hien_tai_tuy_chon),
 ):
     """
-    Endpoint to search for songs by name.
+    Endpoint to search for songs, best matches first.
+
+    q searches the name, artist and lyrics; other query parameters filter a single
+    field (e.g. ten_ca_si). Vietnamese accents are ignored. The cursor of the next
+    page is returned in the X-Next-Cursor header. Songs that are not published yet
+    (or were rejected) are only found by their uploader and admins.
     """
     try:
         filters = {
             key: value
             for key, value in request.query_params.items()
-            if key not in ["offset", "limit"]
+            if key not in ["q", "offset", "limit", "cursor"]
         }
-        print("Filters: ", filters)
-        bai_hats = await crud_bai_hat.search(session, offset=offset, limit=limit, **filters)
+        bai_hats, next_cursor = await crud_bai_hat.tim_kiem(
+            session,
+            crud_bai_hat.dieu_kien_xem(nguoi_dung_hien_tai),
+            q=q,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            **filters,
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         if not bai_hats:
             return []
         return bai_hats
     except Exception as e:
-        print("Error: ", str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/goi_y")
+async def goi_y_bai_hat(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Endpoint to suggest song and artist names while typing, served from memory.
+    """
+    return autocomplete_index.goi_y(q, limit)
+
+
 @router.get("")
 async def xem_danh_sach_bai_hat(
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
+    sap_xep: Optional[str] = None,
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    nguoi_dung_hien_tai: Optional[dict] = Depends(get_nguoi_dung_hien_tai_tuy_chon),
 ):
     """
     Endpoint to get all songs.
+
+    sap_xep is one of ten_bai_hat (default), ten_ca_si, the_loai, thoi_luong, thoi_gian_tao,
+    prefixed with "-" for descending. Filters: the_loai, ten_ca_si, trang_thai, quyen_rieng_tu,
+    thoi_luong_tu, thoi_luong_den, tao_tu, tao_den. The cursor of the next page is returned
+    in the X-Next-Cursor header and is only valid for the same sort and filters.
+    Songs that are not published yet (or were rejected) are only listed for their
+    uploader and admins.
     """
     try:
-        bai_hats = await crud_bai_hat.get_multi(session, offset=offset, limit=limit)
-    
-        # sort by ten_bai_hat a to z
-        bai_hats = sorted(bai_hats, key=lambda x: x.ten_bai_hat)
+        order_by, descending = bai_hat_list_spec.sort(sap_xep)
+        bai_hats, next_cursor = await crud_bai_hat.get_page(
+            session,
+            *bai_hat_list_spec.where(BaiHat, request.query_params),
+            crud_bai_hat.dieu_kien_xem(nguoi_dung_hien_tai),
+            cursor=cursor,
+            offset=offset,
+            limit=limit,
+            order_by=order_by,
+            descending=descending,
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return bai_hats
@@ -154,12 +117,13 @@ async def xem_danh_sach_bai_hat(
 async def xem_chi_tiet_bai_hat(
     id: str,
     session: AsyncSession = Depends(get_session),
+    nguoi_dung_hien_tai: Optional[dict] = Depends(get_nguoi_dung_hien_tai_tuy_chon),
 ):
     """
-    Endpoint to get song details by ID.
+    Endpoint to get song details by ID; unpublished songs only for their uploader and admins.
     """
     bai_hat = await crud_bai_hat.get(session, id=id)
-    if not bai_hat:
+    if not bai_hat or not crud_bai_hat.co_the_xem(bai_hat, nguoi_dung_hien_tai):
         raise HTTPException(status_code=404, detail="Bai hat not found")
     return bai_hat
 
@@ -167,71 +131,54 @@ async def xem_chi_tiet_bai_hat(
 async def tao_bai_hat(
     bai_hat: str,
     file: UploadFile = File(...),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    nguoi_dung_hien_tai: Optional[dict] = Depends(get_nguoi_dung_hien_tai_tuy_chon),
 ):
     """
     Endpoint to create a new song.
+
+    The song is stored as "cho_duyet" and returned right away with the ID of its
+    moderation job (GET /cong_viec/{id}); it becomes "hoat_dong" once the audio has
+    been transcribed and the content approved, or "bi_tu_choi".
+    Audio is stored under the SHA-256 of its content: a file that was uploaded before
+    is not stored again, and if it was already moderated the result is applied at once
+    (no job, cong_viec_id is null).
     """
     try:
-        # Reset file pointer
-        await file.seek(0)
-        
-        # Try transcription, but continue if it fails
-        transcribed_text, transcription_success = await transcribe_audio(file)
-        if not transcription_success:
-            print("Warning: Audio transcription failed, continuing without transcription")
-        else:
-            print(f"Transcribed text: {transcribed_text}")
-            
-        # Content moderation
-        is_appropriate, moderation_success, moderation_reason = await kiem_duyet_noi_dung(transcribed_text)
-        
-        # If moderation was successful and content is inappropriate, block creation
-        if moderation_success and not is_appropriate:
-            raise HTTPException(
-                status_code=400, 
-                detail={
-                    "message": "Nội dung bài hát không phù hợp",
-                    "reason": moderation_reason
-                }
-            )
-        
-        # If moderation failed, log warning but allow creation
-        if not moderation_success:
-            print(f"Warning: Content moderation failed - {moderation_reason}")
-            print("Continuing without moderation")
-            
-        # Rest of the function remains the same...
-        # [Previous code for parsing JSON, creating record, S3 upload, etc.]
-        
         try:
             bai_hat_dict = json.loads(bai_hat)
         except json.JSONDecodeError as e:
             raise HTTPException(status_code=400, detail="Invalid JSON format")
             
-        # Create song record
+        # Dia chi theo noi dung: cung mot tep thi cung mot key tren S3
+        ma_bam = await bam_noi_dung(file.file)
+        
+        # Create song record, public only after moderation
+        bai_hat_dict["trang_thai"] = "cho_duyet"
+        if nguoi_dung_hien_tai is not None:
+            # nguoi tai len duoc xem bai hat cua minh truoc khi duyet
+            bai_hat_dict["nguoi_dung_id"] = nguoi_dung_hien_tai["id"]
+        bai_hat_dict["ma_bam"] = ma_bam
         bai_hat_create = BaiHatCreate(**bai_hat_dict)
         bai_hat_create_db = await crud_bai_hat.create(session, obj_in=bai_hat_create)
         
-        # Reset file pointer for S3 upload
-        await file.seek(0)
-        file_content = await file.read()
-        
-        # Upload to S3
+        # Upload to S3, streamed from the same spooled upload, unless the content is already there
         tail_file = file.filename.split(".")[-1]
-        ten_file = f"{bai_hat_create_db.id}.{tail_file}"
+        ten_file = f"{ma_bam}.{tail_file}"
         
         try:
-            s3_client.put_object(Bucket=bucket_name, Key=ten_file, Body=file_content)
+            if await ton_tai_s3(bucket_name, ten_file):
+                lien_ket = lien_ket_s3(bucket_name, ten_file)
+            else:
+                lien_ket = await tai_len_s3(file.file, bucket_name, ten_file, file.content_type)
         except NoCredentialsError:
-            await crud_bai_hat.remove(session, id=bai_hat_create_db.id)
+            await crud_bai_hat.delete(session, db_obj=bai_hat_create_db)
             raise HTTPException(status_code=500, detail="AWS credentials not available")
         except Exception as e:
-            await crud_bai_hat.remove(session, id=bai_hat_create_db.id)
+            await crud_bai_hat.delete(session, db_obj=bai_hat_create_db)
             raise HTTPException(status_code=500, detail=f"Error uploading to S3: {str(e)}")
             
         # Update song record with S3 link
-        lien_ket = f"https://{bucket_name}.s3-{settings.AWS_REGION_NAME}.amazonaws.com/{ten_file}"
         bai_hat_update_data = BaiHatUpdateDB(lien_ket=lien_ket)
         
         bai_hat_update_db = await crud_bai_hat.update(
@@ -240,7 +187,19 @@ async def tao_bai_hat(
             db_obj=bai_hat_create_db
         )
         
-        await session.commit()
+        # Transcription and moderation run in the background job queue, unless cached
+        cong_viec = None
+        ket_qua_kiem_duyet = await crud_ket_qua_kiem_duyet.get(session, ma_bam=ma_bam)
+        if ket_qua_kiem_duyet is not None:
+            bai_hat_update_db = await ap_dung_ket_qua(session, bai_hat_update_db, ket_qua_kiem_duyet.phu_hop)
+        else:
+            cong_viec = await job_queue.them(
+                session,
+                KIEM_DUYET_BAI_HAT,
+                {"bai_hat_id": str(bai_hat_update_db.id), "bucket": bucket_name, "key": ten_file, "ma_bam": ma_bam},
+            )
+            if cong_viec is None:
+                raise HTTPException(status_code=500, detail="Khong tao duoc cong viec kiem duyet")
         
         response_data = {
             "id": str(bai_hat_update_db.id),
@@ -256,16 +215,9 @@ async def tao_bai_hat(
             "quyen_rieng_tu": bai_hat_update_db.quyen_rieng_tu,
             "thoi_gian_tao": bai_hat_update_db.thoi_gian_tao.isoformat() if bai_hat_update_db.thoi_gian_tao else None,
             "thoi_gian_cap_nhat": bai_hat_update_db.thoi_gian_cap_nhat.isoformat() if bai_hat_update_db.thoi_gian_cap_nhat else None,
-            "nguoi_dung_id": str(bai_hat_update_db.nguoi_dung_id) if bai_hat_update_db.nguoi_dung_id else None
+            "nguoi_dung_id": str(bai_hat_update_db.nguoi_dung_id) if bai_hat_update_db.nguoi_dung_id else None,
+            "cong_viec_id": str(cong_viec.id) if cong_viec else None
         }
-
-        # Add warnings if services failed
-        if not transcription_success or not moderation_success:
-            response_data["warnings"] = []
-            if not transcription_success:
-                response_data["warnings"].append("Audio transcription service unavailable")
-            if not moderation_success:
-                response_data["warnings"].append(f"Content moderation service unavailable: {moderation_reason}")
         
         return response_data
         
@@ -0,0 +1,45 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_session, get_nguoi_dung_hien_tai_tuy_chon
+from schemas.cong_viec import CongViecOut
+from services.crud.bai_hat import crud_bai_hat
+from services.crud.cong_viec import crud_cong_viec
+
+router = APIRouter(prefix="/cong_viec", tags=["Cong viec"])
+
+
+@router.get("/{cong_viec_id}", response_model=CongViecOut)
+async def xem_trang_thai_cong_viec(
+    cong_viec_id: str,
+    nguoi_dung_hien_tai: Optional[dict] = Depends(get_nguoi_dung_hien_tai_tuy_chon),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Endpoint to get the status of a background job (e.g. the moderation of an uploaded song).
+
+    Admins see every job. The job of an uploaded song is visible to its uploader; a
+    song uploaded anonymously has no owner, so, as on POST /bai_hat, anyone holding
+    the cong_viec_id may poll it. Other jobs answer 404, like a missing one.
+    """
+    try:
+        cong_viec = await crud_cong_viec.get(session, id=cong_viec_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not cong_viec:
+        raise HTTPException(status_code=404, detail="Cong viec not found")
+    if nguoi_dung_hien_tai is not None and nguoi_dung_hien_tai.get("quyen") == "quan_tri_vien":
+        return cong_viec
+
+    bai_hat_id = (cong_viec.du_lieu or {}).get("bai_hat_id")
+    bai_hat = await crud_bai_hat.get(session, id=bai_hat_id) if bai_hat_id else None
+    if bai_hat is None:
+        raise HTTPException(status_code=404, detail="Cong viec not found")
+    if bai_hat.nguoi_dung_id is not None and (
+        nguoi_dung_hien_tai is None or str(bai_hat.nguoi_dung_id) != str(nguoi_dung_hien_tai["id"])
+    ):
+        # Khong tiet lo cong viec cua nguoi khac
+        raise HTTPException(status_code=404, detail="Cong viec not found")
+    return cong_viec
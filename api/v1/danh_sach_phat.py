@@ -1,19 +1,21 @@
-from fastapi import APIRouter, Depends, Request, Query, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Response, Query, HTTPException, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 import boto3
 from botocore.exceptions import NoCredentialsError
 import json
+from typing import List, Optional
 
 from config.config import settings
 from schemas.nguoi_dung import NguoiDungCreate, NguoiDungUpdateDB
 from schemas.bai_hat import BaiHatCreate, BaiHatUpdateDB
 from schemas.danh_sach_phat import DanhSachPhatCreate, DanhSachPhatUpdateDB
-from schemas.danh_sach_phat_bai_hat import DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB
+from schemas.danh_sach_phat_bai_hat import DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB, DiChuyenBaiHat, ThaoTacBaiHat
 from api.deps import get_session, get_nguoi_dung_hien_tai
 from services.crud.nguoi_dung import crud_nguoi_dung
-from services.crud.bai_hat import crud_bai_hat
+from services.crud.bai_hat import crud_bai_hat, TRANG_THAI_CONG_KHAI
 from services.crud.danh_sach_phat import crud_danh_sach_phat
 from services.crud.danh_sach_phat_bai_hat import crud_danh_sach_phat_bai_hat
+from models.danh_sach_phat import DanhSachPhat
 
 
 router = APIRouter(prefix="/danh_sach_phat", tags=["Danh sach phat"])
@@ -21,21 +23,23 @@ router = APIRouter(prefix="/danh_sach_phat", tags=["Danh sach phat"])
 
 @router.get("")
 async def xem_danh_sach_phat(
+    response: Response,
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
-    Endpoint to get all playlists.
+    Endpoint to get all playlists, sorted by ten_danh_sach_phat a to z.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     try:
-        danh_sach_phats = await crud_danh_sach_phat.get_multi(session, offset=offset, limit=limit)
-
-        # remove the danh_sach_phat have loai = "phong_nghe_nhac"
-        danh_sach_phats = [dsph for dsph in danh_sach_phats if dsph.loai != "phong_nghe_nhac"]
-        
-        # sort by ten_danh_sach_phat a to z
-        danh_sach_phats = sorted(danh_sach_phats, key=lambda x: x.ten_danh_sach_phat)
+        # bo qua cac danh_sach_phat co loai = "phong_nghe_nhac"
+        danh_sach_phats, next_cursor = await crud_danh_sach_phat.get_page(
+            session, DanhSachPhat.loai != "phong_nghe_nhac", cursor=cursor, offset=offset, limit=limit
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     return danh_sach_phats
@@ -44,24 +48,28 @@ async def xem_danh_sach_phat(
 @router.get("/tim_kiem")
 async def tim_kiem_danh_sach_phat(
     request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
     Endpoint to search for playlists by name.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     filters = {
         key: value
         for key, value in request.query_params.items()
-        if key not in ["offset", "limit"]
+        if key not in ["offset", "limit", "cursor"]
     }
     try:
-        danh_sach_phats = await crud_danh_sach_phat.search(session, offset=offset, limit=limit, **filters)
-        if not danh_sach_phats:
-            return []
-        # remove the danh_sach_phat have loai = "phong_nghe_nhac"
-        danh_sach_phats  = [dsph for dsph in danh_sach_phats if dsph.loai != "phong_nghe_nhac"]
+        # bo qua cac danh_sach_phat co loai = "phong_nghe_nhac"
+        danh_sach_phats, next_cursor = await crud_danh_sach_phat.search_page(
+            session, DanhSachPhat.loai != "phong_nghe_nhac", cursor=cursor, offset=offset, limit=limit, **filters
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return danh_sach_phats
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -69,16 +77,21 @@ async def tim_kiem_danh_sach_phat(
 @router.get("/nguoi_dung")
 async def xem_danh_sach_phat_cua_nguoi_dung(
     loai: str,
+    response: Response,
     nguoi_dung_hien_tai: dict = Depends(get_nguoi_dung_hien_tai),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     session: AsyncSession = Depends(get_session),
 ):
     """
     Endpoint to get playlists of a user.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     try:
-        danh_sach_phats = await crud_danh_sach_phat.get_multi(session, nguoi_dung_id=nguoi_dung_hien_tai.get("id"), loai=loai, offset=offset, limit=limit)
+        danh_sach_phats, next_cursor = await crud_danh_sach_phat.get_page(session, nguoi_dung_id=nguoi_dung_hien_tai.get("id"), loai=loai, cursor=cursor, offset=offset, limit=limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         if not danh_sach_phats:
             return []
     except Exception as e:
@@ -102,35 +115,50 @@ async def xem_chi_tiet_danh_sach_phat(
     return danh_sach_phat
 
 
+async def lay_danh_sach_bai_hat(
+    session: AsyncSession,
+    danh_sach_phat_id: str,
+    sau_id: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    Return the songs of a playlist in order, each with its 1-based position as so_thu_tu.
+
+    Internal helper: without limit the whole playlist is returned, which the
+    websocket room playlist needs. Endpoints must pass a bounded limit.
+    """
+    rows = await crud_danh_sach_phat_bai_hat.get_bai_hats(session, danh_sach_phat_id, sau_id=sau_id, limit=limit)
+
+    danh_sach_bai_hat = []
+    for dsphbh, bai_hat, vi_tri in rows:
+        bai_hat_dict = bai_hat.dict()
+        # so_thu_tu tra ve la vi tri (bat dau tu 1), khong phai khoa sap xep
+        bai_hat_dict["so_thu_tu"] = vi_tri
+        bai_hat_dict["danh_sach_phat_bai_hat_id"] = str(dsphbh.id)
+        danh_sach_bai_hat.append(bai_hat_dict)
+    return danh_sach_bai_hat
+
+
 @router.get("/{id}/bai_hat")
 async def xem_danh_sach_bai_hat_trong_danh_sach_phat(
     id: str,
     session: AsyncSession = Depends(get_session),
+    sau_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
 ):
     """
-    Endpoint to get the songs in a playlist.
+    Endpoint to get the songs in a playlist, one page at a time.
+
+    For the next page pass the danh_sach_phat_bai_hat_id of the last song as sau_id.
     """
     try:
         danh_sach_phat = await crud_danh_sach_phat.get(session, id=id)
         if not danh_sach_phat:
             raise HTTPException(status_code=404, detail="Danh sach phat not found")
         
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=id)
-        if not danh_sach_phat_bai_hat:
-            return []
-        
-        # sort by so_thu_tu
-        danh_sach_phat_bai_hat = sorted(danh_sach_phat_bai_hat, key=lambda x: x.so_thu_tu)
-        
-        danh_sach_bai_hat = []
-        for dsphbh in danh_sach_phat_bai_hat:
-            bai_hat = await crud_bai_hat.get(session, id=dsphbh.bai_hat_id)
-            if bai_hat:
-                bai_hat_dict = bai_hat.dict()
-                bai_hat_dict["so_thu_tu"] = dsphbh.so_thu_tu
-                danh_sach_bai_hat.append(bai_hat_dict)
-                
-        return danh_sach_bai_hat
+        return await lay_danh_sach_bai_hat(session, id, sau_id=sau_id, limit=limit)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -190,12 +218,12 @@ async def them_bai_hat_vao_danh_sach_phat(
             raise HTTPException(status_code=404, detail="Danh sach phat not found")
         
         bai_hat = await crud_bai_hat.get(session, id=bai_hat_id)
-        if not bai_hat:
+        # chi bai hat da duoc duyet moi duoc them vao danh sach phat
+        if not bai_hat or bai_hat.trang_thai != TRANG_THAI_CONG_KHAI:
             raise HTTPException(status_code=404, detail="Bai hat not found")
         
-        # get the number of songs in the playlist
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=danh_sach_phat_id)
-        so_thu_tu = len(danh_sach_phat_bai_hat) + 1
+        # them vao cuoi danh sach
+        so_thu_tu = await crud_danh_sach_phat_bai_hat.next_so_thu_tu(session, danh_sach_phat_id)
         danh_sach_phat_bai_hat_create_data = {
             "danh_sach_phat_id": danh_sach_phat_id,
             "bai_hat_id": bai_hat_id,
@@ -220,58 +248,164 @@ async def cap_nhat_so_thu_tu_cua_bai_hat_trong_danh_sach_phat(
 ):
     """
     Endpoint to update the order of a song in a playlist.
+
+    so_thu_tu_cu and so_thu_tu_moi are 1-based positions; only the moved song is written.
+    A so_thu_tu_moi outside the playlist is clamped to its first or last position.
     """
     try:
         danh_sach_phat = await crud_danh_sach_phat.get(session, id=danh_sach_phat_id)
         if not danh_sach_phat:
             raise HTTPException(status_code=404, detail="Danh sach phat not found")
         
-        bai_hat = await crud_bai_hat.get(session, id=bai_hat_id)
-        if not bai_hat:
-            raise HTTPException(status_code=404, detail="Bai hat not found")
-        
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=danh_sach_phat_id)
-        if not danh_sach_phat_bai_hat:
+        so_thu_tu_cu, so_thu_tu_moi = int(so_thu_tu_cu), int(so_thu_tu_moi)
+        dsphbh = await crud_danh_sach_phat_bai_hat.get_at_position(session, danh_sach_phat_id, so_thu_tu_cu)
+        if not dsphbh or str(dsphbh.bai_hat_id) != str(bai_hat_id):
             raise HTTPException(status_code=404, detail="Bai hat not found in playlist")
         
-        # sort danh_sach_phat_bai_hat by so_thu_tu
-        danh_sach_phat_bai_hat = sorted(danh_sach_phat_bai_hat, key=lambda x: x.so_thu_tu)
-        if so_thu_tu_moi < so_thu_tu_cu:
-            for dsphbh in danh_sach_phat_bai_hat:
-                if dsphbh.so_thu_tu >= so_thu_tu_moi and dsphbh.so_thu_tu <= so_thu_tu_cu:
-                    if dsphbh.so_thu_tu == so_thu_tu_cu:
-                        dsphbh_update = {
-                            "so_thu_tu": so_thu_tu_moi
-                        }
-                        dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                        bai_hat_update_db = await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
-                    else:
-                        dsphbh_update = {
-                            "so_thu_tu": dsphbh.so_thu_tu + 1
-                        }
-                        dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                        await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
-                        print("Updated so_thu_tu: ", dsphbh.so_thu_tu)
-        elif so_thu_tu_moi > so_thu_tu_cu:
-            for dsphbh in danh_sach_phat_bai_hat:
-                if dsphbh.so_thu_tu >= so_thu_tu_cu and dsphbh.so_thu_tu <= so_thu_tu_moi:
-                    if dsphbh.so_thu_tu == so_thu_tu_cu:
-                        dsphbh_update = {
-                            "so_thu_tu": so_thu_tu_moi
-                        }
-                        dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                        bai_hat_update_db = await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
-                    else:
-                        print("Updated so_thu_tu: ", dsphbh.so_thu_tu)
-                        dsphbh_update = {
-                            "so_thu_tu": dsphbh.so_thu_tu - 1
-                        }
-                        dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                        await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
+        # vi tri ngoai danh sach: dua ve dau hoac cuoi danh sach
+        so_luong = await crud_danh_sach_phat_bai_hat.count(session, danh_sach_phat_id)
+        so_thu_tu_moi = max(1, min(so_thu_tu_moi, so_luong))
+        if so_thu_tu_moi != so_thu_tu_cu:
+            # dung ngay sau bai hat dang o vi tri dich (vi tri moi - 1 khi di len)
+            vi_tri_sau = so_thu_tu_moi - 1 if so_thu_tu_moi < so_thu_tu_cu else so_thu_tu_moi
+            sau = await crud_danh_sach_phat_bai_hat.get_at_position(session, danh_sach_phat_id, vi_tri_sau)
+            can_can_bang = await crud_danh_sach_phat_bai_hat.move_after(session, danh_sach_phat_id, dsphbh, sau)
+            await session.commit()
+            if can_can_bang:
+                crud_danh_sach_phat_bai_hat.schedule_rebalance(danh_sach_phat_id)
                     
-        return bai_hat_update_db
+        return {
+            "id": str(dsphbh.id),
+            "bai_hat_id": str(dsphbh.bai_hat_id),
+            "danh_sach_phat_id": str(dsphbh.danh_sach_phat_id),
+            "so_thu_tu": so_thu_tu_moi
+        }
+    except HTTPException:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# di chuyen nhieu bai hat trong danh sach phat
+@router.put("/{danh_sach_phat_id}/thu_tu")
+async def di_chuyen_bai_hat_trong_danh_sach_phat(
+    danh_sach_phat_id: str,
+    di_chuyens: List[DiChuyenBaiHat],
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Endpoint to apply several moves to a playlist in one transaction.
+
+    Each move places a song right after sau_id (or at the top) and writes that row only.
+    Moves are applied in the given order. Returns the first MAX_PAGE_SIZE songs; the
+    rest are paged with GET /{id}/bai_hat.
+    """
+    try:
+        danh_sach_phat = await crud_danh_sach_phat.get(session, id=danh_sach_phat_id)
+        if not danh_sach_phat:
+            raise HTTPException(status_code=404, detail="Danh sach phat not found")
+        
+        rows = await crud_danh_sach_phat_bai_hat.get_many_by_ids(
+            session,
+            [di_chuyen.danh_sach_phat_bai_hat_id for di_chuyen in di_chuyens]
+            + [di_chuyen.sau_id for di_chuyen in di_chuyens],
+        )
+        can_can_bang = False
+        for di_chuyen in di_chuyens:
+            dsphbh = rows.get(str(di_chuyen.danh_sach_phat_bai_hat_id))
+            sau = rows.get(str(di_chuyen.sau_id)) if di_chuyen.sau_id else None
+            if (
+                not dsphbh
+                or str(dsphbh.danh_sach_phat_id) != danh_sach_phat_id
+                or (di_chuyen.sau_id and (not sau or str(sau.danh_sach_phat_id) != danh_sach_phat_id))
+            ):
+                raise HTTPException(status_code=404, detail="Bai hat not found in playlist")
+            if sau is not None and sau.id == dsphbh.id:
+                continue
+            if await crud_danh_sach_phat_bai_hat.move_after(session, danh_sach_phat_id, dsphbh, sau):
+                can_can_bang = True
+        await session.commit()
+        # chi danh lai so thu tu sau khi cac thao tac di chuyen da duoc commit
+        if can_can_bang:
+            crud_danh_sach_phat_bai_hat.schedule_rebalance(danh_sach_phat_id)
+    except HTTPException:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    return await lay_danh_sach_bai_hat(session, danh_sach_phat_id, limit=settings.MAX_PAGE_SIZE)
+
+
+# thay doi nhieu bai hat trong danh sach phat
+@router.patch("/{danh_sach_phat_id}/bai_hat")
+async def thay_doi_bai_hat_trong_danh_sach_phat(
+    danh_sach_phat_id: str,
+    thao_tacs: List[ThaoTacBaiHat],
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Endpoint to add, remove and move songs of a playlist in one transaction.
+
+    Removals run first as one DELETE, additions as one INSERT, then moves in the
+    given order; the keys are renumbered once at the end. Returns the first
+    MAX_PAGE_SIZE songs of the new list; the rest are paged with GET /{id}/bai_hat.
+    """
+    try:
+        danh_sach_phat = await crud_danh_sach_phat.get(session, id=danh_sach_phat_id)
+        if not danh_sach_phat:
+            raise HTTPException(status_code=404, detail="Danh sach phat not found")
+        
+        xoas = [thao_tac for thao_tac in thao_tacs if thao_tac.loai == "xoa"]
+        thems = [thao_tac for thao_tac in thao_tacs if thao_tac.loai == "them"]
+        di_chuyens = [thao_tac for thao_tac in thao_tacs if thao_tac.loai == "di_chuyen"]
+        if any(not thao_tac.danh_sach_phat_bai_hat_id for thao_tac in xoas + di_chuyens) or any(not thao_tac.bai_hat_id for thao_tac in thems):
+            raise HTTPException(status_code=400, detail="Thao tac khong hop le")
+        
+        bai_hats = await crud_bai_hat.get_many_by_ids(session, [thao_tac.bai_hat_id for thao_tac in thems])
+        bai_hats = {id: bai_hat for id, bai_hat in bai_hats.items() if bai_hat.trang_thai == TRANG_THAI_CONG_KHAI}
+        if len(bai_hats) != len({str(thao_tac.bai_hat_id) for thao_tac in thems}):
+            raise HTTPException(status_code=404, detail="Bai hat not found")
+        
+        await crud_danh_sach_phat_bai_hat.delete_many(
+            session, danh_sach_phat_id, [thao_tac.danh_sach_phat_bai_hat_id for thao_tac in xoas]
+        )
+        new_ids = await crud_danh_sach_phat_bai_hat.append_many(
+            session, danh_sach_phat_id, [thao_tac.bai_hat_id for thao_tac in thems]
+        )
+        
+        # bai hat moi co sau_id duoc di chuyen nhu mot thao tac di_chuyen
+        di_chuyens = [
+            (new_id, thao_tac.sau_id) for new_id, thao_tac in zip(new_ids, thems) if thao_tac.sau_id
+        ] + [(thao_tac.danh_sach_phat_bai_hat_id, thao_tac.sau_id) for thao_tac in di_chuyens]
+        rows = await crud_danh_sach_phat_bai_hat.get_many_by_ids(
+            session, [id for id, _ in di_chuyens] + [sau_id for _, sau_id in di_chuyens]
+        )
+        for id, sau_id in di_chuyens:
+            dsphbh = rows.get(str(id))
+            sau = rows.get(str(sau_id)) if sau_id else None
+            if (
+                not dsphbh
+                or str(dsphbh.danh_sach_phat_id) != danh_sach_phat_id
+                or (sau_id and (not sau or str(sau.danh_sach_phat_id) != danh_sach_phat_id))
+            ):
+                raise HTTPException(status_code=404, detail="Bai hat not found in playlist")
+            if sau is not None and sau.id == dsphbh.id:
+                continue
+            await crud_danh_sach_phat_bai_hat.move_after(session, danh_sach_phat_id, dsphbh, sau)
+        
+        if thao_tacs:
+            await crud_danh_sach_phat_bai_hat.rebalance(session, danh_sach_phat_id)
+        await session.commit()
+    except HTTPException:
+        await session.rollback()
+        raise
     except Exception as e:
+        await session.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    return await lay_danh_sach_bai_hat(session, danh_sach_phat_id, limit=settings.MAX_PAGE_SIZE)
 
 
 # xoa bai hat khoi danh sach phat
@@ -283,27 +417,16 @@ async def xoa_bai_hat_khoi_danh_sach_phat(
 ):
     """
     Endpoint to remove a song from a playlist.
+
+    so_thu_tu is the 1-based position; positions are derived on read, so the
+    remaining songs do not need renumbering.
     """
     try:
         danh_sach_phat = await crud_danh_sach_phat.get(session, id=danh_sach_phat_id)
         if not danh_sach_phat:
             raise HTTPException(status_code=404, detail="Danh sach phat not found")
         
-        
-        # cap nhat so thu tu cua cac bai hat con lai
-        danh_sach_phat_bai_hats = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=danh_sach_phat_id)
-        
-        # sort danh_sach_phat_bai_hat by so_thu_tu
-        danh_sach_phat_bai_hats = sorted(danh_sach_phat_bai_hats, key=lambda x: x.so_thu_tu)
-        for dsphbh in danh_sach_phat_bai_hats:
-            if dsphbh.so_thu_tu > so_thu_tu:
-                dsphbh_update = {
-                    "so_thu_tu": dsphbh.so_thu_tu - 1
-                }
-                dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
-        
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get(session, danh_sach_phat_id=danh_sach_phat_id, so_thu_tu=so_thu_tu)
+        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_at_position(session, danh_sach_phat_id, so_thu_tu)
         if not danh_sach_phat_bai_hat:
             raise HTTPException(status_code=404, detail="Bai hat not found in playlist")
         
@@ -329,11 +452,8 @@ async def xoa_danh_sach_phat(
         if not danh_sach_phat:
             raise HTTPException(status_code=404, detail="Danh sach phat not found")
         
-        # xoa tat ca cac da_sach_phat_bai_hat lien quan
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=id)
-        if danh_sach_phat_bai_hat:
-            for dsphbh in danh_sach_phat_bai_hat:
-                await crud_danh_sach_phat_bai_hat.delete(session, db_obj=dsphbh)
+        # xoa tat ca cac da_sach_phat_bai_hat lien quan trong mot cau lenh, commit cung voi danh sach phat
+        await crud_danh_sach_phat_bai_hat.delete_many(session, id)
         
         result = await crud_danh_sach_phat.delete(session, db_obj=danh_sach_phat)
         if not result:
@@ -356,21 +476,7 @@ async def xoa_bai_hat_khoi_danh_sach_phat_ws(
         if not danh_sach_phat:
             return {"message": "Danh sach phat not found"}
         
-        
-        # cap nhat so thu tu cua cac bai hat con lai
-        danh_sach_phat_bai_hats = await crud_danh_sach_phat_bai_hat.get_multi(session, danh_sach_phat_id=danh_sach_phat_id)
-        
-        # sort danh_sach_phat_bai_hat by so_thu_tu
-        danh_sach_phat_bai_hats = sorted(danh_sach_phat_bai_hats, key=lambda x: x.so_thu_tu)
-        for dsphbh in danh_sach_phat_bai_hats:
-            if dsphbh.so_thu_tu > so_thu_tu:
-                dsphbh_update = {
-                    "so_thu_tu": dsphbh.so_thu_tu - 1
-                }
-                dsphbh_update_data = DanhSachPhatBaiHatUpdateDB(**dsphbh_update)
-                await crud_danh_sach_phat_bai_hat.update(session, obj_in=dsphbh_update_data, db_obj=dsphbh)
-        
-        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get(session, danh_sach_phat_id=danh_sach_phat_id, so_thu_tu=so_thu_tu)
+        danh_sach_phat_bai_hat = await crud_danh_sach_phat_bai_hat.get_at_position(session, danh_sach_phat_id, so_thu_tu)
         if not danh_sach_phat_bai_hat:
             return {"message": "Bai hat not found in playlist"}
         
@@ -379,4 +485,4 @@ async def xoa_bai_hat_khoi_danh_sach_phat_ws(
             return {"message": "Failed to remove song from playlist"}
     except Exception as e:
         return {"message": str(e)}
-    return 1
\ No newline at end of file
+    return 1
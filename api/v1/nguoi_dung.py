@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Request, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from schemas.nguoi_dung import NguoiDungCreate, NguoiDungUpdateDB, DoiMatKhau
-from utils.security import xac_thuc_mat_khau
+from utils.security import xac_thuc_mat_khau_async, HashingBusyError
 from api.deps import get_session, get_nguoi_dung_hien_tai
 
 from services.crud.nguoi_dung import crud_nguoi_dung
@@ -38,7 +38,7 @@ async def doi_mat_khau(
         if not nguoi_dung_db:
             raise HTTPException(status_code=404, detail="Nguoi dung khong ton tai")
 
-        if not xac_thuc_mat_khau(plain_password=dmk_data.mat_khau_cu, mat_khau_ma_hoa=nguoi_dung_db.mat_khau_ma_hoa):
+        if not await xac_thuc_mat_khau_async(plain_password=dmk_data.mat_khau_cu, mat_khau_ma_hoa=nguoi_dung_db.mat_khau_ma_hoa):
             raise HTTPException(status_code=400, detail="Sai mat khau cu")
 
         nguoi_dung_update_data = {
@@ -51,6 +51,8 @@ async def doi_mat_khau(
 
         return {"message": "Doi mat khau thanh cong"}
 
+    except HashingBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -96,6 +98,8 @@ async def cap_nhat_thong_tin_ca_nhan(
 
         return nguoi_dung_updated_with_out_password
 
+    except HashingBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
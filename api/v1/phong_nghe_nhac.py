@@ -10,11 +10,13 @@ from schemas.yeu_cau_tham_gia_phong import YeuCauThamGiaPhongCreate, YeuCauThamG
 from api.deps import get_session, get_nguoi_dung_hien_tai
 
 from services.crud.nguoi_dung import crud_nguoi_dung
+from services.crud.loader import BatchLoader
 from services.crud.phong_nghe_nhac import crud_phong_nghe_nhac
 from services.crud.danh_sach_phat import crud_danh_sach_phat
 from services.crud.thanh_vien_phong import crud_thanh_vien_phong
 from services.crud.danh_sach_phat_bai_hat import crud_danh_sach_phat_bai_hat
 from services.crud.yeu_cau_tham_gia_phong import crud_yeu_cau_tham_gia_phong
+from services.websocket.room_state import room_states
 
 router = APIRouter(prefix="/phong_nghe_nhac", tags=["Phong nghe nhac"])
 
@@ -330,11 +332,18 @@ async def xem_yeu_cau_tham_gia_phong(
         
         # add nguoi_dung information to yeu_cau_tham_gia_phongs
         result = []
+        yeu_cau_tham_gia_phongs = [
+            yeu_cau_tham_gia_phong for yeu_cau_tham_gia_phong in yeu_cau_tham_gia_phongs
+            if yeu_cau_tham_gia_phong.trang_thai not in ("chap_nhan", "tu_choi", "da_roi", "da_xoa")
+        ]
+        # tai tat ca nguoi dung trong mot truy van
+        nguoi_dungs = await BatchLoader(crud_nguoi_dung, session).load_many(
+            [yeu_cau_tham_gia_phong.nguoi_dung_id for yeu_cau_tham_gia_phong in yeu_cau_tham_gia_phongs]
+        )
         
-        for yeu_cau_tham_gia_phong in yeu_cau_tham_gia_phongs:
-            if yeu_cau_tham_gia_phong.trang_thai == "chap_nhan" or yeu_cau_tham_gia_phong.trang_thai == "tu_choi" or yeu_cau_tham_gia_phong.trang_thai == "da_roi" or yeu_cau_tham_gia_phong.trang_thai == "da_xoa":
+        for yeu_cau_tham_gia_phong, nguoi_dung in zip(yeu_cau_tham_gia_phongs, nguoi_dungs):
+            if not nguoi_dung:
                 continue
-            nguoi_dung = await crud_nguoi_dung.get(session, id=yeu_cau_tham_gia_phong.nguoi_dung_id)
 
             result.append({
                 "id": str(yeu_cau_tham_gia_phong.id),
@@ -386,6 +395,7 @@ async def cap_nhat_yeu_cau_tham_gia_phong(
                 "quyen": "thanh_vien"
             }
             await crud_thanh_vien_phong.create(session, obj_in=ThanhVienPhongCreate(**thanh_vien_phong_new))
+            room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         
         yeu_cau_tham_gia_phong_updated = await crud_yeu_cau_tham_gia_phong.update(
             session,
@@ -450,6 +460,7 @@ async def cap_nhat_yeu_cau_tham_gia_phong_ws(
                 "quyen": "thanh_vien"
             }
             await crud_thanh_vien_phong.create(session, obj_in=ThanhVienPhongCreate(**thanh_vien_phong_new))
+            room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         
         yeu_cau_tham_gia_phong_updated = await crud_yeu_cau_tham_gia_phong.update(
             session,
@@ -495,8 +506,13 @@ async def xem_thanh_vien_phong(
             raise HTTPException(status_code=400, detail="Ban khong phai la thanh vien cua phong")
         
         result = []
-        for thanh_vien_phong in thanh_vien_phongs:
-            nguoi_dung = await crud_nguoi_dung.get(session, id=thanh_vien_phong.nguoi_dung_id)
+        # tai tat ca nguoi dung trong mot truy van
+        nguoi_dungs = await BatchLoader(crud_nguoi_dung, session).load_many(
+            [thanh_vien_phong.nguoi_dung_id for thanh_vien_phong in thanh_vien_phongs]
+        )
+        for thanh_vien_phong, nguoi_dung in zip(thanh_vien_phongs, nguoi_dungs):
+            if not nguoi_dung:
+                continue
             
             result.append({
                 "id": str(thanh_vien_phong.id),
@@ -548,6 +564,7 @@ async def xoa_thanh_vien_phong(
         
         # Delete the ThanhVienPhong instance
         thanh_vien_phong_deleted = await crud_thanh_vien_phong.delete(session, id=thanh_vien_phong_id)
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         yeu_cau_tham_gia_phong_db = await crud_yeu_cau_tham_gia_phong.get(session, phong_nghe_nhac_id=phong_nghe_nhac.id, nguoi_dung_id=thanh_vien_phong.nguoi_dung_id)
         # cap nhat yeu cau tham gia phong
         yeu_cau_tham_gia_phong = await crud_yeu_cau_tham_gia_phong.update(
@@ -607,6 +624,7 @@ async def xoa_thanh_vien_phong_ws(
         
         # Delete the ThanhVienPhong instance
         thanh_vien_phong_deleted = await crud_thanh_vien_phong.delete(session, id=thanh_vien_phong_id)
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         yeu_cau_tham_gia_phong_db = await crud_yeu_cau_tham_gia_phong.get(session, phong_nghe_nhac_id=phong_nghe_nhac.id, nguoi_dung_id=thanh_vien_phong.nguoi_dung_id)
         # cap nhat yeu cau tham gia phong
         yeu_cau_tham_gia_phong = await crud_yeu_cau_tham_gia_phong.update(
@@ -671,6 +689,7 @@ async def roi_phong(
         
         # Delete the ThanhVienPhong instance
         thanh_vien_phong_deleted = await crud_thanh_vien_phong.delete(session, id=thanh_vien_phong.id)
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac_id)
         
         # cap nhat yeu cau tham gia phong
         yeu_cau_tham_gia_phong_db = await crud_yeu_cau_tham_gia_phong.get(session, phong_nghe_nhac_id=phong_nghe_nhac.id, nguoi_dung_id=nguoi_dung_hien_tai.get("id"))
@@ -738,6 +757,7 @@ async def roi_phong_ws(
         
         # Delete the ThanhVienPhong instance
         thanh_vien_phong_deleted = await crud_thanh_vien_phong.delete(session, id=thanh_vien_phong.id)
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac_id)
         
         # cap nhat yeu cau tham gia phong
         yeu_cau_tham_gia_phong_db = await crud_yeu_cau_tham_gia_phong.get(session, phong_nghe_nhac_id=phong_nghe_nhac.id, nguoi_dung_id=nguoi_dung_id)
@@ -805,6 +825,7 @@ async def cap_nhat_quyen_thanh_vien_phong(
         thanh_vien_phong_updated = await crud_thanh_vien_phong.update(
             session, obj_in=ThanhVienPhongUpdateDB(**thanh_vien_phong_data), db_obj=thanh_vien_phong
         )
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         
         result = {
             "id": str(thanh_vien_phong_updated.id),
@@ -885,6 +906,7 @@ async def cap_nhat_quyen_thanh_vien_phong_ws(
         thanh_vien_phong_updated = await crud_thanh_vien_phong.update(
             session, obj_in=ThanhVienPhongUpdateDB(**thanh_vien_phong_data), db_obj=thanh_vien_phong
         )
+        room_states.danh_dau_thanh_vien_cu(phong_nghe_nhac.id)
         
         result = {
             "id": str(thanh_vien_phong_updated.id),
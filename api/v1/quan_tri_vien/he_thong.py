@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_session, kiem_tra_quyen_quan_tri
+from config.database.database import engine, get_pool_metrics
+from services.auth.don_dep_ma import don_dep_ma_lam_moi
+from services.crud.ma_lam_moi import crud_ma_lam_moi
+from services.websocket.manager import manager as connection_manager
+
+router = APIRouter(prefix="/he_thong", tags=["Quan ly he thong"])
+
+
+@router.get("/co_so_du_lieu")
+async def xem_thong_so_co_so_du_lieu(
+    kiem_tra_quyen: dict = Depends(kiem_tra_quyen_quan_tri),
+):
+    """
+    Endpoint to get connection pool metrics of the current worker.
+    """
+    return get_pool_metrics(engine)
+
+
+@router.get("/websocket")
+async def xem_thong_so_websocket(
+    kiem_tra_quyen: dict = Depends(kiem_tra_quyen_quan_tri),
+):
+    """
+    Endpoint to get per-room websocket fan-out metrics of the current worker.
+    """
+    return connection_manager.get_metrics()
+
+
+@router.get("/ma_lam_moi")
+async def xem_thong_so_ma_lam_moi(
+    kiem_tra_quyen: dict = Depends(kiem_tra_quyen_quan_tri),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Endpoint to get the size of the ma_lam_moi table and the purge metrics of the current worker.
+    """
+    try:
+        thong_ke = await crud_ma_lam_moi.thong_ke(session)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {**thong_ke, **don_dep_ma_lam_moi.get_metrics()}
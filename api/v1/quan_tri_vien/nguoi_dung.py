@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, Request, Query, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request, Response, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config.config import settings
+
 from schemas.nguoi_dung import NguoiDungCreate, NguoiDungUpdateDB
 from api.deps import get_session, kiem_tra_quyen_quan_tri
+from utils.security import HashingBusyError
 
 from services.crud.nguoi_dung import crud_nguoi_dung
 
@@ -11,14 +16,21 @@ router = APIRouter(prefix="/nguoi_dung", tags=["Quan ly nguoi dung"])
 
 @router.get("")
 async def xem_danh_sach_nguoi_dung(
+    response: Response,
     kiem_tra_quyen: dict = Depends(kiem_tra_quyen_quan_tri),
     session: AsyncSession = Depends(get_session),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
     Endpoint to get nguoi_dung information.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     try:
-        result = await crud_nguoi_dung.get_multi(session)
+        result, next_cursor = await crud_nguoi_dung.get_page(session, cursor=cursor, offset=offset, limit=limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return result
     except Exception as e:
         return {"error": str(e)}
@@ -27,26 +39,33 @@ async def xem_danh_sach_nguoi_dung(
 @router.get("/tim_kiem")
 async def tim_kiem_nguoi_dung(
     request: Request,
+    response: Response,
     kiem_tra_quyen: dict = Depends(kiem_tra_quyen_quan_tri),
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
     Endpoint to search for nguoi_dung accounts by name.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     filters = {
         key: value
         for key, value in request.query_params.items()
-        if key not in ["offset", "limit"]
+        if key not in ["offset", "limit", "cursor"]
     }
     try:
-        result = await crud_nguoi_dung.search(
-            session, offset=offset, limit=limit, **filters
+        result, next_cursor = await crud_nguoi_dung.search_page(
+            session, cursor=cursor, offset=offset, limit=limit, **filters
         )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         if not result:
             return []
         return result
+    except HashingBusyError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -118,5 +137,7 @@ async def cap_nhat_nguoi_dung(
         nguoi_dung_updated_with_out_password.pop("mat_khau_ma_hoa")
 
         raise HTTPException(status_code=200, detail="Cap nhat thanh cong")
+    except HashingBusyError:
+        raise
     except Exception as e:
         return {"error": str(e)}
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, Request, Query, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Request, Response, Query, HTTPException, UploadFile, File
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 import boto3
 from botocore.exceptions import NoCredentialsError
@@ -16,6 +17,7 @@ from services.crud.phong_nghe_nhac import crud_phong_nghe_nhac
 from models.tin_nhan import TinNhan
 from schemas.tin_nhan import TinNhanCreate, TinNhanUpdateDB
 from services.crud.tin_nhan import crud_tin_nhan
+from services.crud.base import encode_cursor
 from openai import OpenAI
 import openai
 
@@ -24,13 +26,18 @@ router = APIRouter(prefix="/tin_nhan", tags=["Tin Nhan"])
 @router.get("/phong_nghe_nhac/{phong_nghe_nhac_id}")
 async def xem_tin_nhan(
     phong_nghe_nhac_id: str,
+    response: Response,
     nguoi_dung_hien_tai: NguoiDungCreate = Depends(get_nguoi_dung_hien_tai),
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    truoc_id: Optional[str] = None,
 ):
     """
-    Endpoint to search for songs by name.
+    Endpoint to get the messages of a room, newest first.
+    Pass truoc_id to load the messages older than a given message.
+    The cursor of the next (older) page is returned in the X-Next-Cursor header.
     """
     try:
         phong_nghe_nhac = await crud_phong_nghe_nhac.get(session, id=phong_nghe_nhac_id)
@@ -41,9 +48,19 @@ async def xem_tin_nhan(
         if not thanh_vien_phong:
             raise HTTPException(status_code=403, detail="You are not a member of this room")
         
-        tin_nhans = await crud_tin_nhan.get_multi(
-            session, phong_nghe_nhac_id=phong_nghe_nhac_id, offset=offset, limit=limit
+        if truoc_id and not cursor:
+            # tin nhan moc, cac tin nhan cu hon no se duoc tra ve
+            tin_nhan_moc = await crud_tin_nhan.get(session, id=truoc_id, phong_nghe_nhac_id=phong_nghe_nhac_id)
+            if not tin_nhan_moc:
+                raise HTTPException(status_code=404, detail="Tin nhan not found")
+            cursor = encode_cursor([tin_nhan_moc.thoi_gian_tao, tin_nhan_moc.id])
+
+        tin_nhans, next_cursor = await crud_tin_nhan.get_page(
+            session, phong_nghe_nhac_id=phong_nghe_nhac_id, cursor=cursor, offset=offset, limit=limit,
+            descending=True,
         )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         if not tin_nhans:
             return []
@@ -56,20 +73,26 @@ async def xem_tin_nhan(
 async def tim_kiem_tin_nhan(
     request: Request,
     phong_nghe_nhac_id: str,
+    response: Response,
     nguoi_dung_hien_tai: NguoiDungCreate = Depends(get_nguoi_dung_hien_tai),
     session: AsyncSession = Depends(get_session),
     offset: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
+    limit: int = Query(100, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
 ):
     """
-    Endpoint to search for songs by name.
+    Endpoint to search for messages of a room.
+    q (or a noi_dung filter) is matched with the ranked full-text search, best matches first.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
     try:
         filters = {
             key: value
             for key, value in request.query_params.items()
-            if key not in ["offset", "limit"]
+            if key not in ["offset", "limit", "cursor", "q"]
         }
+        q = q or filters.pop("noi_dung", None)
 
         phong_nghe_nhac = await crud_phong_nghe_nhac.get(session, id=phong_nghe_nhac_id)
         if not phong_nghe_nhac:
@@ -79,12 +102,17 @@ async def tim_kiem_tin_nhan(
         if not thanh_vien_phong:
             raise HTTPException(status_code=403, detail="You are not a member of this room")
         
-        tin_nhans = await crud_tin_nhan.search(
-            session, offset=offset, limit=limit, **filters
-        )
-        
-        # remove tin nhans that are not in the room
-        tin_nhans = [tin_nhan for tin_nhan in tin_nhans if str(tin_nhan.phong_nghe_nhac_id) == phong_nghe_nhac_id]
+        # chi tim trong phong nay
+        if q:
+            tin_nhans, next_cursor = await crud_tin_nhan.tim_kiem(
+                session, phong_nghe_nhac_id, q, offset=offset, limit=limit, cursor=cursor, **filters
+            )
+        else:
+            tin_nhans, next_cursor = await crud_tin_nhan.search_page(
+                session, TinNhan.phong_nghe_nhac_id == phong_nghe_nhac_id, cursor=cursor, offset=offset, limit=limit, **filters
+            )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         
         if not tin_nhans:
             return []
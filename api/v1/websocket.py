@@ -1,6 +1,12 @@
+import logging
+import time
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from typing import List, Dict
 from services.websocket.manager import manager as connection_manager
+from services.websocket.room_state import room_states, doc_so_phat
+from services.websocket.playback_writer import playback_writer
+from services.websocket.chat_writer import chat_writer
 
 from schemas.bai_hat import BaiHatCreate, BaiHatUpdateDB
 from schemas.phong_nghe_nhac import PhongNgheNhacCreate, PhongNgheNhacUpdateDB
@@ -9,7 +15,7 @@ from schemas.thanh_vien_phong import ThanhVienPhongCreate, ThanhVienPhongUpdateD
 from schemas.danh_sach_phat_bai_hat import DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB
 from schemas.tin_nhan import TinNhanCreate, TinNhanUpdateDB
 
-from services.crud.bai_hat import crud_bai_hat
+from services.crud.bai_hat import crud_bai_hat, TRANG_THAI_CONG_KHAI
 from services.crud.nguoi_dung import crud_nguoi_dung
 from services.crud.phong_nghe_nhac import crud_phong_nghe_nhac
 from services.crud.danh_sach_phat import crud_danh_sach_phat
@@ -17,11 +23,66 @@ from services.crud.thanh_vien_phong import crud_thanh_vien_phong
 from services.crud.danh_sach_phat_bai_hat import crud_danh_sach_phat_bai_hat
 from services.crud.tin_nhan import crud_tin_nhan
 from api.deps import get_session, get_nguoi_dung_hien_tai_websocket
-from api.v1.danh_sach_phat import them_bai_hat_vao_danh_sach_phat, cap_nhat_so_thu_tu_cua_bai_hat_trong_danh_sach_phat, xoa_bai_hat_khoi_danh_sach_phat_ws, xem_danh_sach_bai_hat_trong_danh_sach_phat
+from api.v1.danh_sach_phat import them_bai_hat_vao_danh_sach_phat, cap_nhat_so_thu_tu_cua_bai_hat_trong_danh_sach_phat, xoa_bai_hat_khoi_danh_sach_phat_ws, lay_danh_sach_bai_hat
 from api.v1.phong_nghe_nhac import xoa_thanh_vien_phong_ws, roi_phong_ws, cap_nhat_quyen_thanh_vien_phong_ws, yeu_cau_tham_gia_phong_ws, cap_nhat_yeu_cau_tham_gia_phong_ws
 
 router = APIRouter(prefix="/websocket", tags=["WebSocket"])
 
+logger = logging.getLogger(__name__)
+
+
+async def giai_phong_trang_thai_phong(room_id, room_state):
+    """
+    Drop the room state once no connection of the room is left on this worker.
+    """
+    if room_id in connection_manager.active_connections:
+        return
+    if room_state.dong_ho.dang_phat:
+        playback_writer.ghi(room_id, thoi_gian_hien_tai_bai_hat=int(room_state.dong_ho.vi_tri()))
+    await playback_writer.flush(room_id)
+    room_states.xoa(room_id)
+
+
+async def gui_loi(room_id, websocket, loai, thong_bao):
+    """
+    Tell the sender that its event of type loai was rejected.
+    """
+    await connection_manager.send_personal(room_id, websocket, {
+        "type": loai,
+        "action": "loi",
+        "data": {"message": thong_bao}
+    })
+
+
+async def tai_lai_danh_sach_bai_hat(room_state, session):
+    """
+    Reload the room playlist after a change and keep it in the room state.
+    """
+    # phong nghe nhac can ca danh sach phat, khong phan trang
+    danh_sach_phat_bai_hat_data = await lay_danh_sach_bai_hat(session, room_state.danh_sach_phat_id)
+    danh_sach_phat_bai_hat_data_dict = []
+    for bai_hat in danh_sach_phat_bai_hat_data:
+        danh_sach_phat_bai_hat_data_dict.append({
+            "id": str(bai_hat['id']),
+            "ten_bai_hat": bai_hat['ten_bai_hat'],
+            "anh": bai_hat['anh'],
+            "ten_ca_si": bai_hat['ten_ca_si'],
+            "the_loai": bai_hat['the_loai'],
+            "mo_ta": bai_hat['mo_ta'],
+            "loi_bai_hat": bai_hat['loi_bai_hat'],
+            "thoi_luong": bai_hat['thoi_luong'],
+            "lien_ket": bai_hat['lien_ket'],
+            "trang_thai": bai_hat['trang_thai'],
+            "quyen_rieng_tu": bai_hat['quyen_rieng_tu'],
+            "thoi_gian_tao": str(bai_hat['thoi_gian_tao']),
+            "thoi_gian_cap_nhat": str(bai_hat['thoi_gian_cap_nhat']),
+            "thoi_gian_xoa": str(bai_hat['thoi_gian_xoa']),
+            "nguoi_dung_id": str(bai_hat['nguoi_dung_id']) if bai_hat['nguoi_dung_id'] else None,
+            "so_thu_tu": bai_hat['so_thu_tu']
+        })
+    room_state.danh_sach_bai_hat = danh_sach_phat_bai_hat_data_dict
+    return danh_sach_phat_bai_hat_data_dict
+
 @router.websocket("/request_to_join_room/{room_id}")
 async def request_to_join_room(
     websocket: WebSocket,
@@ -75,50 +136,24 @@ async def websocket_endpoint(
         await websocket.close(code=1008)
         return {"message": "Unauthorized"}
 
-    phong_nghe_nhac = await crud_phong_nghe_nhac.get(session, id=room_id)
-    if phong_nghe_nhac is None:
+    room_state = await room_states.lay(session, room_id)
+    if room_state is None:
         await websocket.close()
         return {"message": "Room not found"}
-    
-    phong_nghe_nhac_dict = {
-        "id": str(phong_nghe_nhac.id),
-        "ten_phong": phong_nghe_nhac.ten_phong,
-        "trang_thai_phat": phong_nghe_nhac.trang_thai_phat,
-        "thoi_gian_hien_tai_bai_hat": phong_nghe_nhac.thoi_gian_hien_tai_bai_hat,
-        "so_thu_tu_bai_hat_dang_phat": phong_nghe_nhac.so_thu_tu_bai_hat_dang_phat,
-        "danh_sach_phat_id": str(phong_nghe_nhac.danh_sach_phat_id),
-        "thoi_gian_cap_nhat": str(phong_nghe_nhac.thoi_gian_cap_nhat)
-    }
 
-    danh_sach_phat = await crud_danh_sach_phat.get(session, id=phong_nghe_nhac.danh_sach_phat_id)
-    
-    thanh_vien_phong = await crud_thanh_vien_phong.get(session, phong_nghe_nhac_id=room_id, nguoi_dung_id=nguoi_dung_hien_tai['id'])
+    # danh sach thanh vien co the cu neu nguoi dung vua duoc duyet o worker khac
+    thanh_vien_phong = await room_state.xac_thuc_thanh_vien(session, nguoi_dung_hien_tai['id'])
     if thanh_vien_phong is None:
+        await giai_phong_trang_thai_phong(room_id, room_state)
         await websocket.close()
         return {"message": "Unauthorized"}
+    thanh_vien_phong_id = thanh_vien_phong['id']
     
-    thanh_vien_phong_update_data = {
-        'phong_nghe_nhac_id': room_id,
-        'nguoi_dung_id': nguoi_dung_hien_tai['id'],
-        'trang_thai': 'DangThamGia'
-    }
     # update trang thai thanh Dang Tham Gia
-    await crud_thanh_vien_phong.update(session, db_obj=thanh_vien_phong, obj_in=ThanhVienPhongUpdateDB(**thanh_vien_phong_update_data))
-    
-    tat_ca_thanh_vien = await crud_thanh_vien_phong.get_multi(session, phong_nghe_nhac_id=room_id)
-    # sort cac_thanh_vien_khac theo trang thai
-    tat_ca_thanh_vien = sorted(tat_ca_thanh_vien, key=lambda x: x.trang_thai)
-    tat_ca_thanh_vien_data = []
+    room_state.cap_nhat_thanh_vien(thanh_vien_phong_id, trang_thai='DangThamGia')
+    room_states.luu_trang_thai_thanh_vien(thanh_vien_phong_id, 'DangThamGia')
     
-    for tv in tat_ca_thanh_vien:
-        nguoi_dung = await crud_nguoi_dung.get(session, id=tv.nguoi_dung_id)
-        tat_ca_thanh_vien_data.append({
-            "id": str(tv.id),
-            "ho_ten": nguoi_dung.ten_nguoi_dung,
-            "avatar": nguoi_dung.anh_dai_dien,
-            "trang_thai": tv.trang_thai,
-            "quyen": tv.quyen
-        })
+    tat_ca_thanh_vien_data = room_state.tat_ca_thanh_vien()
     
 
     try:
@@ -130,20 +165,31 @@ async def websocket_endpoint(
                 "action": "tham_gia_phien",
                 "data": {
                     "thanh_vien_vua_tham_gia": {
-                        "id": str(thanh_vien_phong.id),
+                        "id": thanh_vien_phong_id,
                         "ho_ten": nguoi_dung_hien_tai['ten_nguoi_dung'],
                         "avatar": nguoi_dung_hien_tai['anh_dai_dien'],
                         "trang_thai": 'DangThamGia',
-                        "quyen": thanh_vien_phong.quyen
+                        "quyen": thanh_vien_phong['quyen']
                     },
                     "tat_ca_thanh_vien": tat_ca_thanh_vien_data,
-                    "phong_nghe_nhac": phong_nghe_nhac_dict
+                    "phong_nghe_nhac": room_state.thong_tin_phong()
                 }
             },
             room_id
         )
+        # gui lich su tin nhan gan day cho nguoi vua tham gia, lay tu bo nho
+        await connection_manager.send_personal(room_id, websocket, {
+            "type": "tin_nhan",
+            "action": "lich_su_tin_nhan",
+            "data": {
+                "tin_nhans": await room_state.lay_tin_nhan_gan_day(session)
+            }
+        })
         
         while True:
+            # Tra ket noi ve pool truoc khi cho tin tiep theo: socket song lau, khong
+            # duoc giu mot ket noi "idle in transaction" suot phien
+            await session.close()
             # receive data from WebSocket
             data = await websocket.receive_json()
             # switch action
@@ -153,39 +199,22 @@ async def websocket_endpoint(
             if type == 'thanh_vien_phong':
                 if data.get('action') == 'roi_phien':
                     # check if the user is current user
-                    if data.get('data').get('thanh_vien_vua_roi_phien').get('id') == str(thanh_vien_phong.id):
+                    if data.get('data').get('thanh_vien_vua_roi_phien').get('id') == thanh_vien_phong_id:
                         # update trang thai thanh Roi Phien
-                        thanh_vien_phong_update_data = {
-                            'phong_nghe_nhac_id': room_id,
-                            'nguoi_dung_id': nguoi_dung_hien_tai['id'],
-                            'trang_thai': 'HoatDong'
-                        }
-                        await crud_thanh_vien_phong.update(session, db_obj=thanh_vien_phong, obj_in=ThanhVienPhongUpdateDB(**thanh_vien_phong_update_data))
-                        tat_ca_thanh_vien = await crud_thanh_vien_phong.get_multi(session, phong_nghe_nhac_id=room_id)
-                        # sort cac_thanh_vien_khac theo trang thai
-                        tat_ca_thanh_vien = sorted(tat_ca_thanh_vien, key=lambda x: x.trang_thai)
-                        tat_ca_thanh_vien_data = []
-                        
-                        for tv in tat_ca_thanh_vien:
-                            nguoi_dung = await crud_nguoi_dung.get(session, id=tv.nguoi_dung_id)
-                            tat_ca_thanh_vien_data.append({
-                                "id": str(tv.id),
-                                "ho_ten": nguoi_dung.ten_nguoi_dung,
-                                "avatar": nguoi_dung.anh_dai_dien,
-                                "trang_thai": tv.trang_thai,
-                                "quyen": tv.quyen
-                            })
+                        room_state.cap_nhat_thanh_vien(thanh_vien_phong_id, trang_thai='HoatDong')
+                        room_states.luu_trang_thai_thanh_vien(thanh_vien_phong_id, 'HoatDong')
+                        tat_ca_thanh_vien_data = room_state.tat_ca_thanh_vien()
                         # send message to all members in the room
                         await connection_manager.broadcast({
                             "type": "thanh_vien_phong",
                             "action": "thanh_vien_roi_phien",
                             "data": {
                                 "thanh_vien_vua_roi_phien": {
-                                    "id": str(thanh_vien_phong.id),
+                                    "id": thanh_vien_phong_id,
                                     "ho_ten": nguoi_dung_hien_tai['ten_nguoi_dung'],
                                     "avatar": nguoi_dung_hien_tai['anh_dai_dien'],
                                     "trang_thai": 'HoatDong',
-                                    "quyen": thanh_vien_phong.quyen
+                                    "quyen": thanh_vien_phong['quyen']
                                 },
                                 "tat_ca_thanh_vien": tat_ca_thanh_vien_data,
                             }
@@ -199,25 +228,24 @@ async def websocket_endpoint(
             elif type == 'tin_nhan':
                 if data.get('action') == 'gui_tin_nhan':
                     # check if the user is current user
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
-                        tin_nhan_data = {
-                            "noi_dung": data.get('data').get('noi_dung'),
-                            "tin_nhan_tra_loi_id": data.get('data').get('tin_nhan_tra_loi_id') if data.get('data').get('tin_nhan_tra_loi_id') else None,
-                            "thanh_vien_phong_id": thanh_vien_phong.id,
-                            "phong_nghe_nhac_id": room_id
-                        }
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
+                        # id va thoi gian do may chu cap, luu vao DB theo lo o nen
+                        try:
+                            tin_nhan_moi = chat_writer.them(
+                                phong_nghe_nhac_id=room_id,
+                                thanh_vien_phong_id=thanh_vien_phong_id,
+                                noi_dung=data.get('data').get('noi_dung'),
+                                tin_nhan_tra_loi_id=data.get('data').get('tin_nhan_tra_loi_id') if data.get('data').get('tin_nhan_tra_loi_id') else None,
+                            )
+                        except ValueError as e:
+                            await gui_loi(room_id, websocket, 'tin_nhan', str(e))
+                            continue
                         # send message to all members in the room
-                        tin_nhan_created = await crud_tin_nhan.create(session, obj_in=TinNhanCreate(**tin_nhan_data))
+                        room_state.them_tin_nhan(tin_nhan_moi)
                         await connection_manager.broadcast({
                             "type": "tin_nhan",
                             "action": "nhan_tin_nhan",
-                            "data": {
-                                "thanh_vien_phong_id": str(thanh_vien_phong.id),
-                                "noi_dung": data.get('data').get('noi_dung'),
-                                "tin_nhan_tra_loi_id": data.get('data').get('tin_nhan_tra_loi_id') if data.get('data').get('tin_nhan_tra_loi_id') else None,
-                                "thoi_gian_tao": str(tin_nhan_created.thoi_gian_tao),
-                                "phong_nghe_nhac_id": room_id
-                            }
+                            "data": tin_nhan_moi
                         }, room_id)
 
                     else:
@@ -225,32 +253,13 @@ async def websocket_endpoint(
                 pass
             elif type == 'danh_sach_phat':
                 if data.get('action') == 'them_bai_hat':
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
                         bai_hat = await crud_bai_hat.get(session, id=data.get('data').get('bai_hat_id'))
+                        if bai_hat is None or bai_hat.trang_thai != TRANG_THAI_CONG_KHAI:
+                            continue
 
-                        await them_bai_hat_vao_danh_sach_phat(str(danh_sach_phat.id), str(bai_hat.id), session)
-                        danh_sach_phat_bai_hat_data = await xem_danh_sach_bai_hat_trong_danh_sach_phat(str(danh_sach_phat.id), session)
-                        
-                        danh_sach_phat_bai_hat_data_dict = []
-                        for bai_hat in danh_sach_phat_bai_hat_data:
-                            danh_sach_phat_bai_hat_data_dict.append({
-                                "id": str(bai_hat['id']),
-                                "ten_bai_hat": bai_hat['ten_bai_hat'],
-                                "anh": bai_hat['anh'],
-                                "ten_ca_si": bai_hat['ten_ca_si'],
-                                "the_loai": bai_hat['the_loai'],
-                                "mo_ta": bai_hat['mo_ta'],
-                                "loi_bai_hat": bai_hat['loi_bai_hat'],
-                                "thoi_luong": bai_hat['thoi_luong'],
-                                "lien_ket": bai_hat['lien_ket'],
-                                "trang_thai": bai_hat['trang_thai'],
-                                "quyen_rieng_tu": bai_hat['quyen_rieng_tu'],
-                                "thoi_gian_tao": str(bai_hat['thoi_gian_tao']),
-                                "thoi_gian_cap_nhat": str(bai_hat['thoi_gian_cap_nhat']),
-                                "thoi_gian_xoa": str(bai_hat['thoi_gian_xoa']),
-                                "nguoi_dung_id": bai_hat['nguoi_dung_id'],
-                                "so_thu_tu": bai_hat['so_thu_tu']
-                            })
+                        await them_bai_hat_vao_danh_sach_phat(room_state.danh_sach_phat_id, str(bai_hat.id), session)
+                        danh_sach_phat_bai_hat_data_dict = await tai_lai_danh_sach_bai_hat(room_state, session)
                         # send message to all members in the room
                         await connection_manager.broadcast({
                             "type": "danh_sach_phat",
@@ -260,31 +269,10 @@ async def websocket_endpoint(
                             }
                         }, room_id)
                 elif data.get('action') == 'xoa_bai_hat':
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
-                        rs = await xoa_bai_hat_khoi_danh_sach_phat_ws(str(danh_sach_phat.id), int(data.get('data').get('so_thu_tu')), session)
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
+                        rs = await xoa_bai_hat_khoi_danh_sach_phat_ws(room_state.danh_sach_phat_id, int(data.get('data').get('so_thu_tu')), session)
                         if rs == 1:
-                            danh_sach_phat_bai_hat_data = await xem_danh_sach_bai_hat_trong_danh_sach_phat(str(danh_sach_phat.id), session)
-                            # send message to all members in the room
-                            danh_sach_phat_bai_hat_data_dict = []
-                            for bai_hat in danh_sach_phat_bai_hat_data:
-                                danh_sach_phat_bai_hat_data_dict.append({
-                                    "id": str(bai_hat['id']),
-                                    "ten_bai_hat": bai_hat['ten_bai_hat'],
-                                    "anh": bai_hat['anh'],
-                                    "ten_ca_si": bai_hat['ten_ca_si'],
-                                    "the_loai": bai_hat['the_loai'],
-                                    "mo_ta": bai_hat['mo_ta'],
-                                    "loi_bai_hat": bai_hat['loi_bai_hat'],
-                                    "thoi_luong": bai_hat['thoi_luong'],
-                                    "lien_ket": bai_hat['lien_ket'],
-                                    "trang_thai": bai_hat['trang_thai'],
-                                    "quyen_rieng_tu": bai_hat['quyen_rieng_tu'],
-                                    "thoi_gian_tao": str(bai_hat['thoi_gian_tao']),
-                                    "thoi_gian_cap_nhat": str(bai_hat['thoi_gian_cap_nhat']),
-                                    "thoi_gian_xoa": str(bai_hat['thoi_gian_xoa']),
-                                    "nguoi_dung_id": bai_hat['nguoi_dung_id'],
-                                    "so_thu_tu": bai_hat['so_thu_tu']
-                                })
+                            danh_sach_phat_bai_hat_data_dict = await tai_lai_danh_sach_bai_hat(room_state, session)
                             await connection_manager.broadcast({
                                 "type": "danh_sach_phat",
                                 "action": "cap_nhat_danh_sach_phat",
@@ -293,30 +281,9 @@ async def websocket_endpoint(
                                 }
                             }, room_id)
                 elif data.get('action') == 'cap_nhat_so_thu_tu':
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
-                        await cap_nhat_so_thu_tu_cua_bai_hat_trong_danh_sach_phat(str(danh_sach_phat.id), str(data.get('data').get('bai_hat_id')), (data.get('data').get('so_thu_tu_cu')), int(data.get('data').get('so_thu_tu_moi')), session)
-                        danh_sach_phat_bai_hat_data = await xem_danh_sach_bai_hat_trong_danh_sach_phat(str(danh_sach_phat.id), session)
-                        # send message to all members in the room
-                        danh_sach_phat_bai_hat_data_dict = []
-                        for bai_hat in danh_sach_phat_bai_hat_data:
-                            danh_sach_phat_bai_hat_data_dict.append({
-                                "id": str(bai_hat['id']),
-                                "ten_bai_hat": bai_hat['ten_bai_hat'],
-                                "anh": bai_hat['anh'],
-                                "ten_ca_si": bai_hat['ten_ca_si'],
-                                "the_loai": bai_hat['the_loai'],
-                                "mo_ta": bai_hat['mo_ta'],
-                                "loi_bai_hat": bai_hat['loi_bai_hat'],
-                                "thoi_luong": bai_hat['thoi_luong'],
-                                "lien_ket": bai_hat['lien_ket'],
-                                "trang_thai": bai_hat['trang_thai'],
-                                "quyen_rieng_tu": bai_hat['quyen_rieng_tu'],
-                                "thoi_gian_tao": str(bai_hat['thoi_gian_tao']),
-                                "thoi_gian_cap_nhat": str(bai_hat['thoi_gian_cap_nhat']),
-                                "thoi_gian_xoa": str(bai_hat['thoi_gian_xoa']),
-                                "nguoi_dung_id": bai_hat['nguoi_dung_id'],
-                                "so_thu_tu": bai_hat['so_thu_tu']
-                            })
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
+                        await cap_nhat_so_thu_tu_cua_bai_hat_trong_danh_sach_phat(room_state.danh_sach_phat_id, str(data.get('data').get('bai_hat_id')), (data.get('data').get('so_thu_tu_cu')), int(data.get('data').get('so_thu_tu_moi')), session)
+                        danh_sach_phat_bai_hat_data_dict = await tai_lai_danh_sach_bai_hat(room_state, session)
                         await connection_manager.broadcast({
                             "type": "danh_sach_phat",
                             "action": "cap_nhat_danh_sach_phat",
@@ -326,52 +293,89 @@ async def websocket_endpoint(
                         }, room_id)
             elif type == 'trang_thai_phat':
                 if data.get('action') == 'phat_bai_hat':
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
+                        try:
+                            thoi_gian_bat_dau = doc_so_phat(data.get('data').get('thoi_gian_bat_dau'), 0.0)
+                            toc_do = doc_so_phat(data.get('data').get('toc_do'), 1.0, la_toc_do=True)
+                        except ValueError as e:
+                            await gui_loi(room_id, websocket, 'trang_thai_phat', str(e))
+                            continue
                         # send message to all members in the room
                         await connection_manager.broadcast({
                             "type": "trang_thai_phat",
                             "action": "cap_nhat_trang_thai_phat",
                             "data": {
-                                "thanh_vien_phong_id": str(thanh_vien_phong.id),
+                                "thanh_vien_phong_id": thanh_vien_phong_id,
                                 "trang_thai_phat": 'DangPhat',
                                 "bai_hat_id": data.get('data').get('bai_hat_id'),
                                 "so_thu_tu": data.get('data').get('so_thu_tu'),
-                                "thoi_gian_bat_dau": data.get('data').get('thoi_gian_bat_dau')
+                                "thoi_gian_bat_dau": thoi_gian_bat_dau,
+                                "toc_do": toc_do,
+                                "thoi_gian_may_chu": time.time()
                             }
                         }, room_id)
                         
+                        # dong ho cua may chu la nguon su that ve vi tri phat
+                        room_state.phat(
+                            data.get('data').get('so_thu_tu'),
+                            data.get('data').get('bai_hat_id'),
+                            thoi_gian_bat_dau,
+                            toc_do
+                        )
                         phong_nghe_nhac_update_data = {
                             'trang_thai_phat': 'DangPhat',
-                            'thoi_gian_hien_tai_bai_hat': data.get('data').get('thoi_gian_bat_dau'),
+                            'thoi_gian_hien_tai_bai_hat': int(room_state.dong_ho.vi_tri_goc),
                             'so_thu_tu_bai_hat_dang_phat': data.get('data').get('so_thu_tu')
                         }
-                        await crud_phong_nghe_nhac.update(session, db_obj=phong_nghe_nhac, obj_in=PhongNgheNhacUpdateDB(**phong_nghe_nhac_update_data))
+                        phong_nghe_nhac_update_data = PhongNgheNhacUpdateDB(**phong_nghe_nhac_update_data).dict(exclude_unset=True)
+                        playback_writer.ghi(room_id, **phong_nghe_nhac_update_data)
                 elif data.get('action') == 'dung_phat':
-                    if data.get('data').get('thanh_vien_phong_id') == str(thanh_vien_phong.id):
+                    if data.get('data').get('thanh_vien_phong_id') == thanh_vien_phong_id:
+                        try:
+                            thoi_gian_ket_thuc = doc_so_phat(data.get('data').get('thoi_gian_ket_thuc'), None)
+                        except ValueError as e:
+                            await gui_loi(room_id, websocket, 'trang_thai_phat', str(e))
+                            continue
                         # send message to all members in the room
                         await connection_manager.broadcast({
                             "type": "trang_thai_phat",
                             "action": "cap_nhat_trang_thai_phat",
                             "data": {
-                                "thanh_vien_phong_id": str(thanh_vien_phong.id),
+                                "thanh_vien_phong_id": thanh_vien_phong_id,
                                 "trang_thai_phat": 'DungPhat',
                                 "bai_hat_id": data.get('data').get('bai_hat_id'),
                                 "so_thu_tu": data.get('data').get('so_thu_tu'),
-                                "thoi_gian_ket_thuc": data.get('data').get('thoi_gian_ket_thuc')
+                                "thoi_gian_ket_thuc": thoi_gian_ket_thuc,
+                                "thoi_gian_may_chu": time.time()
                             }
                         }, room_id)
                         
+                        room_state.dung(
+                            data.get('data').get('so_thu_tu'),
+                            data.get('data').get('bai_hat_id'),
+                            thoi_gian_ket_thuc
+                        )
                         phong_nghe_nhac_update_data = {
                             'trang_thai_phat': 'DungPhat',
-                            'thoi_gian_hien_tai_bai_hat': data.get('data').get('thoi_gian_ket_thuc'),
+                            'thoi_gian_hien_tai_bai_hat': int(room_state.dong_ho.vi_tri_goc),
                             'so_thu_tu_bai_hat_dang_phat': data.get('data').get('so_thu_tu')
                         }
-                        await crud_phong_nghe_nhac.update(session, db_obj=phong_nghe_nhac, obj_in=PhongNgheNhacUpdateDB(**phong_nghe_nhac_update_data))
+                        phong_nghe_nhac_update_data = PhongNgheNhacUpdateDB(**phong_nghe_nhac_update_data).dict(exclude_unset=True)
+                        playback_writer.ghi(room_id, **phong_nghe_nhac_update_data)
+                elif data.get('action') == 'lay_vi_tri_phat':
+                    # tra ve vi tri hien tai theo dong ho cua may chu
+                    await connection_manager.send_personal(room_id, websocket, {
+                        "type": "trang_thai_phat",
+                        "action": "dong_bo",
+                        "data": room_state.dong_ho.dict()
+                    })
                 pass
             elif type == 'yeu_cau_tham_gia_phong':
                 if data.get('action') == 'xu_ly_yeu_cau_tham_gia_phong':
                     
                     result = await cap_nhat_yeu_cau_tham_gia_phong_ws(str(nguoi_dung_hien_tai['id']), data.get('data').get('yeu_cau_tham_gia_phong_id'), data.get('data').get('trang_thai'), session)
+                    # thanh vien moi co the vua duoc them vao phong
+                    room_state.danh_dau_thanh_vien_cu()
                     
                     await connection_manager.broadcast({
                         "type": "yeu_cau_tham_gia_phong",
@@ -388,12 +392,13 @@ async def websocket_endpoint(
                     result = await cap_nhat_quyen_thanh_vien_phong_ws(str(nguoi_dung_hien_tai['id']), data.get('data').get('thanh_vien_phong_id'), data.get('data').get('quyen_moi'), session)
 
                     if result['success']:
+                        room_state.cap_nhat_thanh_vien(data.get('data').get('thanh_vien_phong_id'), quyen=result['data']['quyen'])
                         await connection_manager.broadcast({
                             "type": "cap_nhat_quyen_thanh_vien",
                             "action": "quyen_thanh_vien_da_duoc_cap_nhat",
                             "data": {
                                 "thanh_vien_phong_id": data.get('data').get('thanh_vien_phong_id'),
-                                "quyen_moi": result['message']['data']['quyen']
+                                "quyen_moi": result['data']['quyen']
                             }
                         }, room_id)
                     pass
@@ -402,29 +407,19 @@ async def websocket_endpoint(
                     result = await roi_phong_ws(str(nguoi_dung_hien_tai['id']), room_id, session)
                     
                     if result['success']:
-                        tat_ca_thanh_vien = await crud_thanh_vien_phong.get_multi(session, phong_nghe_nhac_id=room_id)
-                        # sort cac_thanh_vien_khac theo trang thai
-                        tat_ca_thanh_vien = sorted(tat_ca_thanh_vien, key=lambda x: x.trang_thai)
-                        tat_ca_thanh_vien_data = []
-                        
-                        for tv in tat_ca_thanh_vien:
-                            nguoi_dung = await crud_nguoi_dung.get(session, id=tv.nguoi_dung_id)
-                            tat_ca_thanh_vien_data.append({
-                                "id": str(tv.id),
-                                "ho_ten": nguoi_dung.ten_nguoi_dung,
-                                "avatar": nguoi_dung.anh_dai_dien,
-                                "trang_thai": tv.trang_thai,
-                                "quyen": tv.quyen
-                            })
+                        # chu phong co the da duoc chuyen cho thanh vien khac, tai lai thanh vien
+                        room_state.danh_dau_thanh_vien_cu()
+                        await room_state.lay_thanh_viens(session)
+                        tat_ca_thanh_vien_data = room_state.tat_ca_thanh_vien()
                         await connection_manager.broadcast({
                             "type": "roi_phong",
                             "action": "thanh_vien_roi_phong",
                             "data": {
                                 "thanh_vien_vua_roi_phong": {
-                                    "id": str(thanh_vien_phong.id),
+                                    "id": thanh_vien_phong_id,
                                     "ho_ten": nguoi_dung_hien_tai['ten_nguoi_dung'],
                                     "avatar": nguoi_dung_hien_tai['anh_dai_dien'],
-                                    "quyen": thanh_vien_phong.quyen
+                                    "quyen": thanh_vien_phong['quyen']
                                 },
                                 "tat_ca_thanh_vien": tat_ca_thanh_vien_data
                             }
@@ -436,20 +431,8 @@ async def websocket_endpoint(
                     result = await xoa_thanh_vien_phong_ws(str(nguoi_dung_hien_tai['id']), data.get('data').get('thanh_vien_phong_id'), session)
                     
                     if result['success']:
-                        tat_ca_thanh_vien = await crud_thanh_vien_phong.get_multi(session, phong_nghe_nhac_id=room_id)
-                        # sort cac_thanh_vien_khac theo trang thai
-                        tat_ca_thanh_vien = sorted(tat_ca_thanh_vien, key=lambda x: x.trang_thai)
-                        tat_ca_thanh_vien_data = []
-                        
-                        for tv in tat_ca_thanh_vien:
-                            nguoi_dung = await crud_nguoi_dung.get(session, id=tv.nguoi_dung_id)
-                            tat_ca_thanh_vien_data.append({
-                                "id": str(tv.id),
-                                "ho_ten": nguoi_dung.ten_nguoi_dung,
-                                "avatar": nguoi_dung.anh_dai_dien,
-                                "trang_thai": tv.trang_thai,
-                                "quyen": tv.quyen
-                            })
+                        room_state.xoa_thanh_vien(data.get('data').get('thanh_vien_phong_id'))
+                        tat_ca_thanh_vien_data = room_state.tat_ca_thanh_vien()
                         await connection_manager.broadcast({
                             "type": "xoa_thanh_vien_phong",
                             "action": "thanh_vien_da_bi_xoa",
@@ -465,29 +448,37 @@ async def websocket_endpoint(
                 await connection_manager.broadcast(data, room_id)
                     
     except WebSocketDisconnect:
-        connection_manager.broadcast(
-            {
-                "type": "thanh_vien_phong",
-                "action": "roi_phien",
-                "data": {
-                    "thanh_vien_vua_roi_phien": {
-                        "id": str(thanh_vien_phong.id),
-                        "ho_ten": nguoi_dung_hien_tai['ten_nguoi_dung'],
-                        "avatar": nguoi_dung_hien_tai['anh_dai_dien'],
-                        "trang_thai": 'HoatDong',
-                        "quyen": thanh_vien_phong.quyen
+        pass
+    except Exception as e:
+        logger.error("Unexpected error in websocket of room %s: %s", room_id, e)
+    finally:
+        try:
+            await connection_manager.broadcast(
+                {
+                    "type": "thanh_vien_phong",
+                    "action": "roi_phien",
+                    "data": {
+                        "thanh_vien_vua_roi_phien": {
+                            "id": thanh_vien_phong_id,
+                            "ho_ten": nguoi_dung_hien_tai['ten_nguoi_dung'],
+                            "avatar": nguoi_dung_hien_tai['anh_dai_dien'],
+                            "trang_thai": 'HoatDong',
+                            "quyen": thanh_vien_phong['quyen']
+                        }
                     }
-                }
-            }, room_id
-        )
-        
+                }, room_id
+            )
+        except Exception as e:
+            logger.error("Error while broadcasting roi_phien: %s", e)
+
         await connection_manager.disconnect(room_id, websocket)
         # update trang thai thanh Hoat Dong
-        thanh_vien_phong_update_data = {
-            'phong_nghe_nhac_id': room_id,
-            'nguoi_dung_id': nguoi_dung_hien_tai['id'],
-            'trang_thai': 'HoatDong'
-        }
-        await crud_thanh_vien_phong.update(session, db_obj=thanh_vien_phong, obj_in=ThanhVienPhongUpdateDB(**thanh_vien_phong_update_data))
-        await websocket.close()
-        
\ No newline at end of file
+        room_state.cap_nhat_thanh_vien(thanh_vien_phong_id, trang_thai='HoatDong')
+        room_states.luu_trang_thai_thanh_vien(thanh_vien_phong_id, 'HoatDong')
+        # giai phong trang thai phong khi khong con ai ket noi tren worker nay
+        await giai_phong_trang_thai_phong(room_id, room_state)
+        try:
+            await websocket.close()
+        except Exception:
+            # socket da dong tu phia client
+            pass
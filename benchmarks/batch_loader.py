@@ -0,0 +1,80 @@
+"""
+Batch-loader benchmark: hydrating room members one query per row vs. BatchLoader.
+
+For each size in --sizes, synthetic nguoi_dung rows are inserted and loaded
+back the way the member and join-request listings do it, first with one
+crud_nguoi_dung.get per row (the behaviour before BatchLoader), then with
+BatchLoader.load_many (one IN query). Everything runs in a transaction that is
+rolled back, so the database is left unchanged.
+
+Needs the PostgreSQL configured in .env. Run from the repository root:
+
+    python -m benchmarks.batch_loader --sizes 10 100 1000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List
+from uuid import uuid4
+
+from config.database.database import AsyncSessionLocal, engine
+from models.nguoi_dung import NguoiDung
+from services.crud.loader import BatchLoader
+from services.crud.nguoi_dung import crud_nguoi_dung
+
+
+async def _do(ham: Callable[[], Awaitable[None]], lap: int) -> List[float]:
+    thoi_gian = []
+    for _ in range(lap):
+        bat_dau = time.perf_counter()
+        await ham()
+        thoi_gian.append((time.perf_counter() - bat_dau) * 1000)
+    return thoi_gian
+
+
+async def chay(sizes: List[int], lap: int) -> None:
+    async with AsyncSessionLocal() as session:
+        nguoi_dungs = [
+            NguoiDung(ten_nguoi_dung=f"bench_{i}", email=f"bench_{uuid4().hex}@jamcircle.com")
+            for i in range(max(sizes))
+        ]
+        session.add_all(nguoi_dungs)
+        await session.flush()
+        ids = [nguoi_dung.id for nguoi_dung in nguoi_dungs]
+        try:
+            print(f"{'members':>8} {'per-row p50':>12} {'batch p50':>10} {'speedup':>8}")
+            for size in sizes:
+                ids_phong = ids[:size]
+
+                async def tung_dong() -> None:
+                    session.expunge_all()
+                    for id in ids_phong:
+                        await crud_nguoi_dung.get(session, id=id)
+
+                async def theo_lo() -> None:
+                    session.expunge_all()
+                    await BatchLoader(crud_nguoi_dung, session).load_many(ids_phong)
+
+                # Lan dau de lam nong ket noi va cache ke hoach truy van
+                await tung_dong()
+                await theo_lo()
+                cham = statistics.median(await _do(tung_dong, lap))
+                nhanh = statistics.median(await _do(theo_lo, lap))
+                print(f"{size:>8} {cham:>10.2f}ms {nhanh:>8.2f}ms {cham / nhanh:>7.1f}x")
+        finally:
+            await session.rollback()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(chay(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Login-storm benchmark: websocket broadcast latency during concurrent logins.
+
+A room of in-memory sockets receives a broadcast every --interval ms while
+--logins password verifications run at once, either inline on the event loop
+(the behaviour before the hashing executor) or through xac_thuc_mat_khau_async.
+Latency is measured from the moment a broadcast was due to the moment it was
+written to a socket, so time the event loop spends frozen is counted.
+
+No database is needed. Run from the repository root:
+
+    python -m benchmarks.login_storm --logins 100 --sockets 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+from services.websocket.manager import ConnectionManager
+from utils.security import (
+    HashingBusyError,
+    ma_hoa_mat_khau,
+    xac_thuc_mat_khau,
+    xac_thuc_mat_khau_async,
+)
+
+MAT_KHAU = "NguoiDung001"
+
+
+class FakeWebSocket:
+    """
+    A websocket that records the delay of every message it receives.
+    """
+
+    def __init__(self, do_tre: List[float]) -> None:
+        self.do_tre = do_tre
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        self.do_tre.append(time.perf_counter() - float(text.split('"t":', 1)[1].rstrip("}")))
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+async def _phat_lien_tuc(manager: ConnectionManager, interval: float, dung: asyncio.Event) -> None:
+    den_han = time.perf_counter()
+    while not dung.is_set():
+        # "t" la thoi diem tin le ra phai duoc gui
+        await manager.send_local("phong", {"loai": "nhip", "t": den_han})
+        den_han += interval
+        await asyncio.sleep(max(0.0, den_han - time.perf_counter()))
+
+
+async def _dang_nhap(mat_khau_ma_hoa: str, che_do: str, ket_qua: Dict[str, int]) -> None:
+    try:
+        if che_do == "inline":
+            xac_thuc_mat_khau(MAT_KHAU, mat_khau_ma_hoa)
+        else:
+            await xac_thuc_mat_khau_async(MAT_KHAU, mat_khau_ma_hoa)
+        ket_qua["thanh_cong"] += 1
+    except HashingBusyError:
+        ket_qua["bi_tu_choi"] += 1
+
+
+async def chay(che_do: str, so_dang_nhap: int, so_socket: int, interval: float) -> None:
+    do_tre: List[float] = []
+    manager = ConnectionManager()
+    for _ in range(so_socket):
+        await manager.connect("phong", FakeWebSocket(do_tre))
+    mat_khau_ma_hoa = ma_hoa_mat_khau(MAT_KHAU)
+
+    dung = asyncio.Event()
+    phat = asyncio.create_task(_phat_lien_tuc(manager, interval, dung))
+    # Do nen truoc khi co dang nhap
+    await asyncio.sleep(0.5)
+    nen = list(do_tre)
+    do_tre.clear()
+
+    ket_qua = {"thanh_cong": 0, "bi_tu_choi": 0}
+    bat_dau = time.perf_counter()
+    await asyncio.gather(*(_dang_nhap(mat_khau_ma_hoa, che_do, ket_qua) for _ in range(so_dang_nhap)))
+    thoi_gian = time.perf_counter() - bat_dau
+    dung.set()
+    await phat
+    for connection in manager.active_connections.get("phong", [])[:]:
+        await manager._remove("phong", connection, flush=True)
+
+    def ms(gia_tri: List[float], q: float) -> float:
+        if not gia_tri:
+            return 0.0
+        gia_tri = sorted(gia_tri)
+        return gia_tri[min(len(gia_tri) - 1, int(q * len(gia_tri)))] * 1000
+
+    print(
+        f"{che_do:>8}: {ket_qua['thanh_cong']} logins ok, {ket_qua['bi_tu_choi']} rejected "
+        f"in {thoi_gian:.2f}s | broadcast latency idle p50={ms(nen, 0.5):.2f}ms "
+        f"storm ({len(do_tre)} msgs) p50={ms(do_tre, 0.5):.2f}ms p99={ms(do_tre, 0.99):.2f}ms "
+        f"max={max(do_tre, default=0) * 1000:.2f}ms "
+        f"mean={statistics.fmean(do_tre) * 1000 if do_tre else 0:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=20.0, help="ms between broadcasts")
+    parser.add_argument("--mode", choices=["inline", "executor", "both"], default="both")
+    args = parser.parse_args()
+    che_do = ["inline", "executor"] if args.mode == "both" else [args.mode]
+    for mode in che_do:
+        asyncio.run(chay(mode, args.logins, args.sockets, args.interval / 1000))
+
+
+if __name__ == "__main__":
+    main()
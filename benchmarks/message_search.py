@@ -0,0 +1,138 @@
+"""
+Message search benchmark: room-filtered LIKE vs. the room-scoped full-text search of CRUDTinNhan.tim_kiem.
+
+--messages synthetic messages are generated in SQL across --rooms rooms, one
+"hot" room receiving 10% of them. Each sample query is timed in the hot room
+and in a typical room through the LIKE search the endpoint used before
+(crud_tin_nhan.search_page with the room filter) and through
+crud_tin_nhan.tim_kiem. Everything runs in a transaction that is rolled back,
+so the database is left unchanged.
+
+Needs the PostgreSQL configured in .env, with the schema created by init_db.py.
+Run from the repository root:
+
+    python -m benchmarks.message_search --messages 2000000 --rooms 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Tuple
+
+from sqlalchemy import text
+
+from benchmarks.song_search import TUS
+from config.database.database import AsyncSessionLocal, engine
+from models.tin_nhan import TinNhan
+from services.crud.tin_nhan import crud_tin_nhan
+from utils.text import bo_dau
+
+TRUY_VANS = ["mưa", "ha noi", "hoàng h", "hiếm", "khongcotinnhannao"]
+
+TAO_PHONG = text(
+    """
+    INSERT INTO phong_nghe_nhac (id, ten_phong, thoi_gian_tao, thoi_gian_cap_nhat)
+    SELECT gen_random_uuid(), 'benchmark ' || n, now(), now()
+    FROM generate_series(1, :so_phong) AS n
+    RETURNING id
+    """
+)
+
+TAO_TIN_NHAN = text(
+    """
+    INSERT INTO tin_nhan (id, noi_dung, thoi_gian_tao, thoi_gian_cap_nhat,
+                          phong_nghe_nhac_id, tim_kiem)
+    SELECT gen_random_uuid(),
+           CASE WHEN hiem THEN 'hiếm ' ELSE '' END
+                || tu[a] || ' ' || tu[b] || ' ' || tu[c] || ' ' || tu[d] || ' ' || tu[e],
+           now() - n * interval '1 second', now() - n * interval '1 second',
+           phongs[p],
+           to_tsvector('simple', CASE WHEN hiem THEN 'hiem ' ELSE '' END
+                || kd[a] || ' ' || kd[b] || ' ' || kd[c] || ' ' || kd[d] || ' ' || kd[e])
+    FROM (
+        SELECT n,
+               1 + floor(random() * :so_tu)::int AS a, 1 + floor(random() * :so_tu)::int AS b,
+               1 + floor(random() * :so_tu)::int AS c, 1 + floor(random() * :so_tu)::int AS d,
+               1 + floor(random() * :so_tu)::int AS e,
+               CASE WHEN random() < 0.1 THEN 1 ELSE 1 + floor(random() * :so_phong)::int END AS p,
+               random() < 0.0001 AS hiem
+        FROM generate_series(1, :so_luong) AS n
+    ) AS chi_so
+    CROSS JOIN (
+        SELECT CAST(:tu AS text[]) AS tu, CAST(:kd AS text[]) AS kd,
+               CAST(:phongs AS uuid[]) AS phongs
+    ) AS tu_dien
+    """
+)
+
+
+async def _do(ham: Callable[[], Awaitable[int]], lap: int) -> Tuple[float, int]:
+    thoi_gian = []
+    so_ket_qua = 0
+    for _ in range(lap):
+        bat_dau = time.perf_counter()
+        so_ket_qua = await ham()
+        thoi_gian.append((time.perf_counter() - bat_dau) * 1000)
+    return statistics.median(thoi_gian), so_ket_qua
+
+
+async def chay(so_tin_nhan: int, so_phong: int, lap: int) -> None:
+    async with AsyncSessionLocal() as session:
+        try:
+            bat_dau = time.perf_counter()
+            phongs = (await session.execute(TAO_PHONG, {"so_phong": so_phong})).scalars().all()
+            await session.execute(
+                TAO_TIN_NHAN,
+                {
+                    "so_luong": so_tin_nhan,
+                    "so_phong": so_phong,
+                    "so_tu": len(TUS),
+                    "tu": TUS,
+                    "kd": [bo_dau(tu) for tu in TUS],
+                    "phongs": list(phongs),
+                },
+            )
+            await session.execute(text("ANALYZE tin_nhan"))
+            print(
+                f"Generated {so_tin_nhan} messages in {so_phong} rooms "
+                f"in {time.perf_counter() - bat_dau:.1f}s\n"
+            )
+
+            print(f"{'room':<8} {'query':<20} {'LIKE p50':>10} {'rows':>5} {'tim_kiem p50':>13} {'rows':>5}")
+            for ten_phong, phong_id in (("hot", phongs[0]), ("typical", phongs[-1])):
+                for q in TRUY_VANS:
+                    async def tim_like() -> int:
+                        session.expunge_all()
+                        tin_nhans, _ = await crud_tin_nhan.search_page(
+                            session, TinNhan.phong_nghe_nhac_id == phong_id, limit=100, noi_dung=q
+                        )
+                        return len(tin_nhans)
+
+                    async def tim_fts() -> int:
+                        session.expunge_all()
+                        tin_nhans, _ = await crud_tin_nhan.tim_kiem(session, str(phong_id), q, limit=100)
+                        return len(tin_nhans)
+
+                    cham, so_cham = await _do(tim_like, lap)
+                    nhanh, so_nhanh = await _do(tim_fts, lap)
+                    print(
+                        f"{ten_phong:<8} {q:<20} {cham:>8.1f}ms {so_cham:>5} "
+                        f"{nhanh:>11.1f}ms {so_nhanh:>5}"
+                    )
+        finally:
+            await session.rollback()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(chay(args.messages, args.rooms, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
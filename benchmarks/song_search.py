@@ -0,0 +1,139 @@
+"""
+Song search benchmark: LIKE scan vs. the tsvector/trigram search of CRUDBaiHat.tim_kiem.
+
+A synthetic catalog of --songs songs (titles, artists and lyrics drawn from
+Vietnamese words, with accents) is generated in SQL, then each sample query is
+timed through the old LIKE search (crud_bai_hat.search, as /bai_hat/tim_kiem
+used it) and through crud_bai_hat.tim_kiem. Everything runs in a transaction
+that is rolled back, so the database is left unchanged.
+
+Needs the PostgreSQL configured in .env, with the schema created by init_db.py.
+Generating 1M songs takes a few minutes. Run from the repository root:
+
+    python -m benchmarks.song_search --songs 1000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from sqlalchemy import text
+
+from config.database.database import AsyncSessionLocal, engine
+from services.crud.bai_hat import crud_bai_hat
+from utils.text import bo_dau
+
+TUS = (
+    "yêu em anh mùa thu Hà Nội đêm trăng Sài Gòn mưa nắng biển nhớ người tình xa quê "
+    "hương mẹ cha bài ca tuổi trẻ hoa phượng đỏ tháng năm giấc mơ ngày mai cơn gió chiều "
+    "hoàng hôn bình minh phố cũ con đường lá vàng rơi trái tim bên nhau mãi sông núi đất "
+    "nước ánh sao"
+).split()
+CA_SIS = [
+    f"{ho} {ten}"
+    for ho in ("Nguyễn", "Trần", "Lê", "Phạm", "Hoàng")
+    for ten in ("Hương", "Tùng", "Linh", "Quân", "Mai", "Đức", "Thảo", "Sơn")
+]
+
+# (mo ta, tham so cho search LIKE, tham so cho tim_kiem)
+TRUY_VANS: List[Tuple[str, dict, dict]] = [
+    ("common word", {"ten_bai_hat": "mưa"}, {"q": "mưa"}),
+    ("two words, accents", {"ten_bai_hat": "hà nội"}, {"q": "hà nội"}),
+    ("two words, no accents", {"ten_bai_hat": "ha noi"}, {"q": "ha noi"}),
+    ("prefix while typing", {"ten_bai_hat": "hoàng h"}, {"q": "hoàng h"}),
+    ("artist", {"ten_ca_si": "trần linh"}, {"ten_ca_si": "trần linh"}),
+    ("rare word", {"ten_bai_hat": "hiếm"}, {"q": "hiếm"}),
+    ("no match", {"ten_bai_hat": "khongcobaihatnao"}, {"q": "khongcobaihatnao"}),
+]
+
+TAO_DU_LIEU = text(
+    """
+    INSERT INTO bai_hat (id, ten_bai_hat, ten_ca_si, loi_bai_hat, trang_thai,
+                         quyen_rieng_tu, thoi_gian_tao, tim_kiem, ten_khong_dau)
+    SELECT gen_random_uuid(),
+           CASE WHEN hiem THEN 'hiếm ' ELSE '' END || tu[a] || ' ' || tu[b] || ' ' || tu[c],
+           ca_si[d],
+           tu[a] || ' ' || tu[e] || ' ' || tu[f] || ' ' || tu[g] || ' ' || tu[b],
+           'hoat_dong', 'cong_khai', now(),
+           setweight(to_tsvector('simple',
+                CASE WHEN hiem THEN 'hiem ' ELSE '' END || kd[a] || ' ' || kd[b] || ' ' || kd[c]), 'A')
+           || setweight(to_tsvector('simple', ca_si_kd[d]), 'B')
+           || setweight(to_tsvector('simple',
+                kd[a] || ' ' || kd[e] || ' ' || kd[f] || ' ' || kd[g] || ' ' || kd[b]), 'C'),
+           CASE WHEN hiem THEN 'hiem ' ELSE '' END
+                || kd[a] || ' ' || kd[b] || ' ' || kd[c] || ' ' || ca_si_kd[d]
+    FROM (
+        SELECT 1 + floor(random() * :so_tu)::int AS a, 1 + floor(random() * :so_tu)::int AS b,
+               1 + floor(random() * :so_tu)::int AS c, 1 + floor(random() * :so_ca_si)::int AS d,
+               1 + floor(random() * :so_tu)::int AS e, 1 + floor(random() * :so_tu)::int AS f,
+               1 + floor(random() * :so_tu)::int AS g,
+               random() < 0.0001 AS hiem
+        FROM generate_series(1, :so_luong)
+    ) AS chi_so
+    CROSS JOIN (
+        SELECT CAST(:tu AS text[]) AS tu, CAST(:kd AS text[]) AS kd,
+               CAST(:ca_si AS text[]) AS ca_si, CAST(:ca_si_kd AS text[]) AS ca_si_kd
+    ) AS tu_dien
+    """
+)
+
+
+async def _do(ham: Callable[[], Awaitable[int]], lap: int) -> Tuple[float, int]:
+    thoi_gian = []
+    so_ket_qua = 0
+    for _ in range(lap):
+        bat_dau = time.perf_counter()
+        so_ket_qua = await ham()
+        thoi_gian.append((time.perf_counter() - bat_dau) * 1000)
+    return statistics.median(thoi_gian), so_ket_qua
+
+
+async def chay(so_bai_hat: int, lap: int) -> None:
+    async with AsyncSessionLocal() as session:
+        try:
+            bat_dau = time.perf_counter()
+            await session.execute(
+                TAO_DU_LIEU,
+                {
+                    "so_luong": so_bai_hat,
+                    "so_tu": len(TUS),
+                    "so_ca_si": len(CA_SIS),
+                    "tu": TUS,
+                    "kd": [bo_dau(tu) for tu in TUS],
+                    "ca_si": CA_SIS,
+                    "ca_si_kd": [bo_dau(ca_si) for ca_si in CA_SIS],
+                },
+            )
+            await session.execute(text("ANALYZE bai_hat"))
+            print(f"Generated {so_bai_hat} songs in {time.perf_counter() - bat_dau:.1f}s\n")
+
+            print(f"{'query':<24} {'LIKE p50':>10} {'rows':>5} {'tim_kiem p50':>13} {'rows':>5}")
+            for mo_ta, like, fts in TRUY_VANS:
+                async def tim_like() -> int:
+                    session.expunge_all()
+                    return len(await crud_bai_hat.search(session, limit=100, **like))
+
+                async def tim_fts() -> int:
+                    session.expunge_all()
+                    return len((await crud_bai_hat.tim_kiem(session, limit=100, **fts))[0])
+
+                cham, so_cham = await _do(tim_like, lap)
+                nhanh, so_nhanh = await _do(tim_fts, lap)
+                print(f"{mo_ta:<24} {cham:>8.1f}ms {so_cham:>5} {nhanh:>11.1f}ms {so_nhanh:>5}")
+        finally:
+            await session.rollback()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(chay(args.songs, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
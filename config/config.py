@@ -34,12 +34,59 @@ class Settings(BaseSettings):
         POSTGRES_PASSWORD (str): The password for PostgreSQL authentication.
         POSTGRES_URI (Optional[str]): The full URI for connecting to the PostgreSQL database.
 
+        DB_POOL_SIZE (int): The number of persistent connections kept in each worker's pool. Open websockets only
+            hold one while handling an event, so this bounds concurrent queries, not sockets.
+        DB_MAX_OVERFLOW (int): The number of extra connections a worker may open under burst load.
+        DB_POOL_TIMEOUT (int): Seconds to wait for a free connection before giving up.
+        DB_POOL_RECYCLE (int): Seconds after which a pooled connection is replaced (-1 disables).
+        DB_POOL_PRE_PING (bool): Whether to test connections for liveness on checkout.
+        DB_ECHO (str): SQL statement logging level ("false", "true" or "debug").
+        DB_NULL_POOL (bool): Disable pooling entirely and open one connection per session.
+        DB_MAX_CONNECTIONS (int): Total connection budget shared by all workers (0 disables the cap).
+        WEB_CONCURRENCY (int): The number of server worker processes sharing the database.
+
+        WEBSOCKET_BACKPLANE (str): How room events reach other workers ("in_process" or "postgres").
+        WEBSOCKET_SEND_QUEUE_SIZE (int): The number of pending messages buffered per connection.
+        WEBSOCKET_SEND_TIMEOUT (float): Seconds a single socket write may take before the client is dropped.
+        WEBSOCKET_SLOW_CONSUMER_POLICY (str): "drop" discards the oldest queued message when a
+            connection's queue is full, "disconnect" closes the connection instead.
+        PLAYBACK_FLUSH_INTERVAL (float): Seconds between batched writes of room playback state.
+        PLAYBACK_SYNC_INTERVAL (float): Seconds between playback sync ticks sent to rooms that are playing (0 disables them).
+        CHAT_HISTORY_SIZE (int): The number of recent messages kept in memory per active room and sent on join.
+        CHAT_FLUSH_INTERVAL (float): Seconds between batched writes of chat messages.
+        CHAT_FLUSH_BATCH_SIZE (int): Queued chat messages that trigger an early write, and the rows per INSERT.
+        CHAT_MAX_PENDING (int): The maximum number of unsaved chat messages kept while the database is unavailable.
+
+        MAX_PAGE_SIZE (int): Upper bound of the limit parameter of list endpoints.
+
+        JOB_WORKERS (int): The number of background job workers per process.
+        JOB_POLL_INTERVAL (float): Seconds an idle job worker waits before looking for due jobs.
+        JOB_LEASE_TIMEOUT (float): Seconds after which a running job whose worker vanished is retried.
+        JOB_MAX_ATTEMPTS (int): Attempts before a background job is marked failed.
+        JOB_RETRY_BASE_DELAY (float): Delay in seconds before the first retry, doubled for each further one.
+        JOB_RETRY_MAX_DELAY (float): Upper bound of the retry delay in seconds.
+        CONTENT_PROVIDER (str): Transcription and moderation service of uploaded songs ("openai" or "fake").
+
         FASTAPI_PORT (int): The port on which the FastAPI server will run.
         FASTAPI_HOST (str): The host address for the FastAPI server.
 
         SECRET_KEY (str): The secret key used for signing JWTs.
         ACCESS_TOKEN_EXPIRE_MINUTES (int): The duration in minutes for which access tokens are valid.
         REFRESH_TOKEN_EXPIRE_MINUTES (int): The duration in minutes for which refresh tokens are valid.
+        AUTH_TOKEN_CACHE_SIZE (int): The number of verified access tokens cached per process (0 disables the cache).
+        AUTH_USER_CACHE_SIZE (int): The number of authenticated users cached per process (0 disables the cache).
+        AUTH_USER_CACHE_TTL (float): Seconds a cached user is served before it is reloaded.
+        PASSWORD_HASH_WORKERS (int): Threads dedicated to bcrypt hashing and verification.
+        PASSWORD_HASH_QUEUE_SIZE (int): Password operations allowed to wait before new ones are rejected with 503.
+        ACCESS_TOKEN_DENYLIST_SIZE (int): Revoked access tokens (jti) the in-memory denylist is sized for per token lifetime.
+        ACCESS_TOKEN_DENYLIST_ERROR_RATE (float): Bloom filter false positive rate at that size.
+        REFRESH_TOKEN_HASH_KEY (str): HMAC key of the stored refresh token digests (defaults to SECRET_KEY).
+        REFRESH_TOKEN_PURGE_INTERVAL (float): Seconds between two purges of expired and revoked refresh tokens (0 disables it).
+        REFRESH_TOKEN_PURGE_BATCH_SIZE (int): Refresh tokens deleted per purge transaction.
+
+        S3_MULTIPART_THRESHOLD (int): File size in MB above which S3 uploads are multipart.
+        S3_MULTIPART_CHUNKSIZE (int): Part size in MB of multipart S3 uploads.
+        S3_MAX_CONCURRENCY (int): The number of parts of one upload sent in parallel.
     """
 
     # Application settings
@@ -88,6 +135,32 @@ class Settings(BaseSettings):
         db_uri = f"postgresql+asyncpg://{nguoi_dung}:{password}@{host}:{port}/{db}"
         return db_uri
 
+    # Connection pool settings
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_ECHO: str = os.getenv("DB_ECHO", "false").lower()
+    DB_NULL_POOL: bool = os.getenv("DB_NULL_POOL", "false").lower() == "true"
+    DB_MAX_CONNECTIONS: int = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Websocket settings
+    WEBSOCKET_BACKPLANE: str = os.getenv("WEBSOCKET_BACKPLANE", "in_process")
+    WEBSOCKET_SEND_QUEUE_SIZE: int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "64"))
+    WEBSOCKET_SEND_TIMEOUT: float = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "5"))
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = os.getenv("WEBSOCKET_SLOW_CONSUMER_POLICY", "drop")
+    PLAYBACK_FLUSH_INTERVAL: float = float(os.getenv("PLAYBACK_FLUSH_INTERVAL", "2"))
+    PLAYBACK_SYNC_INTERVAL: float = float(os.getenv("PLAYBACK_SYNC_INTERVAL", "5"))
+    CHAT_HISTORY_SIZE: int = int(os.getenv("CHAT_HISTORY_SIZE", "50"))
+    CHAT_FLUSH_INTERVAL: float = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.5"))
+    CHAT_FLUSH_BATCH_SIZE: int = int(os.getenv("CHAT_FLUSH_BATCH_SIZE", "500"))
+    CHAT_MAX_PENDING: int = int(os.getenv("CHAT_MAX_PENDING", "100000"))
+
+    # Pagination settings
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
     # Server settings
     HTTP_PROTOCOL: str = str(os.getenv("HTTP_PROTOCOL"))
     FASTAPI_PORT: int = (
@@ -105,6 +178,37 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
     REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES"))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+    AUTH_USER_CACHE_TTL: float = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+    ACCESS_TOKEN_DENYLIST_SIZE: int = int(os.getenv("ACCESS_TOKEN_DENYLIST_SIZE", "100000"))
+    ACCESS_TOKEN_DENYLIST_ERROR_RATE: float = float(os.getenv("ACCESS_TOKEN_DENYLIST_ERROR_RATE", "0.001"))
+    REFRESH_TOKEN_HASH_KEY: str = os.getenv("REFRESH_TOKEN_HASH_KEY") or os.getenv("SECRET_KEY")
+    REFRESH_TOKEN_PURGE_INTERVAL: float = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL", "3600"))
+    REFRESH_TOKEN_PURGE_BATCH_SIZE: int = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH_SIZE", "1000"))
+
+    @field_validator("SECRET_KEY", mode="after")
+    def validate_secret_key(cls, v) -> str:
+        """
+        Refuses to start with an empty SECRET_KEY (the .env.example placeholder).
+
+        Raises:
+            ValueError: If SECRET_KEY is empty.
+        """
+        if not v:
+            raise ValueError("Please set SECRET_KEY to a random value, see README.")
+        return v
+
+    # Background job settings
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    JOB_LEASE_TIMEOUT: float = float(os.getenv("JOB_LEASE_TIMEOUT", "300"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BASE_DELAY: float = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))
+    JOB_RETRY_MAX_DELAY: float = float(os.getenv("JOB_RETRY_MAX_DELAY", "600"))
+    CONTENT_PROVIDER: str = os.getenv("CONTENT_PROVIDER", "openai")
 
     # AWS S3 settings
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID")
@@ -112,6 +216,9 @@ class Settings(BaseSettings):
     BUCKET_NAME: str = os.getenv("BUCKET_NAME")
     COMMDATA_BUCKET_NAME: str = os.getenv("COMMDATA_BUCKET_NAME")
     AWS_REGION_NAME: str = os.getenv("AWS_REGION_NAME")
+    S3_MULTIPART_THRESHOLD: int = int(os.getenv("S3_MULTIPART_THRESHOLD", "8"))
+    S3_MULTIPART_CHUNKSIZE: int = int(os.getenv("S3_MULTIPART_CHUNKSIZE", "8"))
+    S3_MAX_CONCURRENCY: int = int(os.getenv("S3_MAX_CONCURRENCY", "4"))
     
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
@@ -5,31 +5,108 @@ SQLAlchemy engine, session maker, and session dependency for use in the app's ro
 """
 
 import logging
-from sqlalchemy.pool import NullPool
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
 from config.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long callers wait for a connection.
+
+    Attributes:
+        so_lan_lay (int): The number of successful connection checkouts.
+        so_lan_het_thoi_gian (int): The number of checkouts that timed out.
+        tong_thoi_gian_cho (float): The accumulated checkout wait time in seconds.
+        thoi_gian_cho_toi_da (float): The longest single checkout wait in seconds.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._khoa_thong_so = threading.Lock()
+        self.so_lan_lay = 0
+        self.so_lan_het_thoi_gian = 0
+        self.tong_thoi_gian_cho = 0.0
+        self.thoi_gian_cho_toi_da = 0.0
+
+    def _do_get(self):
+        bat_dau = time.perf_counter()
+        try:
+            ket_noi = super()._do_get()
+        except Exception:
+            with self._khoa_thong_so:
+                self.so_lan_het_thoi_gian += 1
+            raise
+        thoi_gian_cho = time.perf_counter() - bat_dau
+        with self._khoa_thong_so:
+            self.so_lan_lay += 1
+            self.tong_thoi_gian_cho += thoi_gian_cho
+            self.thoi_gian_cho_toi_da = max(self.thoi_gian_cho_toi_da, thoi_gian_cho)
+        return ket_noi
+
+
+def get_pool_sizing() -> Dict[str, int]:
+    """
+    Compute the pool size and overflow for a single worker process.
+
+    When DB_MAX_CONNECTIONS is set, the budget is split evenly between the
+    WEB_CONCURRENCY workers so that all of them together never exceed it.
+
+    Returns:
+        Dict[str, int]: The ``pool_size`` and ``max_overflow`` for this worker.
+    """
+    pool_size = max(1, settings.DB_POOL_SIZE)
+    max_overflow = max(0, settings.DB_MAX_OVERFLOW)
+
+    if settings.DB_MAX_CONNECTIONS > 0:
+        ngan_sach = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+        pool_size = min(pool_size, ngan_sach)
+        max_overflow = min(max_overflow, ngan_sach - pool_size)
+
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
 def get_async_engine(uri: str = settings.POSTGRES_URI):
     """
     Create and return an async SQLAlchemy engine.
 
+    Pooling behaviour and statement logging are driven by the DB_* settings.
+
     Parameters:
         uri (str): The database URI for the PostgreSQL connection.
 
     Returns:
         AsyncEngine: An asynchronous SQLAlchemy engine.
     """
+    echo: Any = "debug" if settings.DB_ECHO == "debug" else settings.DB_ECHO == "true"
+
+    if settings.DB_NULL_POOL:
+        pool_options = {"poolclass": NullPool}
+    else:
+        pool_options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            **get_pool_sizing(),
+        }
+
     try:
         engine = create_async_engine(
             uri,
-            echo=True,
-            poolclass=NullPool,
-            # Disable connection pooling for better async handling
-            pool_pre_ping=True,
-            # Enable connection health checks
+            echo=echo,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            **pool_options,
         )
         logger.info("Successfully created async database engine")
         return engine
@@ -38,17 +115,55 @@ def get_async_engine(uri: str = settings.POSTGRES_URI):
         raise
 
 
-def get_async_session_maker():
+def get_pool_metrics(async_engine: AsyncEngine) -> Dict[str, Any]:
+    """
+    Collect a snapshot of the connection pool state for the given engine.
+
+    Parameters:
+        async_engine (AsyncEngine): The engine whose pool should be inspected.
+
+    Returns:
+        Dict[str, Any]: Pool size, checked-out and overflow counts, and wait times.
+    """
+    pool = async_engine.sync_engine.pool
+    metrics: Dict[str, Any] = {"loai_pool": type(pool).__name__}
+
+    if not isinstance(pool, InstrumentedQueuePool):
+        return metrics
+
+    so_lan_lay = pool.so_lan_lay
+    metrics.update(
+        {
+            "kich_thuoc": pool.size(),
+            "dang_san_sang": pool.checkedin(),
+            "dang_su_dung": pool.checkedout(),
+            "vuot_muc": max(0, pool.overflow()),
+            "vuot_muc_toi_da": pool._max_overflow,
+            "so_lan_lay": so_lan_lay,
+            "so_lan_het_thoi_gian": pool.so_lan_het_thoi_gian,
+            "thoi_gian_cho_trung_binh_ms": (
+                pool.tong_thoi_gian_cho / so_lan_lay * 1000 if so_lan_lay else 0.0
+            ),
+            "thoi_gian_cho_toi_da_ms": pool.thoi_gian_cho_toi_da * 1000,
+        }
+    )
+    return metrics
+
+
+def get_async_session_maker(async_engine: AsyncEngine = None):
     """
     Create and return an async session maker.
 
+    Parameters:
+        async_engine (AsyncEngine): The engine to bind sessions to. A new engine is
+            created when omitted.
+
     Returns:
         async_sessionmaker: An async session maker instance for creating sessions.
     """
     try:
-        engine = get_async_engine()
         async_session = async_sessionmaker(
-            engine,
+            async_engine or get_async_engine(),
             class_=AsyncSession,
             expire_on_commit=False,
             autocommit=False,
@@ -61,9 +176,9 @@ def get_async_session_maker():
         raise
 
 
-# Create engine and SessionLocal instances
+# Create engine and SessionLocal instances sharing a single pool
 engine = get_async_engine()
-AsyncSessionLocal = get_async_session_maker()
+AsyncSessionLocal = get_async_session_maker(engine)
 
 
 async def get_db():
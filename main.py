@@ -1,21 +1,60 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from config.config import settings
 from api import router
+from services.websocket.manager import manager as connection_manager
+from services.websocket.room_state import room_states
+from services.websocket.playback_writer import playback_writer
+from services.websocket.chat_writer import chat_writer
+from services.search.autocomplete import autocomplete_index
+from utils.security import HashingBusyError
+from services.jobs.queue import job_queue
+from services.auth.don_dep_ma import don_dep_ma_lam_moi
+import services.jobs.bai_hat  # registers the song job handlers
 import uvicorn
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    await connection_manager.start()
+    await autocomplete_index.tai()
+    await playback_writer.start()
+    await chat_writer.start()
+    await job_queue.start()
+    await don_dep_ma_lam_moi.start()
+    room_states.bat_dau_dong_bo(settings.PLAYBACK_SYNC_INTERVAL)
+    try:
+        yield
+    finally:
+        await don_dep_ma_lam_moi.stop()
+        await job_queue.stop()
+        await connection_manager.stop()
+        await playback_writer.stop()
+        await chat_writer.stop()
+        await room_states.dong()
+
+
 def create_application() -> FastAPI:
-    application = FastAPI(title=settings.APP_NAME)
+    application = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
     application.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],  # Allows all origins
         allow_credentials=True,
         allow_methods=["*"],  # Allows all methods
         allow_headers=["*"],  # Allows all headers
+        expose_headers=["X-Next-Cursor"],  # Pagination cursor of list endpoints
     )
     application.include_router(router)
+
+    @application.exception_handler(HashingBusyError)
+    async def hashing_busy_handler(request: Request, exc: HashingBusyError):
+        # Qua nhieu yeu cau bam mat khau cung luc, client thu lai sau
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
     return application
 
 
@@ -13,3 +13,5 @@ from models.phong_nghe_nhac import PhongNgheNhac
 from models.thanh_vien_phong import ThanhVienPhong
 from models.tin_nhan import TinNhan
 from models.yeu_cau_tham_gia_phong import YeuCauThamGiaPhong
+from models.cong_viec import CongViec
+from models.ket_qua_kiem_duyet import KetQuaKiemDuyet
@@ -1,11 +1,12 @@
 from uuid import uuid4
 import datetime as _dt
 
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Text, Index, DDL, event, func, text
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from models.base import Base
+from utils.text import bo_dau
 
 
 class BaiHat(Base):
@@ -28,12 +29,31 @@ class BaiHat(Base):
         thoi_gian_cap_nhat (DateTime): The timestamp when the song was last updated.
         thoi_gian_xoa (DateTime): The timestamp when the song was deleted.
         nguoi_dung_id (UUID): The ID of the user who created the song.
+        tim_kiem (TSVECTOR): Accent-free search document, weighted A (ten_bai_hat),
+            B (ten_ca_si), C (loi_bai_hat). Maintained on insert/update.
+        ten_khong_dau (String): Accent-free "ten_bai_hat ten_ca_si", for trigram matching.
+        ma_bam (String): The SHA-256 of the audio file; songs with the same audio share its S3 object.
     Relationships:
         danh_sach_phat_bai_hats: The playlists containing this song.
         nguoi_dung: The user who created the song.
     """
 
     __tablename__ = "bai_hat"
+    __table_args__ = (
+        # Listing sort orders, (sort key, id) as used by keyset pagination
+        Index("ix_bai_hat_ten_bai_hat_id", "ten_bai_hat", "id"),
+        Index("ix_bai_hat_ten_ca_si_id", func.coalesce(text("ten_ca_si"), ""), "id"),
+        Index("ix_bai_hat_the_loai_id", func.coalesce(text("the_loai"), ""), "id"),
+        Index("ix_bai_hat_thoi_luong_id", func.coalesce(text("thoi_luong"), 0), "id"),
+        Index("ix_bai_hat_thoi_gian_tao_id", "thoi_gian_tao", "id"),
+        Index("ix_bai_hat_tim_kiem", "tim_kiem", postgresql_using="gin"),
+        Index(
+            "ix_bai_hat_ten_khong_dau_trgm",
+            "ten_khong_dau",
+            postgresql_using="gin",
+            postgresql_ops={"ten_khong_dau": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, index=True)
     ten_bai_hat = Column(String, nullable=False)
@@ -51,6 +71,11 @@ class BaiHat(Base):
     thoi_gian_xoa = Column(DateTime, nullable=True)
 
     nguoi_dung_id = Column(UUID(as_uuid=True), ForeignKey("nguoi_dung.id"), nullable=True)
+    ma_bam = Column(String(64), nullable=True, index=True)
+
+    # Search columns, deferred so they are never sent to clients
+    tim_kiem = deferred(Column(TSVECTOR, nullable=True))
+    ten_khong_dau = deferred(Column(String, nullable=True))
 
     # Define the relationship with DanhSachPhatBaiHat
     danh_sach_phat_bai_hats = relationship(
@@ -59,3 +84,31 @@ class BaiHat(Base):
 
     # Define the relationship with NguoiDung through DanhSachPhatBaiHat
     nguoi_dung = relationship("NguoiDung", back_populates="bai_hats")
+
+
+def _tai_lieu_tim_kiem(bai_hat: BaiHat):
+    """
+    Build the weighted tsvector expression of a song from its accent-free fields.
+    """
+    return (
+        func.setweight(func.to_tsvector("simple", bo_dau(bai_hat.ten_bai_hat)), "A")
+        .op("||")(func.setweight(func.to_tsvector("simple", bo_dau(bai_hat.ten_ca_si)), "B"))
+        .op("||")(func.setweight(func.to_tsvector("simple", bo_dau(bai_hat.loi_bai_hat)), "C"))
+    )
+
+
+@event.listens_for(BaiHat, "before_insert")
+@event.listens_for(BaiHat, "before_update")
+def _cap_nhat_tim_kiem(mapper, connection, target: BaiHat) -> None:
+    target.tim_kiem = _tai_lieu_tim_kiem(target)
+    target.ten_khong_dau = " ".join(
+        filter(None, [bo_dau(target.ten_bai_hat), bo_dau(target.ten_ca_si)])
+    )
+
+
+# The trigram index needs pg_trgm
+event.listen(
+    BaiHat.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -40,5 +40,7 @@ class Base(object):
             Dict[str, Any]: A dictionary representation of the model instance.
         """
         return {
-            c.key: getattr(self, c.key, None) for c in inspect(self).mapper.column_attrs
+            c.key: getattr(self, c.key, None)
+            for c in inspect(self).mapper.column_attrs
+            if not c.deferred
         }
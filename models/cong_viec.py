@@ -0,0 +1,44 @@
+from uuid import uuid4
+import datetime as _dt
+
+from sqlalchemy import Column, String, DateTime, Integer, Text, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+
+from models.base import Base
+
+
+class CongViec(Base):
+    """
+    CongViec model representing a background job.
+
+    Attributes:
+        id (UUID): The unique identifier for the job.
+        loai (String): The job type, selects the handler (e.g. "kiem_duyet_bai_hat").
+        trang_thai (String): "cho_xu_ly", "dang_xu_ly", "hoan_thanh" or "that_bai".
+        du_lieu (JSONB): The input of the job.
+        ket_qua (JSONB): The result of the job once it has finished.
+        loi (Text): The last error message.
+        so_lan_thu (Integer): The number of attempts made so far.
+        so_lan_thu_toi_da (Integer): The number of attempts before the job fails.
+        thoi_gian_chay (DateTime): When the job may run next; while it runs, when its lease expires.
+        thoi_gian_tao (DateTime): The timestamp when the job was created.
+        thoi_gian_cap_nhat (DateTime): The timestamp when the job was last updated.
+    """
+
+    __tablename__ = "cong_viec"
+    __table_args__ = (
+        # Workers pick due jobs in order of thoi_gian_chay
+        Index("ix_cong_viec_trang_thai_thoi_gian_chay", "trang_thai", "thoi_gian_chay"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, index=True)
+    loai = Column(String, nullable=False)
+    trang_thai = Column(String, default="cho_xu_ly", nullable=False)
+    du_lieu = Column(JSONB, nullable=False, default=dict)
+    ket_qua = Column(JSONB, nullable=True)
+    loi = Column(Text, nullable=True)
+    so_lan_thu = Column(Integer, default=0, nullable=False)
+    so_lan_thu_toi_da = Column(Integer, default=5, nullable=False)
+    thoi_gian_chay = Column(DateTime, default=_dt.datetime.now, nullable=False)
+    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now)
+    thoi_gian_cap_nhat = Column(DateTime, default=_dt.datetime.now)
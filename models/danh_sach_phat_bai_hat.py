@@ -1,7 +1,7 @@
 from uuid import uuid4
 import datetime as _dt
 
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -14,7 +14,7 @@ class DanhSachPhatBaiHat(Base):
 
     Attributes:
         id (UUID): The unique identifier for the song fine record.
-        so_thu_tu (Integer): The order of the song in the playlist.
+        so_thu_tu (Integer): Sparse ordering key of the song in the playlist; positions are derived on read.
         thoi_gian_tao (DateTime): The timestamp when the fine record was created.
         thoi_gian_cap_nhat (DateTime): The timestamp when the fine record was last updated.
         thoi_gian_xoa (DateTime): The timestamp when the fine record was deleted.
@@ -24,9 +24,15 @@ class DanhSachPhatBaiHat(Base):
     Relationships:
         bai_hat: The song associated with this fine record.
         danh_sach_phat: The playlist associated with this fine record.
+
+    Indexes:
+        (danh_sach_phat_id, so_thu_tu): Serves the ordered listing of a playlist.
     """
 
     __tablename__ = "danh_sach_phat_bai_hat"
+    __table_args__ = (
+        Index("ix_danh_sach_phat_bai_hat_danh_sach_phat_id_so_thu_tu", "danh_sach_phat_id", "so_thu_tu"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, index=True)
     so_thu_tu = Column(Integer, nullable=False)
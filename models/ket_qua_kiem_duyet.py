@@ -0,0 +1,29 @@
+import datetime as _dt
+
+from sqlalchemy import Column, String, DateTime, Boolean, Text
+
+from models.base import Base
+
+
+class KetQuaKiemDuyet(Base):
+    """
+    KetQuaKiemDuyet model caching the transcription and moderation of an audio file.
+
+    Results are keyed by the SHA-256 of the file content, so uploading the same
+    audio again reuses them instead of calling the services.
+
+    Attributes:
+        ma_bam (String): The hex SHA-256 of the audio content.
+        van_ban (Text): The transcription.
+        phu_hop (Boolean): Whether the content was judged appropriate.
+        ly_do (Text): The reason given when it was not.
+        thoi_gian_tao (DateTime): The timestamp when the result was stored.
+    """
+
+    __tablename__ = "ket_qua_kiem_duyet"
+
+    ma_bam = Column(String(64), primary_key=True)
+    van_ban = Column(Text, nullable=True)
+    phu_hop = Column(Boolean, nullable=False)
+    ly_do = Column(Text, nullable=True)
+    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now)
@@ -7,7 +7,7 @@ and methods to interact with nguoi_dung accounts and their associated refresh to
 from uuid import uuid4
 import datetime as _dt
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, Index, LargeBinary, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -68,7 +68,9 @@ class MaLamMoi(Base):
 
     Attributes:
         id (UUID): The unique identifier for the refresh token.
-        token (String): The refresh token, which must be unique.
+        ma_bam (LargeBinary): HMAC-SHA256 of the refresh token (32 bytes), which must be unique;
+            the token itself is never stored. Databases created with the plain ma column are
+            migrated by scripts/migrate_ma_lam_moi_ma_bam.sql.
         thoi_gian_het_han (DateTime): The timestamp when the token expires.
         thoi_gian_tao (DateTime): The timestamp when the token was created.
         thoi_gian_thu_hoi (DateTime): The timestamp when the token was revoked, if applicable.
@@ -84,11 +86,19 @@ class MaLamMoi(Base):
     """
 
     __tablename__ = "ma_lam_moi"
+    __table_args__ = (
+        # Chi cac ma chua thu hoi: thu hoi theo nguoi dung khong quet lai ma cu
+        Index(
+            "ix_ma_lam_moi_nguoi_dung_id_con_hieu_luc",
+            "nguoi_dung_id",
+            postgresql_where=text("da_thu_hoi = false"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, index=True)
-    ma = Column(String, unique=True, index=True, nullable=False)
+    ma_bam = Column(LargeBinary(32), unique=True, nullable=False)
     thoi_gian_het_han = Column(DateTime, nullable=False)
-    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now())
+    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now)
     thoi_gian_thu_hoi = Column(DateTime, nullable=True)
     da_thu_hoi = Column(Boolean, default=False)
     nguoi_dung_id = Column(
@@ -1,11 +1,12 @@
 from uuid import uuid4
 import datetime as _dt
 
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index, DDL, event, func
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from models.base import Base
+from utils.text import bo_dau
 
 
 class TinNhan(Base):
@@ -21,6 +22,7 @@ class TinNhan(Base):
         thoi_gian_xoa (DateTime): The timestamp when the message was deleted.
         thanh_vien_phong_id (UUID): The ID of the user who created the message.
         phong_nghe_nhac_id (UUID): The ID of the playlist associated with this message.
+        tim_kiem (TSVECTOR): Accent-free search document of noi_dung. Maintained on insert/update.
 
     Relationships:
         phong_nghe_nhac: The playlist associated with this message.
@@ -28,15 +30,38 @@ class TinNhan(Base):
     """
 
     __tablename__ = "tin_nhan"
+    __table_args__ = (
+        # Lich su chat cua mot phong, moi nhat truoc (keyset theo thoi_gian_tao, id)
+        Index("ix_tin_nhan_phong_nghe_nhac_id_thoi_gian_tao", "phong_nghe_nhac_id", "thoi_gian_tao", "id"),
+        # Tim kiem trong mot phong: phong_nghe_nhac_id va tim_kiem trong cung mot chi muc GIN
+        Index("ix_tin_nhan_phong_nghe_nhac_id_tim_kiem", "phong_nghe_nhac_id", "tim_kiem", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, index=True)
     noi_dung = Column(String, nullable=False)
     tin_nhan_tra_loi_id = Column(UUID(as_uuid=True), ForeignKey("tin_nhan.id"))
-    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now())
-    thoi_gian_cap_nhat = Column(DateTime, default=_dt.datetime.now())
+    thoi_gian_tao = Column(DateTime, default=_dt.datetime.now)
+    thoi_gian_cap_nhat = Column(DateTime, default=_dt.datetime.now)
     thoi_gian_xoa = Column(DateTime)
     thanh_vien_phong_id = Column(UUID(as_uuid=True), ForeignKey("thanh_vien_phong.id"))
     phong_nghe_nhac_id = Column(UUID(as_uuid=True), ForeignKey("phong_nghe_nhac.id"))
 
+    # Search column, deferred so it is never sent to clients
+    tim_kiem = deferred(Column(TSVECTOR, nullable=True))
+
     phong_nghe_nhac = relationship("PhongNgheNhac", back_populates="tin_nhans")
     thanh_vien_phong = relationship("ThanhVienPhong", back_populates="tin_nhans")
+
+
+@event.listens_for(TinNhan, "before_insert")
+@event.listens_for(TinNhan, "before_update")
+def _cap_nhat_tim_kiem(mapper, connection, target: TinNhan) -> None:
+    target.tim_kiem = func.to_tsvector("simple", bo_dau(target.noi_dung))
+
+
+# A GIN index over a UUID column needs btree_gin
+event.listen(
+    TinNhan.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gin").execute_if(dialect="postgresql"),
+)
@@ -39,6 +39,7 @@ class BaiHatBase(BaseModel):
     trang_thai: Optional[str] = "hoat_dong"
     quyen_rieng_tu: Optional[str] = "cong_khai"
     nguoi_dung_id: UUID4 = None
+    ma_bam: Optional[str] = None
     
 
 class BaiHatCreate(BaiHatBase):
@@ -0,0 +1,51 @@
+"""
+This module defines the Pydantic schemas for managing CongViec (background job) entities.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, UUID4, Field
+
+
+class CongViecCreate(BaseModel):
+    """
+    Schema for creating a new CongViec.
+    """
+
+    loai: str
+    du_lieu: Dict[str, Any] = Field(default_factory=dict)
+    so_lan_thu_toi_da: int = 5
+    thoi_gian_chay: Optional[datetime] = Field(default_factory=datetime.now)
+
+
+class CongViecOut(BaseModel):
+    """
+    Schema for outputting the status of a CongViec.
+    """
+
+    id: UUID4
+    loai: str
+    trang_thai: str
+    ket_qua: Optional[Dict[str, Any]] = None
+    loi: Optional[str] = None
+    so_lan_thu: int
+    so_lan_thu_toi_da: int
+    thoi_gian_chay: datetime
+    thoi_gian_tao: datetime
+    thoi_gian_cap_nhat: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CongViecUpdateDB(BaseModel):
+    """
+    Schema for updating a CongViec in the database.
+    """
+
+    trang_thai: Optional[str] = None
+    ket_qua: Optional[Dict[str, Any]] = None
+    loi: Optional[str] = None
+    so_lan_thu: Optional[int] = None
+    thoi_gian_chay: Optional[datetime] = None
+    thoi_gian_cap_nhat: Optional[datetime] = Field(default_factory=datetime.now)
@@ -13,7 +13,7 @@ It includes schemas for creating, updating, and outputting DanhSachPhatBaiHat in
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr, UUID4, Field
 
 
@@ -64,4 +64,27 @@ class DanhSachPhatBaiHatUpdateDB(BaseModel):
 
 
     
-    
\ No newline at end of file
+    
+
+class DiChuyenBaiHat(BaseModel):
+    """
+        Schema for moving a song of a playlist right after another one.
+    """
+    
+    danh_sach_phat_bai_hat_id: UUID4
+    # None moves the song to the top of the playlist
+    sau_id: Optional[UUID4] = None
+
+
+class ThaoTacBaiHat(BaseModel):
+    """
+        Schema for one operation of a bulk playlist mutation.
+        them needs bai_hat_id, xoa needs danh_sach_phat_bai_hat_id, di_chuyen needs
+        danh_sach_phat_bai_hat_id; sau_id places the song after that row (None means
+        the end for them and the top for di_chuyen).
+    """
+    
+    loai: Literal["them", "xoa", "di_chuyen"]
+    bai_hat_id: Optional[UUID4] = None
+    danh_sach_phat_bai_hat_id: Optional[UUID4] = None
+    sau_id: Optional[UUID4] = None
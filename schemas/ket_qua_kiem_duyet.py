@@ -0,0 +1,29 @@
+"""
+This module defines the Pydantic schemas for the cached moderation results of audio files.
+"""
+
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class KetQuaKiemDuyetCreate(BaseModel):
+    """
+    Schema for storing the moderation result of an audio file.
+    """
+
+    ma_bam: str
+    van_ban: Optional[str] = None
+    phu_hop: bool
+    ly_do: Optional[str] = None
+    thoi_gian_tao: Optional[datetime] = Field(default_factory=datetime.now)
+
+
+class KetQuaKiemDuyetUpdateDB(BaseModel):
+    """
+    Schema for updating a cached moderation result.
+    """
+
+    van_ban: Optional[str] = None
+    phu_hop: Optional[bool] = None
+    ly_do: Optional[str] = None
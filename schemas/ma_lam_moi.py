@@ -14,7 +14,7 @@ class MaLamMoiBase(BaseModel):
     Base schema for Refresh Token. It includes fields shared across different refresh token-related schemas.
 
     Attributes:
-        token (str): The refresh token.
+        ma_bam (bytes): The HMAC-SHA256 of the refresh token.
         expires_at (datetime): The expiration date and time of the token.
         created_at (Optional[datetime]): The date and time the token was created.
         revoked_at (Optional[datetime]): The date and time the token was revoked.
@@ -22,7 +22,7 @@ class MaLamMoiBase(BaseModel):
         is_revoked (bool): Flag indicating whether the token has been revoked, defaults to False.
     """
 
-    ma: str
+    ma_bam: bytes
     thoi_gian_het_han: datetime
     thoi_gian_tao: Optional[datetime] = None
     thoi_gian_thu_hoi: Optional[datetime] = None
@@ -35,7 +35,7 @@ class MaLamMoiCreate(MaLamMoiBase):
     Schema for creating a new Refresh Token.
 
     Attributes:
-        token (str): The refresh token.
+        ma_bam (bytes): The HMAC-SHA256 of the refresh token.
         expires_at (datetime): The expiration date and time of the token.
         nguoi_dung_id (UUID4): The ID of the associated nguoi_dung.
     """
@@ -69,7 +69,7 @@ class MaLamMoiInDB(BaseModel):
 
     Attributes:
         id (UUID4): The unique identifier of the refresh token.
-        token (str): The refresh token.
+        ma_bam (bytes): The HMAC-SHA256 of the refresh token.
         expires_at (datetime): The expiration date and time of the token.
         created_at (Optional[datetime]): The date and time the token was created.
         revoked_at (Optional[datetime]): The date and time the token was revoked.
@@ -78,7 +78,7 @@ class MaLamMoiInDB(BaseModel):
     """
 
     id: UUID4
-    ma: str
+    ma_bam: bytes
     thoi_gian_het_han: datetime
     thoi_gian_tao: Optional[datetime] = None
     thoi_gian_thu_hoi: Optional[datetime] = None
@@ -29,10 +29,14 @@ class ThongTinMaSchema(BaseModel):
     Attributes:
         nguoi_dung_id (Optional[str]): The ID of the nguoi_dung that the token belongs to.
         expires_at (Optional[DateTime]): The expiration date and time of the token.
+        thoi_gian_tao (Optional[DateTime]): When the token was issued.
+        jti (Optional[str]): The unique identifier of an access token.
     """
 
     nguoi_dung_id: Optional[str]
     thoi_gian_het_han: Optional[DateTime]
+    thoi_gian_tao: Optional[DateTime] = None
+    jti: Optional[str] = None
 
 
 class MaCreate(BaseModel):
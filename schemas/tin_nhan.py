@@ -14,7 +14,7 @@ class TinNhanBase(BaseModel):
     phong_nghe_nhac_id: UUID4 = None
     
 class TinNhanCreate(TinNhanBase):
-    thoi_gian_tao: Optional[datetime] = datetime.now()
+    thoi_gian_tao: Optional[datetime] = Field(default_factory=datetime.now)
     pass
 
 class TinNhanOut(TinNhanBase):
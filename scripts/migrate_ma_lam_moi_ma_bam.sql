@@ -0,0 +1,82 @@
+-- Migrate ma_lam_moi from the plain refresh token (ma) to its keyed digest (ma_bam).
+--
+-- init_db.py recreates the schema, so this is only for an existing database
+-- that must keep its sessions. Existing refresh tokens stay valid: ma_bam is
+-- computed in SQL exactly like utils.security.bam_ma_lam_moi, i.e.
+-- HMAC-SHA256(token) under REFRESH_TOKEN_HASH_KEY (SECRET_KEY when unset).
+--
+-- The digest is filled in batches of :batch_size rows (default 10000), each
+-- batch in its own transaction, so a large table is never locked for long and
+-- the old version of the app can keep running meanwhile; rows it inserts are
+-- caught by the final pass. The old version still writes ma, so replace it
+-- with the new one as soon as the script has finished.
+--
+-- Usage (PostgreSQL 11+, psql in autocommit mode):
+--
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -v key="$REFRESH_TOKEN_HASH_KEY" \
+--        [-v batch_size=50000] -f scripts/migrate_ma_lam_moi_ma_bam.sql
+--
+-- Optionally shrink the table first by purging revoked and expired rows:
+--
+--   DELETE FROM ma_lam_moi WHERE da_thu_hoi OR thoi_gian_het_han < now();
+
+\if :{?key}
+\else
+    \echo 'Set the HMAC key with -v key=... (REFRESH_TOKEN_HASH_KEY, or SECRET_KEY when unset)'
+    \quit
+\endif
+\if :{?batch_size}
+\else
+    \set batch_size 10000
+\endif
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+ALTER TABLE ma_lam_moi ADD COLUMN IF NOT EXISTS ma_bam bytea;
+
+-- psql variables are not expanded inside the DO body, pass them as settings
+SELECT set_config('migrate.key', :'key', false),
+       set_config('migrate.batch_size', :'batch_size', false);
+
+-- Fill ma_bam in primary key order, committing after every batch
+DO $$
+DECLARE
+    hmac_key text := current_setting('migrate.key');
+    batch_size int := current_setting('migrate.batch_size')::int;
+    last_id uuid := '00000000-0000-0000-0000-000000000000';
+    so_dong int;
+    tong bigint := 0;
+BEGIN
+    LOOP
+        WITH lo AS (
+            SELECT id FROM ma_lam_moi
+            WHERE id > last_id
+            ORDER BY id
+            LIMIT batch_size
+        ), cap_nhat AS (
+            UPDATE ma_lam_moi m
+            SET ma_bam = hmac(m.ma, hmac_key, 'sha256')
+            FROM lo
+            WHERE m.id = lo.id AND m.ma_bam IS NULL
+        )
+        SELECT count(*), max(id::text)::uuid INTO so_dong, last_id FROM lo;
+        EXIT WHEN so_dong = 0;
+        tong := tong + so_dong;
+        COMMIT;
+        RAISE NOTICE 'ma_lam_moi: % rows processed', tong;
+    END LOOP;
+END
+$$;
+
+-- Build the unique index without blocking writes; the constraint adopts it below
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ma_lam_moi_ma_bam_key ON ma_lam_moi (ma_bam);
+
+-- Final pass and schema change in one transaction. Rows inserted by the old
+-- app during the batches are hashed here.
+BEGIN;
+LOCK TABLE ma_lam_moi IN ACCESS EXCLUSIVE MODE;
+UPDATE ma_lam_moi SET ma_bam = hmac(ma, :'key', 'sha256') WHERE ma_bam IS NULL;
+ALTER TABLE ma_lam_moi ALTER COLUMN ma_bam SET NOT NULL;
+ALTER TABLE ma_lam_moi ADD CONSTRAINT ma_lam_moi_ma_bam_key UNIQUE USING INDEX ma_lam_moi_ma_bam_key;
+ALTER TABLE ma_lam_moi DROP COLUMN ma;
+COMMIT;
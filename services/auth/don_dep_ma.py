@@ -0,0 +1,89 @@
+"""
+This module purges dead refresh tokens in the background.
+
+Every login and refresh inserts a ma_lam_moi row and revokes older ones, so
+without purging the table only grows. Every REFRESH_TOKEN_PURGE_INTERVAL
+seconds expired and revoked rows are deleted in batches of
+REFRESH_TOKEN_PURGE_BATCH_SIZE, one short transaction per batch so logins are
+never blocked for long. Workers purging at the same time skip each other's rows.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config.config import settings
+from config.database.database import AsyncSessionLocal
+from services.crud.ma_lam_moi import crud_ma_lam_moi
+
+logger = logging.getLogger(__name__)
+
+
+class DonDepMaLamMoi:
+    """
+    Periodic batched purge of the ma_lam_moi table.
+
+    Attributes:
+        interval (float): Seconds between two purges.
+        batch_size (int): Rows deleted per transaction.
+        so_dong_da_xoa (int): Rows deleted by this worker since startup.
+        lan_cuoi (Optional[datetime]): When the last purge finished.
+    """
+
+    def __init__(self, interval: float, batch_size: int) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.so_dong_da_xoa = 0
+        self.lan_cuoi: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def don_dep(self) -> int:
+        """
+        Purge every dead token now.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        tong = 0
+        async with AsyncSessionLocal() as session:
+            while True:
+                so_dong = await crud_ma_lam_moi.don_dep(session, self.batch_size)
+                tong += so_dong
+                if so_dong < self.batch_size:
+                    break
+                # nhuong event loop giua cac lo
+                await asyncio.sleep(0)
+        self.so_dong_da_xoa += tong
+        self.lan_cuoi = datetime.now()
+        if tong:
+            logger.info("Purged %s expired or revoked lam_moi mas", tong)
+        return tong
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.don_dep()
+            except Exception as e:
+                logger.error("Unexpected error in lam_moi ma purge: %s", e)
+
+    async def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "so_dong_da_xoa": self.so_dong_da_xoa,
+            "lan_don_dep_cuoi": self.lan_cuoi.isoformat() if self.lan_cuoi else None,
+        }
+
+
+don_dep_ma_lam_moi = DonDepMaLamMoi(
+    settings.REFRESH_TOKEN_PURGE_INTERVAL, settings.REFRESH_TOKEN_PURGE_BATCH_SIZE
+)
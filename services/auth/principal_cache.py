@@ -0,0 +1,138 @@
+"""
+This module caches the verified principal of authenticated requests.
+
+Two bounded LRU caches sit in front of token verification and the user lookup:
+
+- decoded tokens, keyed by the SHA-256 digest of the token (never the token
+  itself), kept until the token's thoi_gian_het_han;
+- users, as the password-free dict returned by get_nguoi_dung_hien_tai, kept for
+  AUTH_USER_CACHE_TTL seconds.
+
+A user entry is dropped whenever crud_nguoi_dung.update changes the user (profile
+edits, password changes, admin status changes), here and on the other workers
+through the websocket backplane. Without a cross-process backplane another worker
+may serve the old row for at most AUTH_USER_CACHE_TTL seconds.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from config.config import settings
+from schemas.ma_xac_thuc import ThongTinMaSchema
+from services.websocket.manager import manager as connection_manager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backplane channel used to invalidate cached users on the other workers
+KENH_NGUOI_DUNG = "__nguoi_dung__"
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    A size-bounded LRU mapping whose entries also carry an expiry time.
+
+    Attributes:
+        max_size (int): The maximum number of entries.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, het_han = entry
+        if het_han <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: float) -> None:
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class PrincipalCache:
+    """
+    The process-wide token and user caches.
+    """
+
+    def __init__(self, token_cache_size: int, user_cache_size: int, user_ttl: float) -> None:
+        self.ma: LRUCache[ThongTinMaSchema] = LRUCache(token_cache_size)
+        self.nguoi_dung: LRUCache[Dict[str, Any]] = LRUCache(user_cache_size)
+        self.user_ttl = user_ttl
+        connection_manager.add_remote_listener(self._nhan_su_kien_tu_xa)
+
+    @staticmethod
+    def _khoa_ma(ma: str) -> bytes:
+        return hashlib.sha256(ma.encode()).digest()
+
+    def lay_ma(self, ma: str) -> Optional[ThongTinMaSchema]:
+        """
+        Return the cached payload of a token verified before, if it has not expired.
+        """
+        return self.ma.get(self._khoa_ma(ma))
+
+    def luu_ma(self, ma: str, thong_tin: ThongTinMaSchema) -> None:
+        """
+        Cache a verified token until its thoi_gian_het_han; tokens without one are not cached.
+        """
+        if thong_tin.thoi_gian_het_han is None:
+            return
+        het_han = thong_tin.thoi_gian_het_han
+        con_lai = (het_han - datetime.now(het_han.tzinfo)).total_seconds()
+        self.ma.set(self._khoa_ma(ma), thong_tin, con_lai)
+
+    def lay_nguoi_dung(self, nguoi_dung_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached user dict.
+        """
+        nguoi_dung = self.nguoi_dung.get(str(nguoi_dung_id))
+        return dict(nguoi_dung) if nguoi_dung is not None else None
+
+    def luu_nguoi_dung(self, nguoi_dung_id: Any, nguoi_dung: Dict[str, Any]) -> None:
+        self.nguoi_dung.set(str(nguoi_dung_id), dict(nguoi_dung), self.user_ttl)
+
+    async def xoa_nguoi_dung(self, nguoi_dung_id: Any) -> None:
+        """
+        Drop a user from the cache here and on the other workers.
+        """
+        self.nguoi_dung.pop(str(nguoi_dung_id))
+        try:
+            await connection_manager.backplane.publish(KENH_NGUOI_DUNG, {"id": str(nguoi_dung_id)})
+        except Exception as e:
+            logger.error("Error while publishing user invalidation: %s", str(e))
+
+    def _nhan_su_kien_tu_xa(self, room_id: str, data: Any) -> None:
+        if room_id == KENH_NGUOI_DUNG:
+            self.nguoi_dung.pop(data["id"])
+
+
+principal_cache = PrincipalCache(
+    settings.AUTH_TOKEN_CACHE_SIZE,
+    settings.AUTH_USER_CACHE_SIZE,
+    settings.AUTH_USER_CACHE_TTL,
+)
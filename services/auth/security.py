@@ -6,6 +6,7 @@ signing up a new nguoi_dung, logging out, and lam_moiing mas.
 
 import logging
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 from jose import jwt, JWTError
 from fastapi import status, HTTPException, Response
@@ -13,13 +14,15 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.config import settings
-from models.nguoi_dung import NguoiDung
-from schemas.ma_lam_moi import MaLamMoiSchema, MaLamMoiCreate, MaLamMoiUpdateDB
+from models.nguoi_dung import NguoiDung, MaLamMoi
+from schemas.ma_lam_moi import MaLamMoiSchema, MaLamMoiCreate
 from schemas.nguoi_dung import NguoiDungCreate
+from schemas.ma_xac_thuc import ThongTinMaSchema
 from schemas.auth import DangNhapSchema, DangKySchema, DangKyResponse, DangNhapResponse
 from services.crud.nguoi_dung import crud_nguoi_dung
 from services.crud.ma_lam_moi import crud_ma_lam_moi
-from utils.security import ma_hoa_mat_khau, xac_thuc_mat_khau
+from services.auth.token_denylist import token_denylist
+from utils.security import ma_hoa_mat_khau, xac_thuc_mat_khau_async, bam_ma_lam_moi, HashingBusyError
 
 # Constants
 ALGORITHM = "HS256"
@@ -32,13 +35,18 @@ def tao_ma_xac_thuc(nguoi_dung: NguoiDung) -> str:
     Create an access ma for a given nguoi_dung.
     """
     try:
-        expire = datetime.now() + timedelta(
+        now = datetime.now()
+        expire = now + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
         return jwt.encode(
             {
                 "nguoi_dung_id": str(nguoi_dung.id),
                 "thoi_gian_het_han": expire.isoformat(),
+                "thoi_gian_tao": now.isoformat(),
+                "jti": uuid4().hex,
+                # Claim chuan de jose tu kiem tra han
+                "exp": int(expire.timestamp()),
             },
             key=settings.SECRET_KEY,
             algorithm=ALGORITHM,
@@ -82,16 +90,7 @@ async def vo_hieu_hoa_toan_bo_ma_lam_moi_bang_nguoi_dung_id(
     Deactivate all lam_moi mas associated with a nguoi_dung.
     """
     try:
-        ma_lam_mois_of_nguoi_dung = await crud_ma_lam_moi.get_multi(
-            session, nguoi_dung_id=nguoi_dung_id
-        )
-        for rt in ma_lam_mois_of_nguoi_dung:
-            if rt.con_hieu_luc:
-                rt.da_thu_hoi = True
-                rt.thoi_gian_thu_hoi = datetime.now()
-                await crud_ma_lam_moi.update(
-                    session, db_obj=rt, obj_in=MaLamMoiUpdateDB(**rt.dict())
-                )
+        await crud_ma_lam_moi.thu_hoi_tat_ca(session, nguoi_dung_id)
     except Exception as e:
         logger.error("Error while deactivating lam_moi mas: %s", e)
         raise HTTPException(
@@ -124,7 +123,7 @@ async def dang_nhap_service(
         if (
             nguoi_dung is None
             or not nguoi_dung.mat_khau_ma_hoa
-            or not xac_thuc_mat_khau(
+            or not await xac_thuc_mat_khau_async(
                 dang_nhap_schema.mat_khau, nguoi_dung.mat_khau_ma_hoa
             )
         ):
@@ -138,6 +137,8 @@ async def dang_nhap_service(
         )
         return await tao_ma_xac_thuc_cho_nguoi_dung(session, nguoi_dung)
 
+    except HashingBusyError:
+        raise
     except Exception as e:
         logger.error("Error during authentication: %s", e)
         raise HTTPException(
@@ -157,7 +158,7 @@ async def tao_ma_xac_thuc_cho_nguoi_dung(
         ma_xac_thuc_data = giai_ma_ma(ma_xac_thuc)
 
         ma_lam_moi_data = {
-            "ma": ma_lam_moi,
+            "ma_bam": bam_ma_lam_moi(ma_lam_moi),
             "thoi_gian_het_han": giai_ma_ma(ma_lam_moi)["thoi_gian_het_han"],
             "nguoi_dung_id": nguoi_dung.id,
         }
@@ -193,9 +194,9 @@ async def lam_moi_ma_xac_thuc_service(
                 detail="Invalid or expired token",
             )
 
-        # Retrieve the refresh token from the database
+        # Retrieve the refresh token from the database by its digest
         ma_lam_moi_in_db = await crud_ma_lam_moi.get(
-            session, ma=ma_lam_moi_schema.ma_lam_moi
+            session, ma_bam=bam_ma_lam_moi(ma_lam_moi_schema.ma_lam_moi)
         )
         if not ma_lam_moi_in_db:
             raise HTTPException(
@@ -219,8 +220,13 @@ async def lam_moi_ma_xac_thuc_service(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
 
-        # Revoke the existing refresh token before issuing a new one
-        await thu_hoi_ma_lam_moi(session, ma_lam_moi_in_db)
+        # Revoke the existing refresh token before issuing a new one; only one
+        # of several concurrent refreshes with the same token may succeed
+        if not await thu_hoi_ma_lam_moi(session, ma_lam_moi_in_db):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="This token has been revoked",
+            )
 
         # Generate and return new access and refresh tokens for the user
         return await tao_ma_xac_thuc_cho_nguoi_dung(session, nguoi_dung)
@@ -238,17 +244,16 @@ async def lam_moi_ma_xac_thuc_service(
 
 
 async def thu_hoi_ma_lam_moi(
-    session: AsyncSession, ma_lam_moi: MaLamMoiUpdateDB
-) -> None:
+    session: AsyncSession, ma_lam_moi: MaLamMoi
+) -> bool:
     """
     Revoke the given lam_moi ma.
+
+    Returns:
+        bool: False if the ma had already been revoked by a concurrent request.
     """
     try:
-        ma_lam_moi.da_thu_hoi = True
-        ma_lam_moi.thoi_gian_thu_hoi = datetime.now()
-        await crud_ma_lam_moi.update(
-            session, db_obj=ma_lam_moi, obj_in=MaLamMoiUpdateDB(**ma_lam_moi.dict())
-        )
+        return await crud_ma_lam_moi.thu_hoi(session, ma_lam_moi.id)
     except Exception as e:
         logger.error("Error while revoking lam_moi ma: %s", e)
         raise HTTPException(
@@ -292,9 +297,9 @@ async def dang_ky_service(
         nguoi_dung_create_with_out_password.pop("mat_khau_ma_hoa")
         return DangKyResponse(**nguoi_dung_create_with_out_password)
 
-    except HTTPException as http_exc:
+    except (HTTPException, HashingBusyError):
         # Re-raise known HTTP exceptions
-        raise http_exc
+        raise
     except Exception as e:
         # Log unexpected errors for diagnostics
         logger.error("Unexpected error during user registration: %s", str(e))
@@ -304,12 +309,15 @@ async def dang_ky_service(
         )
 
 
-async def dang_xuat_service(session: AsyncSession, nguoi_dung_id: str) -> Response:
+async def dang_xuat_service(session: AsyncSession, thong_tin_ma: ThongTinMaSchema) -> Response:
     """
-    Log out a nguoi_dung by deactivating all lam_moi mas.
+    Log out a nguoi_dung by deactivating all lam_moi mas and revoking the access mas
+    issued so far, the presented one included.
     """
     try:
-        await vo_hieu_hoa_toan_bo_ma_lam_moi_bang_nguoi_dung_id(session, nguoi_dung_id)
+        await vo_hieu_hoa_toan_bo_ma_lam_moi_bang_nguoi_dung_id(session, thong_tin_ma.nguoi_dung_id)
+        await token_denylist.thu_hoi_nguoi_dung(thong_tin_ma.nguoi_dung_id)
+        await token_denylist.thu_hoi_ma(thong_tin_ma)
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"detail": "Logged out successfully"},
@@ -0,0 +1,163 @@
+"""
+This module keeps the revoked access tokens in memory.
+
+Access tokens are stateless JWTs, so revoking the refresh tokens on logout
+leaves the access token usable until it expires. Checking a table on every
+request would cost a query, so revocations are kept here instead, in two
+compact structures checked in O(1):
+
+- a per-user watermark: every token of the user issued before it is revoked
+  (logout closes every session of the user, like it does for refresh tokens);
+- a bloom filter of revoked jti values, for revoking a single token.
+
+api.deps.giai_ma rejects expired tokens and tokens whose expiry lies more than
+ACCESS_TOKEN_EXPIRE_MINUTES (plus DO_LECH_DONG_HO of clock skew) ahead, so no
+accepted token outlives that lifetime and neither structure needs to remember
+anything longer: the bloom filter has two generations rotated every lifetime
+and old watermarks are dropped at rotation time. A bloom filter false positive
+rejects a valid token (the client logs in again), with probability
+ACCESS_TOKEN_DENYLIST_ERROR_RATE.
+
+Revocations are published on the websocket backplane and applied by the other
+workers. They are not persisted: a worker that restarts accepts the tokens
+revoked before its start until they expire.
+"""
+
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from config.config import settings
+from schemas.ma_xac_thuc import ThongTinMaSchema
+from services.websocket.manager import manager as connection_manager
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backplane channel used to share revocations with the other workers
+KENH_THU_HOI_MA = "__thu_hoi_ma__"
+
+# Seconds of clock skew between workers tolerated on token expiry
+DO_LECH_DONG_HO = 60
+
+
+class BloomFilter:
+    """
+    A fixed-size bloom filter of strings.
+
+    Attributes:
+        so_bit (int): The number of bits.
+        so_ham (int): The number of hash functions.
+    """
+
+    def __init__(self, suc_chua: int, ty_le_loi: float) -> None:
+        suc_chua = max(suc_chua, 1)
+        self.so_bit = max(8, math.ceil(-suc_chua * math.log(ty_le_loi) / math.log(2) ** 2))
+        self.so_ham = max(1, round(self.so_bit / suc_chua * math.log(2)))
+        self._bits = bytearray((self.so_bit + 7) // 8)
+
+    def _vi_tri(self, gia_tri: str):
+        # double hashing: h1 + i * h2
+        digest = hashlib.blake2b(gia_tri.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.so_ham):
+            yield (h1 + i * h2) % self.so_bit
+
+    def them(self, gia_tri: str) -> None:
+        for vi_tri in self._vi_tri(gia_tri):
+            self._bits[vi_tri >> 3] |= 1 << (vi_tri & 7)
+
+    def __contains__(self, gia_tri: str) -> bool:
+        return all(self._bits[vi_tri >> 3] & (1 << (vi_tri & 7)) for vi_tri in self._vi_tri(gia_tri))
+
+
+class TokenDenylist:
+    """
+    The process-wide set of revoked access tokens.
+
+    Attributes:
+        thoi_gian_song (float): Seconds a revocation is kept (the access token lifetime plus clock skew).
+    """
+
+    def __init__(self, suc_chua: int, ty_le_loi: float, thoi_gian_song: float) -> None:
+        self.suc_chua = suc_chua
+        self.ty_le_loi = ty_le_loi
+        self.thoi_gian_song = thoi_gian_song
+        self._jti = BloomFilter(suc_chua, ty_le_loi)
+        self._jti_cu = BloomFilter(suc_chua, ty_le_loi)
+        self._xoay_luc = time.monotonic() + thoi_gian_song
+        self._moc: Dict[str, datetime] = {}
+        connection_manager.add_remote_listener(self._nhan_su_kien_tu_xa)
+
+    def _xoay(self) -> None:
+        if time.monotonic() < self._xoay_luc:
+            return
+        self._jti_cu, self._jti = self._jti, BloomFilter(self.suc_chua, self.ty_le_loi)
+        self._xoay_luc = time.monotonic() + self.thoi_gian_song
+        het_han = datetime.now() - timedelta(seconds=self.thoi_gian_song)
+        self._moc = {k: v for k, v in self._moc.items() if v > het_han}
+
+    def da_thu_hoi(self, thong_tin: ThongTinMaSchema) -> bool:
+        """
+        Check whether a verified access token has been revoked.
+
+        Tokens without thoi_gian_tao (issued before revocation existed) are
+        revoked by any watermark of their user; they expire within one lifetime,
+        before the watermark can be dropped.
+        """
+        self._xoay()
+        moc = self._moc.get(str(thong_tin.nguoi_dung_id))
+        if moc is not None and (thong_tin.thoi_gian_tao is None or thong_tin.thoi_gian_tao < moc):
+            return True
+        return thong_tin.jti is not None and (thong_tin.jti in self._jti or thong_tin.jti in self._jti_cu)
+
+    def _dat_moc(self, nguoi_dung_id: str, moc: datetime) -> None:
+        self._xoay()
+        if moc > self._moc.get(nguoi_dung_id, datetime.min):
+            self._moc[nguoi_dung_id] = moc
+
+    def _them_jti(self, jti: str) -> None:
+        self._xoay()
+        self._jti.them(jti)
+
+    async def thu_hoi_nguoi_dung(self, nguoi_dung_id: Any, moc: Optional[datetime] = None) -> None:
+        """
+        Revoke every access token of a nguoi_dung issued before moc (default: now), on all workers.
+        """
+        moc = moc or datetime.now()
+        self._dat_moc(str(nguoi_dung_id), moc)
+        await self._phat({"nguoi_dung_id": str(nguoi_dung_id), "moc": moc.isoformat()})
+
+    async def thu_hoi_ma(self, thong_tin: ThongTinMaSchema) -> None:
+        """
+        Revoke a single access token by its jti, on all workers.
+        """
+        if thong_tin.jti is None:
+            return
+        self._them_jti(thong_tin.jti)
+        await self._phat({"jti": thong_tin.jti})
+
+    async def _phat(self, data: Dict[str, Any]) -> None:
+        try:
+            await connection_manager.backplane.publish(KENH_THU_HOI_MA, data)
+        except Exception as e:
+            logger.error("Error while publishing token revocation: %s", str(e))
+
+    def _nhan_su_kien_tu_xa(self, room_id: str, data: Any) -> None:
+        if room_id != KENH_THU_HOI_MA:
+            return
+        if "jti" in data:
+            self._them_jti(data["jti"])
+        else:
+            self._dat_moc(data["nguoi_dung_id"], datetime.fromisoformat(data["moc"]))
+
+
+token_denylist = TokenDenylist(
+    settings.ACCESS_TOKEN_DENYLIST_SIZE,
+    settings.ACCESS_TOKEN_DENYLIST_ERROR_RATE,
+    settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + DO_LECH_DONG_HO,
+)
@@ -1,12 +1,174 @@
 """
 This module defines CRUD operations for the BaiHat model.
 It utilizes the base CRUD functionality provided by CRUDBase to
-create, update, and read BaiHat entities.
+create, update, and read BaiHat entities, and adds ranked,
+accent-insensitive full-text search.
 """
 
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, or_, literal, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
 from models.bai_hat import BaiHat
 from schemas.bai_hat import BaiHatCreate, BaiHatUpdateDB
-from services.crud.base import CRUDBase
+from config.config import settings
+from services.crud.base import CRUDBase, ListSpec, encode_cursor, decode_cursor
+from utils.text import bo_dau, tao_tsquery
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# tsvector weight of each full-text field
+TRONG_SO = {"ten_bai_hat": "A", "ten_ca_si": "B", "loi_bai_hat": "C"}
+
+# Only songs in this status passed moderation and are shown to everyone
+TRANG_THAI_CONG_KHAI = "hoat_dong"
+
+
+class CRUDBaiHat(CRUDBase[BaiHat, BaiHatCreate, BaiHatUpdateDB]):
+    """
+    CRUD operations for the BaiHat model.
+    """
+
+    @staticmethod
+    def dieu_kien_xem(nguoi_dung: Optional[Dict[str, Any]]):
+        """
+        Build the filter of the songs a nguoi_dung may see.
+
+        Published songs are visible to everyone; pending ("cho_duyet") and rejected
+        ("bi_tu_choi") songs only to their uploader and to admins.
+
+        Parameters:
+            nguoi_dung (Optional[Dict[str, Any]]): The current nguoi_dung, None if anonymous.
+        """
+        if nguoi_dung is None:
+            return BaiHat.trang_thai == TRANG_THAI_CONG_KHAI
+        if nguoi_dung.get("quyen") == "quan_tri_vien":
+            return true()
+        return or_(BaiHat.trang_thai == TRANG_THAI_CONG_KHAI, BaiHat.nguoi_dung_id == nguoi_dung["id"])
+
+    @staticmethod
+    def co_the_xem(bai_hat: BaiHat, nguoi_dung: Optional[Dict[str, Any]]) -> bool:
+        """
+        Python counterpart of dieu_kien_xem for a loaded song.
+        """
+        if bai_hat.trang_thai == TRANG_THAI_CONG_KHAI:
+            return True
+        if nguoi_dung is None:
+            return False
+        return nguoi_dung.get("quyen") == "quan_tri_vien" or (
+            bai_hat.nguoi_dung_id is not None and str(bai_hat.nguoi_dung_id) == str(nguoi_dung["id"])
+        )
+
+    async def tim_kiem(
+        self,
+        session: AsyncSession,
+        *where,
+        q: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        **filters: str,
+    ) -> Tuple[List[BaiHat], Optional[str]]:
+        """
+        Search songs, best matches first.
+
+        q is matched against ten_bai_hat, ten_ca_si and loi_bai_hat through the
+        tsvector index (title hits rank highest) and, to tolerate typos, against the
+        title and artist with trigram similarity. Field filters on ten_bai_hat,
+        ten_ca_si and loi_bai_hat only match that field; other filters fall back to
+        the LIKE search of CRUDBase. Matching ignores Vietnamese accents. Relevance has
+        no stable key, so the cursor of this search carries the position of the next page.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            where: Extra filter clauses, e.g. dieu_kien_xem.
+            q (Optional[str]): Free text query.
+            offset (int): The number of records to skip.
+            limit (int): The maximum number of records, capped by MAX_PAGE_SIZE.
+            cursor (Optional[str]): The cursor returned with the previous page.
+            filters (str): Field filters.
+
+        Returns:
+            Tuple[List[BaiHat], Optional[str]]: The matching songs ordered by relevance and the next cursor.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        if cursor:
+            offset = int(decode_cursor(cursor)[0])
+        truy_van_q = None
+        if q:
+            truy_van_q = tao_tsquery(q)
+            if truy_van_q is None:
+                return [], None
+        truy_van_truongs = []
+        for key in [key for key in filters if key in TRONG_SO]:
+            truy_van = tao_tsquery(filters.pop(key), TRONG_SO[key])
+            if truy_van is None:
+                return [], None
+            truy_van_truongs.append(truy_van)
+
+        query = select(BaiHat).filter(*where)
+        for key, value in filters.items():
+            query = query.filter(func.lower(getattr(BaiHat, key)).like(f"%{value.lower()}%"))
+
+        diem = None
+        if truy_van_truongs:
+            tsquery = func.to_tsquery("simple", " & ".join(truy_van_truongs))
+            query = query.filter(BaiHat.tim_kiem.op("@@")(tsquery))
+            diem = func.ts_rank(BaiHat.tim_kiem, tsquery)
+        if truy_van_q:
+            tsquery = func.to_tsquery("simple", truy_van_q)
+            q_khong_dau = bo_dau(q)
+            query = query.filter(
+                or_(
+                    BaiHat.tim_kiem.op("@@")(tsquery),
+                    BaiHat.ten_khong_dau.op("%")(q_khong_dau),
+                )
+            )
+            diem_q = func.ts_rank(BaiHat.tim_kiem, tsquery) + func.similarity(
+                BaiHat.ten_khong_dau, literal(q_khong_dau)
+            )
+            diem = diem_q if diem is None else diem + diem_q
+        if diem is not None:
+            query = query.order_by(diem.desc(), BaiHat.id)
+        else:
+            query = query.order_by(BaiHat.id)
+
+        try:
+            result = await session.execute(query.offset(offset).limit(limit + 1))
+            bai_hats = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error("Error while searching songs: %s", str(e))
+            return [], None
+        if len(bai_hats) > limit:
+            return bai_hats[:limit], encode_cursor([offset + limit])
+        return bai_hats, None
+
+
+crud_bai_hat = CRUDBaiHat(
+    BaiHat,
+    sort_key="ten_bai_hat",
+    null_sort_values={"ten_ca_si": "", "the_loai": "", "thoi_luong": 0},
+)
 
-CRUDBaiHat = CRUDBase[BaiHat, BaiHatCreate, BaiHatUpdateDB]
-crud_bai_hat = CRUDBaiHat(BaiHat)
+# Sorting and filtering accepted by the song listing
+bai_hat_list_spec = ListSpec(
+    sort_fields=["ten_bai_hat", "ten_ca_si", "the_loai", "thoi_luong", "thoi_gian_tao"],
+    default_sort="ten_bai_hat",
+    filters={
+        "the_loai": ("the_loai", "eq"),
+        "ten_ca_si": ("ten_ca_si", "eq"),
+        "trang_thai": ("trang_thai", "eq"),
+        "quyen_rieng_tu": ("quyen_rieng_tu", "eq"),
+        "thoi_luong_tu": ("thoi_luong", "gte"),
+        "thoi_luong_den": ("thoi_luong", "lte"),
+        "tao_tu": ("thoi_gian_tao", "gte"),
+        "tao_den": ("thoi_gian_tao", "lte"),
+    },
+)
@@ -4,14 +4,19 @@ The CRUDBase class contains generic methods for common database operations
 like create, read, update, delete, and search.
 """
 
+import base64
+import json
 import logging
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import uuid
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_, literal, Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
+from config.config import settings
+
 # Type definitions
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -21,24 +26,202 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 logger = logging.getLogger(__name__)
 
 
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor.
+
+    Parameters:
+        values (Sequence[Any]): The sort key values, id last.
+
+    Returns:
+        str: A URL-safe cursor.
+    """
+    data = [v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, uuid.UUID) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Optional[Sequence[Any]] = None) -> List[Any]:
+    """
+    Decode a cursor made by encode_cursor back into typed sort key values.
+
+    Parameters:
+        cursor (str): The cursor.
+        columns (Optional[Sequence[Any]]): The sort key columns, used to restore value types;
+            None returns the raw JSON values.
+
+    Returns:
+        List[Any]: The sort key values.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the sort key.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, list) or (columns is not None and len(data) != len(columns)):
+        raise ValueError("Invalid cursor")
+    if columns is None:
+        return data
+    return [_coerce(column, value) for column, value in zip(columns, data)]
+
+
+def _coerce(column: Any, value: Any) -> Any:
+    python_type = column.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+class ListSpec:
+    """
+    Declarative description of how a list endpoint may be sorted and filtered.
+
+    Both are translated into SQL, so ordering holds across pages and filtered rows
+    are never fetched.
+
+    Attributes:
+        sort_fields (Sequence[str]): The columns a client may sort by.
+        default_sort (str): The sort used when the client gives none ("-field" for descending).
+        filters (Dict[str, Tuple[str, str]]): Query parameter -> (column, operator), the
+            operator being "eq", "like", "gte" or "lte".
+    """
+
+    def __init__(
+        self,
+        sort_fields: Sequence[str],
+        default_sort: str,
+        filters: Optional[Dict[str, Tuple[str, str]]] = None,
+    ) -> None:
+        self.sort_fields = tuple(sort_fields)
+        self.default_sort = default_sort
+        self.filters = filters or {}
+
+    def sort(self, value: Optional[str]) -> Tuple[str, bool]:
+        """
+        Parse a sort parameter such as "ten_ca_si" or "-thoi_gian_tao".
+
+        Returns:
+            Tuple[str, bool]: The column and whether the order is descending.
+
+        Raises:
+            ValueError: If the column may not be sorted by.
+        """
+        value = value or self.default_sort
+        descending = value.startswith("-")
+        field = value.lstrip("-")
+        if field not in self.sort_fields:
+            raise ValueError(f"Cannot sort by {field}")
+        return field, descending
+
+    def where(self, model: Type[Any], params: Dict[str, Any]) -> List[Any]:
+        """
+        Build SQL filter clauses from the query parameters the spec knows about.
+
+        Parameters:
+            model (Type[Any]): The SQLAlchemy model.
+            params (Dict[str, Any]): The query parameters; unknown ones are ignored.
+
+        Returns:
+            List[Any]: The filter clauses.
+        """
+        clauses = []
+        for param, (field, operator) in self.filters.items():
+            value = params.get(param)
+            if value is None or value == "":
+                continue
+            column = getattr(model, field)
+            if operator == "like":
+                clauses.append(func.lower(column).like(f"%{str(value).lower()}%"))
+                continue
+            value = _coerce(column, value)
+            if operator == "gte":
+                clauses.append(column >= value)
+            elif operator == "lte":
+                clauses.append(column <= value)
+            else:
+                clauses.append(column == value)
+        return clauses
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     CRUDBase is a generic class for handling common CRUD operations in a database.
 
     Attributes:
         _model (Type[ModelType]): The SQLAlchemy model representing the database table.
+        _sort_key (Optional[str]): The column pages are ordered by (id breaks ties); None orders by id.
+        _null_sort_values (Dict[str, Any]): For nullable sort columns, the value NULL sorts as, so
+            keyset comparisons never meet NULL. Indexes on these columns are on coalesce(column, value).
 
     Methods:
         create: Create a new record.
         get: Retrieve a record by filtering.
         get_multi: Retrieve multiple records with pagination.
+        get_many_by_ids: Retrieve many records by primary key in a single query.
+        get_page: Retrieve one page of records with an opaque cursor (keyset pagination).
+        search_page: Search records one page at a time with an opaque cursor.
         update: Update a record with the provided data.
         delete: Delete a record.
         search: Search for records based on the provided filters.
     """
 
-    def __init__(self, model: Type[ModelType]) -> None:
+    def __init__(
+        self,
+        model: Type[ModelType],
+        sort_key: Optional[str] = None,
+        null_sort_values: Optional[Dict[str, Any]] = None,
+    ) -> None:
         self._model = model
+        self._sort_key = sort_key
+        self._null_sort_values = null_sort_values or {}
+
+    def _sort_columns(self, order_by: Optional[str] = None) -> List[Any]:
+        key = order_by or self._sort_key
+        columns = [getattr(self._model, key)] if key and key != "id" else []
+        return columns + [self._model.id]
+
+    def _sort_expression(self, column: Any) -> Any:
+        if column.key in self._null_sort_values:
+            # Rendered inline so the expression matches the index on coalesce(column, value)
+            return func.coalesce(column, literal(self._null_sort_values[column.key], literal_execute=True))
+        return column
+
+    def _sort_value(self, row: ModelType, column: Any) -> Any:
+        value = getattr(row, column.key)
+        return self._null_sort_values.get(column.key) if value is None else value
+
+    async def _paginate(
+        self,
+        session: AsyncSession,
+        query: Select,
+        *,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        columns = self._sort_columns(order_by)
+        expressions = [self._sort_expression(c) for c in columns]
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        if cursor:
+            key = tuple_(*expressions)
+            values = tuple_(*decode_cursor(cursor, columns))
+            query = query.filter(key < values if descending else key > values)
+        elif offset:
+            query = query.offset(offset)
+        query = query.order_by(*[e.desc() if descending else e.asc() for e in expressions])
+        # One extra row tells whether there is a next page
+        result = await session.execute(query.limit(limit + 1))
+        rows = result.scalars().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([self._sort_value(rows[-1], c) for c in columns])
+        return rows, next_cursor
 
     async def create(
         self, session: AsyncSession, obj_in: CreateSchemaType
@@ -150,6 +333,75 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             logger.error("Error while retrieving multiple records: %s", str(e))
             return []
 
+    async def get_many_by_ids(
+        self, session: AsyncSession, ids: Iterable[Any]
+    ) -> Dict[str, ModelType]:
+        """
+        Retrieve many records by ID with a single IN query.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            ids (Iterable[Any]): The IDs to load, duplicates and None are ignored.
+
+        Returns:
+            Dict[str, ModelType]: The found records keyed by str(id); missing IDs are absent.
+        """
+        unique_ids = list({str(id): id for id in ids if id is not None}.values())
+        if not unique_ids:
+            return {}
+        try:
+            result = await session.execute(
+                select(self._model).filter(self._model.id.in_(unique_ids))
+            )
+            return {str(db_obj.id): db_obj for db_obj in result.scalars().all()}
+        except SQLAlchemyError as e:
+            logger.error("Error while retrieving records by ids: %s", str(e))
+            return {}
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        *args,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        **kwargs,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Retrieve one page of records in a stable order.
+
+        Records are ordered by (sort key, id). Pass the returned cursor to get the next
+        page; deep pages cost the same as the first because no rows are skipped.
+        offset is still honoured when no cursor is given.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            args: Optional SQLAlchemy filter arguments.
+            cursor (Optional[str]): The cursor returned with the previous page.
+            offset (int): The number of records to skip, only without cursor.
+            limit (int): The maximum number of records, capped by MAX_PAGE_SIZE.
+            order_by (Optional[str]): Column to order by instead of the declared sort key.
+            descending (bool): Order from the largest key.
+            kwargs: Filter conditions.
+
+        Returns:
+            Tuple[List[ModelType], Optional[str]]: The records and the next cursor (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        query = select(self._model).filter(*args).filter_by(**kwargs)
+        try:
+            return await self._paginate(
+                session, query, cursor=cursor, offset=offset, limit=limit,
+                order_by=order_by, descending=descending,
+            )
+        except SQLAlchemyError as e:
+            logger.error("Error while retrieving a page of records: %s", str(e))
+            return [], None
+
     async def update(
         self,
         session: AsyncSession,
@@ -220,6 +472,14 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             logger.error("Error while deleting record: %s", str(e))
             return None
 
+    def _search_query(self, *args, **kwargs) -> Select:
+        query = select(self._model).filter(*args)
+        for key, value in kwargs.items():
+            query = query.filter(
+                func.lower(getattr(self._model, key)).like(f"%{value.lower()}%")
+            )
+        return query
+
     async def search(
         self, session: AsyncSession, offset: int = 0, limit: int = 100, **kwargs
     ) -> List[ModelType]:
@@ -236,11 +496,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             List[ModelType]: A list of records that match the search criteria.
         """
         try:
-            query = select(self._model)
-            for key, value in kwargs.items():
-                query = query.filter(
-                    func.lower(getattr(self._model, key)).like(f"%{value.lower()}%")
-                )
+            query = self._search_query(**kwargs)
 
             query = query.offset(offset).limit(limit)
             result = await session.execute(query)
@@ -248,3 +504,37 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         except SQLAlchemyError as e:
             logger.error("Error while searching records: %s", str(e))
             return []
+
+    async def search_page(
+        self,
+        session: AsyncSession,
+        *args,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        **kwargs,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Search for records using filters, one page at a time.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            args: Optional SQLAlchemy filter arguments.
+            cursor (Optional[str]): The cursor returned with the previous page.
+            offset (int): The number of records to skip, only without cursor.
+            limit (int): The maximum number of records, capped by MAX_PAGE_SIZE.
+            kwargs: Filters to apply for the search.
+
+        Returns:
+            Tuple[List[ModelType], Optional[str]]: The records and the next cursor (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        try:
+            return await self._paginate(
+                session, self._search_query(*args, **kwargs), cursor=cursor, offset=offset, limit=limit
+            )
+        except SQLAlchemyError as e:
+            logger.error("Error while searching records: %s", str(e))
+            return [], None
@@ -0,0 +1,166 @@
+"""
+This module defines CRUD operations for the CongViec (background job) model.
+Besides the base operations it claims due jobs for a worker with
+FOR UPDATE SKIP LOCKED, so any number of workers and processes can share
+the table, extends the lease of a running attempt and records its outcome.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.cong_viec import CongViec
+from schemas.cong_viec import CongViecCreate, CongViecUpdateDB
+from services.crud.base import CRUDBase
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class CRUDCongViec(CRUDBase[CongViec, CongViecCreate, CongViecUpdateDB]):
+    """
+    CRUD operations for the CongViec model.
+    """
+
+    async def lay_viec(self, session: AsyncSession, so_luong: int, thoi_gian_thue: float) -> List[CongViec]:
+        """
+        Claim up to so_luong due jobs.
+
+        A claimed job is marked dang_xu_ly with a lease of thoi_gian_thue seconds and
+        its attempt counter is incremented. Jobs whose lease expired (their worker
+        died) are due again. Rows locked by another worker are skipped.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            so_luong (int): The maximum number of jobs to claim.
+            thoi_gian_thue (float): The lease in seconds.
+
+        Returns:
+            List[CongViec]: The claimed jobs.
+        """
+        now = datetime.now()
+        den_han = (
+            select(CongViec.id)
+            .where(
+                CongViec.trang_thai.in_(["cho_xu_ly", "dang_xu_ly"]),
+                CongViec.thoi_gian_chay <= now,
+            )
+            .order_by(CongViec.thoi_gian_chay)
+            .limit(so_luong)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            update(CongViec)
+            .where(CongViec.id.in_(den_han.scalar_subquery()))
+            .values(
+                trang_thai="dang_xu_ly",
+                so_lan_thu=CongViec.so_lan_thu + 1,
+                thoi_gian_chay=now + timedelta(seconds=thoi_gian_thue),
+                thoi_gian_cap_nhat=now,
+            )
+            .returning(CongViec)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await session.scalars(query)
+            cong_viecs = result.all()
+            await session.commit()
+            return cong_viecs
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error("Error while claiming jobs: %s", str(e))
+            return []
+
+    async def gia_han(
+        self, session: AsyncSession, cong_viec_id: Any, so_lan_thu: int, thoi_gian_thue: float
+    ) -> bool:
+        """
+        Extend the lease of a running attempt by thoi_gian_thue seconds.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            cong_viec_id (Any): The ID of the job.
+            so_lan_thu (int): The attempt that holds the lease.
+            thoi_gian_thue (float): The new lease in seconds.
+
+        Returns:
+            bool: False if the attempt no longer holds the lease.
+        """
+        now = datetime.now()
+        query = (
+            update(CongViec)
+            .where(
+                CongViec.id == cong_viec_id,
+                CongViec.so_lan_thu == so_lan_thu,
+                CongViec.trang_thai == "dang_xu_ly",
+            )
+            .values(thoi_gian_chay=now + timedelta(seconds=thoi_gian_thue), thoi_gian_cap_nhat=now)
+        )
+        try:
+            result = await session.execute(query)
+            await session.commit()
+            return result.rowcount > 0
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error("Error while extending the lease of job %s: %s", cong_viec_id, str(e))
+            return True
+
+    async def ket_thuc(
+        self,
+        session: AsyncSession,
+        cong_viec_id: Any,
+        so_lan_thu: int,
+        trang_thai: str,
+        ket_qua: Optional[Dict[str, Any]] = None,
+        loi: Optional[str] = None,
+        thu_lai_sau: float = 0,
+    ) -> None:
+        """
+        Record the outcome of an attempt.
+
+        Nothing is written unless the attempt still holds the lease: once it expired
+        and another worker claimed the job again, so_lan_thu has moved on and the
+        stale attempt must not overwrite the new one.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            cong_viec_id (Any): The ID of the job.
+            so_lan_thu (int): The attempt whose outcome this is.
+            trang_thai (str): "hoan_thanh", "that_bai", or "cho_xu_ly" to retry.
+            ket_qua (Optional[Dict[str, Any]]): The result of a finished job.
+            loi (Optional[str]): The error of a failed attempt.
+            thu_lai_sau (float): Seconds before a retried job is due.
+        """
+        now = datetime.now()
+        values = {"trang_thai": trang_thai, "loi": loi, "thoi_gian_cap_nhat": now}
+        if ket_qua is not None:
+            values["ket_qua"] = ket_qua
+        if trang_thai == "cho_xu_ly":
+            values["thoi_gian_chay"] = now + timedelta(seconds=thu_lai_sau)
+        query = (
+            update(CongViec)
+            .where(
+                CongViec.id == cong_viec_id,
+                CongViec.so_lan_thu == so_lan_thu,
+                CongViec.trang_thai == "dang_xu_ly",
+            )
+            .values(**values)
+        )
+        try:
+            result = await session.execute(query)
+            await session.commit()
+            if result.rowcount == 0:
+                logger.warning(
+                    "Job %s attempt %s lost its lease, outcome %s discarded", cong_viec_id, so_lan_thu, trang_thai
+                )
+        except SQLAlchemyError as e:
+            await session.rollback()
+            # The lease expires and the job is picked up again
+            logger.error("Error while recording job %s outcome: %s", cong_viec_id, str(e))
+
+
+crud_cong_viec = CRUDCongViec(CongViec)
@@ -9,4 +9,4 @@ from schemas.danh_sach_phat import DanhSachPhatCreate, DanhSachPhatUpdateDB
 from services.crud.base import CRUDBase
 
 CRUDDanhSachPhat = CRUDBase[DanhSachPhat, DanhSachPhatCreate, DanhSachPhatUpdateDB]
-crud_danh_sach_phat = CRUDDanhSachPhat(DanhSachPhat)
+crud_danh_sach_phat = CRUDDanhSachPhat(DanhSachPhat, sort_key="ten_danh_sach_phat")
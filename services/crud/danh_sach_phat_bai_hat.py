@@ -1,12 +1,333 @@
 """
 This module defines CRUD operations for the DanhSachPhatBaiHat model.
 It utilizes the base CRUD functionality provided by CRUDBase to
-create, update, and read DanhSachPhatBaiHat entities.
+create, update, and read DanhSachPhatBaiHat entities, and adds the
+ordered, joined listing of the songs of a playlist.
+
+so_thu_tu is a sparse ordering key: songs are spaced KHOANG_CACH apart and a
+moved song takes the midpoint of its new neighbours, so a reorder writes one
+row. The 1-based position shown to clients is computed when reading. When two
+neighbours have no key left between them the playlist is renumbered with a
+single UPDATE, and small gaps are rebalanced in the background.
 """
 
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, tuple_, func, update, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from config.database.database import AsyncSessionLocal
+from models.bai_hat import BaiHat
 from models.danh_sach_phat_bai_hat import DanhSachPhatBaiHat
 from schemas.danh_sach_phat_bai_hat import DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB
 from services.crud.base import CRUDBase
 
-CRUDDanhSachPhatBaiHat = CRUDBase[DanhSachPhatBaiHat, DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB]
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Spacing between the ordering keys of neighbouring songs after a rebalance
+KHOANG_CACH = 1024
+# Gap below which a playlist is rebalanced in the background
+KHOANG_CACH_TOI_THIEU = 8
+
+
+class CRUDDanhSachPhatBaiHat(CRUDBase[DanhSachPhatBaiHat, DanhSachPhatBaiHatCreate, DanhSachPhatBaiHatUpdateDB]):
+    """
+    CRUD operations for the DanhSachPhatBaiHat model.
+    """
+
+    def __init__(self, model) -> None:
+        super().__init__(model)
+        self._dang_can_bang: Set[str] = set()
+        self._tac_vu: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _thu_tu():
+        return (DanhSachPhatBaiHat.so_thu_tu, DanhSachPhatBaiHat.id)
+
+    async def get_bai_hats(
+        self,
+        session: AsyncSession,
+        danh_sach_phat_id: Any,
+        *,
+        sau_id: Optional[Any] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[DanhSachPhatBaiHat, BaiHat, int]]:
+        """
+        Retrieve the songs of a playlist in order with one joined query.
+
+        Rows are ordered by (so_thu_tu, id), which the composite index on
+        (danh_sach_phat_id, so_thu_tu) serves directly. Passing the ID of the
+        last row of a page continues after it (keyset pagination).
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            danh_sach_phat_id (Any): The ID of the playlist.
+            sau_id (Optional[Any]): The ID of the last DanhSachPhatBaiHat already returned.
+            limit (Optional[int]): The maximum number of rows, None for the whole playlist.
+
+        Returns:
+            List[Tuple[DanhSachPhatBaiHat, BaiHat, int]]: The playlist rows with their songs
+            and 1-based positions.
+        """
+        truoc = 0
+        query = (
+            select(DanhSachPhatBaiHat, BaiHat)
+            .join(BaiHat, BaiHat.id == DanhSachPhatBaiHat.bai_hat_id)
+            .filter(DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id)
+        )
+        if sau_id is not None:
+            moc = (
+                select(*self._thu_tu())
+                .filter(DanhSachPhatBaiHat.id == uuid.UUID(str(sau_id)))
+                .subquery()
+            )
+            query = query.filter(tuple_(*self._thu_tu()) > select(moc).scalar_subquery())
+            truoc = (
+                select(func.count())
+                .select_from(DanhSachPhatBaiHat)
+                .filter(
+                    DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id,
+                    tuple_(*self._thu_tu()) <= select(moc).scalar_subquery(),
+                )
+                .scalar_subquery()
+            )
+        vi_tri = func.row_number().over(order_by=self._thu_tu()) + truoc
+        query = query.add_columns(vi_tri).order_by(*self._thu_tu())
+        if limit is not None:
+            query = query.limit(limit)
+        try:
+            result = await session.execute(query)
+            return [tuple(row) for row in result.all()]
+        except SQLAlchemyError as e:
+            logger.error("Error while retrieving playlist songs: %s", str(e))
+            return []
+
+    async def get_at_position(
+        self, session: AsyncSession, danh_sach_phat_id: Any, vi_tri: int
+    ) -> Optional[DanhSachPhatBaiHat]:
+        """
+        Retrieve the row at a 1-based position of a playlist.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            danh_sach_phat_id (Any): The ID of the playlist.
+            vi_tri (int): The 1-based position.
+
+        Returns:
+            Optional[DanhSachPhatBaiHat]: The row, or None if the position is out of range.
+        """
+        if vi_tri < 1:
+            return None
+        result = await session.execute(
+            select(DanhSachPhatBaiHat)
+            .filter(DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id)
+            .order_by(*self._thu_tu())
+            .offset(vi_tri - 1)
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def count(self, session: AsyncSession, danh_sach_phat_id: Any) -> int:
+        """
+        Return the number of songs in a playlist.
+        """
+        result = await session.execute(
+            select(func.count()).select_from(DanhSachPhatBaiHat).filter(
+                DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id
+            )
+        )
+        return result.scalar() or 0
+
+    async def next_so_thu_tu(self, session: AsyncSession, danh_sach_phat_id: Any) -> int:
+        """
+        Return the ordering key for a song appended at the end of a playlist.
+        """
+        result = await session.execute(
+            select(func.max(DanhSachPhatBaiHat.so_thu_tu)).filter(
+                DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id
+            )
+        )
+        return (result.scalar() or 0) + KHOANG_CACH
+
+    async def delete_many(
+        self, session: AsyncSession, danh_sach_phat_id: Any, ids: Optional[Iterable[Any]] = None
+    ) -> int:
+        """
+        Delete songs of a playlist with one DELETE statement. The caller commits.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            danh_sach_phat_id (Any): The ID of the playlist.
+            ids (Optional[Iterable[Any]]): The DanhSachPhatBaiHat IDs to delete, None for all.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        query = delete(DanhSachPhatBaiHat).where(
+            DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id
+        )
+        if ids is not None:
+            ids = [uuid.UUID(str(id)) for id in ids]
+            if not ids:
+                return 0
+            query = query.where(DanhSachPhatBaiHat.id.in_(ids))
+        result = await session.execute(query.execution_options(synchronize_session=False))
+        return result.rowcount
+
+    async def append_many(
+        self, session: AsyncSession, danh_sach_phat_id: Any, bai_hat_ids: List[Any]
+    ) -> List[Any]:
+        """
+        Append songs at the end of a playlist with one multi-row INSERT. The caller commits.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            danh_sach_phat_id (Any): The ID of the playlist.
+            bai_hat_ids (List[Any]): The songs to append, in order.
+
+        Returns:
+            List[Any]: The IDs of the created rows, in the same order.
+        """
+        if not bai_hat_ids:
+            return []
+        bat_dau = await self.next_so_thu_tu(session, danh_sach_phat_id)
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "danh_sach_phat_id": uuid.UUID(str(danh_sach_phat_id)),
+                "bai_hat_id": uuid.UUID(str(bai_hat_id)),
+                "so_thu_tu": bat_dau + i * KHOANG_CACH,
+                "thoi_gian_tao": datetime.now(),
+            }
+            for i, bai_hat_id in enumerate(bai_hat_ids)
+        ]
+        await session.execute(insert(DanhSachPhatBaiHat), rows)
+        return [row["id"] for row in rows]
+
+    async def rebalance(self, session: AsyncSession, danh_sach_phat_id: Any) -> None:
+        """
+        Respace the ordering keys of a playlist with one UPDATE statement.
+        The caller commits.
+        """
+        thu_hang = (
+            select(
+                DanhSachPhatBaiHat.id.label("id"),
+                (func.row_number().over(order_by=self._thu_tu()) * KHOANG_CACH).label("so_thu_tu"),
+            )
+            .filter(DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id)
+            .subquery()
+        )
+        await session.execute(
+            update(DanhSachPhatBaiHat)
+            .where(DanhSachPhatBaiHat.id == thu_hang.c.id)
+            .values(so_thu_tu=thu_hang.c.so_thu_tu)
+            .execution_options(synchronize_session=False)
+        )
+
+    def schedule_rebalance(self, danh_sach_phat_id: Any) -> None:
+        """
+        Rebalance a playlist in the background with its own session.
+
+        Call it only after the moves that made the keys dense are committed: the
+        rebalance ranks the rows it can see, so running it against uncommitted
+        moves would rewrite the keys from the old order and undo them.
+        """
+        key = str(danh_sach_phat_id)
+        if key in self._dang_can_bang:
+            return
+
+        async def _chay():
+            try:
+                async with AsyncSessionLocal() as session:
+                    try:
+                        await self.rebalance(session, key)
+                        await session.commit()
+                    except SQLAlchemyError as e:
+                        await session.rollback()
+                        logger.error("Error while rebalancing playlist %s: %s", key, str(e))
+            finally:
+                self._dang_can_bang.discard(key)
+
+        self._dang_can_bang.add(key)
+        task = asyncio.create_task(_chay())
+        self._tac_vu.add(task)
+        task.add_done_callback(self._tac_vu.discard)
+
+    async def _khoa_lang_gieng(
+        self, session: AsyncSession, danh_sach_phat_id: Any, dsphbh: DanhSachPhatBaiHat, sau: Optional[DanhSachPhatBaiHat]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        query = (
+            select(DanhSachPhatBaiHat.so_thu_tu)
+            .filter(
+                DanhSachPhatBaiHat.danh_sach_phat_id == danh_sach_phat_id,
+                DanhSachPhatBaiHat.id != dsphbh.id,
+            )
+            .order_by(*self._thu_tu())
+            .limit(1)
+        )
+        if sau is not None:
+            query = query.filter(tuple_(*self._thu_tu()) > tuple_(sau.so_thu_tu, sau.id))
+        result = await session.execute(query)
+        return (sau.so_thu_tu if sau is not None else None), result.scalar()
+
+    async def move_after(
+        self,
+        session: AsyncSession,
+        danh_sach_phat_id: Any,
+        dsphbh: DanhSachPhatBaiHat,
+        sau: Optional[DanhSachPhatBaiHat],
+    ) -> bool:
+        """
+        Move a song right after another one (or to the top) by rewriting only its key.
+
+        The caller commits, so several moves can share one transaction. When the
+        keys around the new position are getting dense the caller should call
+        schedule_rebalance after its commit.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            danh_sach_phat_id (Any): The ID of the playlist.
+            dsphbh (DanhSachPhatBaiHat): The row to move.
+            sau (Optional[DanhSachPhatBaiHat]): The row it should follow, None for the top.
+
+        Returns:
+            bool: True if the playlist should be rebalanced once the transaction commits.
+        """
+        can_can_bang = False
+        truoc, sau_do = await self._khoa_lang_gieng(session, danh_sach_phat_id, dsphbh, sau)
+        if truoc is not None and sau_do is not None and sau_do - truoc < 2:
+            # khong con khoa trong giua hai bai hat, danh lai so thu tu ca danh sach
+            await self.rebalance(session, danh_sach_phat_id)
+            await session.refresh(dsphbh)
+            if sau is not None:
+                await session.refresh(sau)
+            truoc, sau_do = await self._khoa_lang_gieng(session, danh_sach_phat_id, dsphbh, sau)
+
+        if truoc is None and sau_do is None:
+            so_thu_tu = KHOANG_CACH
+        elif truoc is None:
+            so_thu_tu = sau_do - KHOANG_CACH
+        elif sau_do is None:
+            so_thu_tu = truoc + KHOANG_CACH
+        else:
+            so_thu_tu = (truoc + sau_do) // 2
+            can_can_bang = min(so_thu_tu - truoc, sau_do - so_thu_tu) < KHOANG_CACH_TOI_THIEU
+
+        await session.execute(
+            update(DanhSachPhatBaiHat)
+            .where(DanhSachPhatBaiHat.id == dsphbh.id)
+            .values(so_thu_tu=so_thu_tu)
+            .execution_options(synchronize_session=False)
+        )
+        set_committed_value(dsphbh, "so_thu_tu", so_thu_tu)
+        return can_can_bang
+
+
 crud_danh_sach_phat_bai_hat = CRUDDanhSachPhatBaiHat(DanhSachPhatBaiHat)
@@ -0,0 +1,44 @@
+"""
+This module defines CRUD operations for the KetQuaKiemDuyet model,
+the moderation results cached by audio content hash.
+"""
+
+import logging
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.ket_qua_kiem_duyet import KetQuaKiemDuyet
+from schemas.ket_qua_kiem_duyet import KetQuaKiemDuyetCreate, KetQuaKiemDuyetUpdateDB
+from services.crud.base import CRUDBase
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class CRUDKetQuaKiemDuyet(CRUDBase[KetQuaKiemDuyet, KetQuaKiemDuyetCreate, KetQuaKiemDuyetUpdateDB]):
+    """
+    CRUD operations for the KetQuaKiemDuyet model.
+    """
+
+    async def luu(self, session: AsyncSession, obj_in: KetQuaKiemDuyetCreate) -> None:
+        """
+        Store a result; the first result stored for a hash wins, so concurrent
+        moderation of the same audio is harmless.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            obj_in (KetQuaKiemDuyetCreate): The result to store.
+        """
+        try:
+            await session.execute(
+                insert(KetQuaKiemDuyet).values(**obj_in.dict()).on_conflict_do_nothing(index_elements=["ma_bam"])
+            )
+            await session.commit()
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error("Error while caching moderation result: %s", str(e))
+
+
+crud_ket_qua_kiem_duyet = CRUDKetQuaKiemDuyet(KetQuaKiemDuyet)
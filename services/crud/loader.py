@@ -0,0 +1,96 @@
+"""
+This module provides a per-request batch loader on top of CRUDBase.get_many_by_ids.
+Lookups requested in the same event loop tick are coalesced into one IN query, and
+results are cached for the lifetime of the loader (one request or one websocket event).
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.crud.base import CRUDBase
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """
+    DataLoader-like coalescer for loading records by ID.
+
+    Attributes:
+        crud (CRUDBase): The CRUD object used to load records.
+        session (AsyncSession): The session of the current request.
+        cache (Dict[str, Any]): Records already loaded, keyed by str(id); None marks a missing ID.
+    """
+
+    def __init__(self, crud: CRUDBase, session: AsyncSession) -> None:
+        self.crud = crud
+        self.session = session
+        self.cache: Dict[str, Any] = {}
+        self._cho: Dict[str, asyncio.Future] = {}
+        self._dispatch: Optional[asyncio.Handle] = None
+        # An AsyncSession must not run two queries at once
+        self._lock = asyncio.Lock()
+
+    async def load(self, id: Any) -> Optional[Any]:
+        """
+        Load one record; calls made in the same tick share a single query.
+
+        Parameters:
+            id (Any): The ID of the record.
+
+        Returns:
+            Optional[Any]: The record, or None if it does not exist.
+        """
+        if id is None:
+            return None
+        key = str(id)
+        if key in self.cache:
+            return self.cache[key]
+        future = self._cho.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._cho[key] = future
+            if self._dispatch is None:
+                self._dispatch = asyncio.get_running_loop().call_soon(
+                    lambda: asyncio.ensure_future(self._tai())
+                )
+        return await future
+
+    async def load_many(self, ids: Iterable[Any]) -> List[Optional[Any]]:
+        """
+        Load many records in the order of the given IDs.
+
+        Parameters:
+            ids (Iterable[Any]): The IDs of the records.
+
+        Returns:
+            List[Optional[Any]]: The records, None where an ID does not exist.
+        """
+        return list(await asyncio.gather(*(self.load(id) for id in ids)))
+
+    def prime(self, id: Any, value: Any) -> None:
+        """
+        Put an already loaded record into the cache.
+        """
+        self.cache[str(id)] = value
+
+    async def _tai(self) -> None:
+        cho, self._cho = self._cho, {}
+        self._dispatch = None
+        try:
+            async with self._lock:
+                records = await self.crud.get_many_by_ids(self.session, cho.keys())
+        except Exception as e:
+            logger.error("Error while batch loading records: %s", str(e))
+            for future in cho.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in cho.items():
+            self.cache[key] = records.get(key)
+            if not future.done():
+                future.set_result(self.cache[key])
@@ -1,12 +1,141 @@
 """
 This module defines CRUD operations for the MaLamMoi model.
 It utilizes the base CRUD functionality provided by CRUDBase to
-create, update, and read MaLamMoi entities.
+create, update, and read MaLamMoi entities, and adds set-based
+revocation and batched purging of dead tokens.
 """
 
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import select, update, delete, func, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
 from models.nguoi_dung import MaLamMoi
 from schemas.ma_lam_moi import MaLamMoiCreate, MaLamMoiUpdateDB
 from services.crud.base import CRUDBase
 
-CRUDMaLamMoi = CRUDBase[MaLamMoi, MaLamMoiCreate, MaLamMoiUpdateDB]
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class CRUDMaLamMoi(CRUDBase[MaLamMoi, MaLamMoiCreate, MaLamMoiUpdateDB]):
+    """
+    CRUD operations for the MaLamMoi model.
+    """
+
+    async def thu_hoi_tat_ca(self, session: AsyncSession, nguoi_dung_id: Any) -> int:
+        """
+        Revoke every active refresh token of a nguoi_dung with one UPDATE.
+
+        Only rows with da_thu_hoi = false are touched, which the partial index
+        ix_ma_lam_moi_nguoi_dung_id_con_hieu_luc serves directly.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            nguoi_dung_id (Any): The ID of the nguoi_dung.
+
+        Returns:
+            int: The number of revoked tokens.
+
+        Raises:
+            SQLAlchemyError: If the update fails.
+        """
+        result = await session.execute(
+            update(MaLamMoi)
+            .where(MaLamMoi.nguoi_dung_id == nguoi_dung_id, MaLamMoi.da_thu_hoi == False)  # noqa: E712
+            .values(da_thu_hoi=True, thoi_gian_thu_hoi=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount
+
+    async def thu_hoi(self, session: AsyncSession, id: Any) -> bool:
+        """
+        Revoke one refresh token, atomically.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            id (Any): The ID of the token.
+
+        Returns:
+            bool: True if this call revoked it, False if it was already revoked
+                (e.g. a concurrent refresh with the same token won).
+
+        Raises:
+            SQLAlchemyError: If the update fails.
+        """
+        result = await session.execute(
+            update(MaLamMoi)
+            .where(MaLamMoi.id == id, MaLamMoi.da_thu_hoi == False)  # noqa: E712
+            .values(da_thu_hoi=True, thoi_gian_thu_hoi=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount == 1
+
+    async def don_dep(self, session: AsyncSession, batch_size: int) -> int:
+        """
+        Delete one batch of expired or revoked tokens.
+
+        Rows locked by a concurrent purge on another worker are skipped.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            batch_size (int): The maximum number of rows to delete.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        lo = (
+            select(MaLamMoi.id)
+            .where(or_(MaLamMoi.thoi_gian_het_han < datetime.now(), MaLamMoi.da_thu_hoi == True))  # noqa: E712
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        try:
+            result = await session.execute(
+                delete(MaLamMoi)
+                .where(MaLamMoi.id.in_(lo.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error("Error while purging lam_moi mas: %s", str(e))
+            return 0
+
+    async def thong_ke(self, session: AsyncSession) -> Dict[str, Any]:
+        """
+        Size metrics of the ma_lam_moi table.
+
+        The row count is the planner estimate (no full scan); active tokens are
+        counted through the partial index.
+
+        Returns:
+            Dict[str, Any]: so_dong_uoc_tinh, so_ma_con_hieu_luc, kich_thuoc_bang (bytes, with indexes).
+        """
+        so_dong, kich_thuoc = (
+            await session.execute(
+                text(
+                    "SELECT reltuples::bigint, pg_total_relation_size(oid) "
+                    "FROM pg_class WHERE oid = 'ma_lam_moi'::regclass"
+                )
+            )
+        ).one()
+        so_con_hieu_luc = await session.scalar(
+            select(func.count())
+            .select_from(MaLamMoi)
+            .where(MaLamMoi.da_thu_hoi == False, MaLamMoi.thoi_gian_het_han > datetime.now())  # noqa: E712
+        )
+        return {
+            "so_dong_uoc_tinh": max(so_dong, 0),
+            "so_ma_con_hieu_luc": so_con_hieu_luc,
+            "kich_thuoc_bang": kich_thuoc,
+        }
+
+
 crud_ma_lam_moi = CRUDMaLamMoi(MaLamMoi)
@@ -11,8 +11,9 @@ from fastapi import HTTPException, status, Depends
 from typing import Any, Dict, Optional, Union
 from models.nguoi_dung import NguoiDung
 from schemas.nguoi_dung import NguoiDungCreate, NguoiDungUpdateDB, NguoiDungOut
-from utils.security import ma_hoa_mat_khau
+from utils.security import ma_hoa_mat_khau_async
 from services.crud.base import CRUDBase
+from services.auth.principal_cache import principal_cache
 from datetime import datetime
 
 # Set up logging
@@ -42,7 +43,7 @@ class CRUDNguoiDung(CRUDBase[NguoiDung, NguoiDungCreate, NguoiDungUpdateDB]):
         obj_in_data = obj_in.dict()
 
         # Hash the mat_khau securely
-        obj_in_data["mat_khau_ma_hoa"] = ma_hoa_mat_khau(obj_in.mat_khau)
+        obj_in_data["mat_khau_ma_hoa"] = await ma_hoa_mat_khau_async(obj_in.mat_khau)
 
         # Remove plain mat_khau from the dictionary to avoid saving it
         del obj_in_data["mat_khau"]
@@ -79,6 +80,7 @@ class CRUDNguoiDung(CRUDBase[NguoiDung, NguoiDungCreate, NguoiDungUpdateDB]):
     ) -> Optional[NguoiDung]:
         """
         Update an existing NguoiDung record with new data.
+        The cached principal of the nguoi_dung is invalidated on every worker.
 
         Parameters:
             session (AsyncSession): The database session.
@@ -107,7 +109,7 @@ class CRUDNguoiDung(CRUDBase[NguoiDung, NguoiDungCreate, NguoiDungUpdateDB]):
 
         # Check if 'mat_khau' needs to be updated, and hash it if present
         if "mat_khau" in update_data:
-            update_data["mat_khau_ma_hoa"] = ma_hoa_mat_khau(
+            update_data["mat_khau_ma_hoa"] = await ma_hoa_mat_khau_async(
                 update_data.pop("mat_khau")
             )
 
@@ -120,6 +122,7 @@ class CRUDNguoiDung(CRUDBase[NguoiDung, NguoiDungCreate, NguoiDungUpdateDB]):
         try:
             await session.commit()
             await session.refresh(db_obj)
+            await principal_cache.xoa_nguoi_dung(db_obj.id)
             return db_obj
         except IntegrityError as e:
             await session.rollback()
@@ -138,4 +141,4 @@ class CRUDNguoiDung(CRUDBase[NguoiDung, NguoiDungCreate, NguoiDungUpdateDB]):
 
 
 # Instantiate the CRUDNguoiDung class for the NguoiDung model
-crud_nguoi_dung = CRUDNguoiDung(NguoiDung)
+crud_nguoi_dung = CRUDNguoiDung(NguoiDung, sort_key="ten_nguoi_dung")
@@ -1,6 +1,94 @@
+"""
+This module defines CRUD operations for the TinNhan model.
+It utilizes the base CRUD functionality provided by CRUDBase and adds
+ranked full-text search scoped to one room.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
 from models.tin_nhan import TinNhan
 from schemas.tin_nhan import TinNhanCreate, TinNhanUpdateDB
-from services.crud.base import CRUDBase
+from config.config import settings
+from services.crud.base import CRUDBase, encode_cursor, decode_cursor
+from utils.text import tao_tsquery
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class CRUDTinNhan(CRUDBase[TinNhan, TinNhanCreate, TinNhanUpdateDB]):
+    """
+    CRUD operations for the TinNhan model.
+    """
+
+    async def tim_kiem(
+        self,
+        session: AsyncSession,
+        phong_nghe_nhac_id: str,
+        q: str,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        **filters: str,
+    ) -> Tuple[List[TinNhan], Optional[str]]:
+        """
+        Search the messages of one room, best matches first, newest first among equals.
+
+        The room filter and the tsquery are both served by the (phong_nghe_nhac_id,
+        tim_kiem) GIN index, so only the room's matching rows are ranked. Matching
+        ignores Vietnamese accents and the last word matches as a prefix. Other
+        filters fall back to the LIKE search of CRUDBase. The cursor carries the
+        position of the next page.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            phong_nghe_nhac_id (str): The ID of the room.
+            q (str): The text to search for.
+            offset (int): The number of records to skip.
+            limit (int): The maximum number of records, capped by MAX_PAGE_SIZE.
+            cursor (Optional[str]): The cursor returned with the previous page.
+            filters (str): Other field filters.
+
+        Returns:
+            Tuple[List[TinNhan], Optional[str]]: The matching messages and the next cursor.
+
+        Raises:
+            ValueError: If the cursor is invalid.
+        """
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        if cursor:
+            offset = int(decode_cursor(cursor)[0])
+        truy_van = tao_tsquery(q)
+        if truy_van is None:
+            return [], None
+
+        tsquery = func.to_tsquery("simple", truy_van)
+        query = select(TinNhan).filter(
+            TinNhan.phong_nghe_nhac_id == phong_nghe_nhac_id,
+            TinNhan.tim_kiem.op("@@")(tsquery),
+        )
+        for key, value in filters.items():
+            query = query.filter(func.lower(getattr(TinNhan, key)).like(f"%{value.lower()}%"))
+        query = query.order_by(
+            func.ts_rank(TinNhan.tim_kiem, tsquery).desc(),
+            TinNhan.thoi_gian_tao.desc(),
+            TinNhan.id,
+        )
+
+        try:
+            result = await session.execute(query.offset(offset).limit(limit + 1))
+            tin_nhans = result.scalars().all()
+        except SQLAlchemyError as e:
+            logger.error("Error while searching messages: %s", str(e))
+            return [], None
+        if len(tin_nhans) > limit:
+            return tin_nhans[:limit], encode_cursor([offset + limit])
+        return tin_nhans, None
+
 
-CRUDTinNhan = CRUDBase[TinNhan, TinNhanCreate, TinNhanUpdateDB]
-crud_tin_nhan = CRUDTinNhan(TinNhan)
+crud_tin_nhan = CRUDTinNhan(TinNhan, sort_key="thoi_gian_tao")
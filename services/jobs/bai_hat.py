@@ -0,0 +1,97 @@
+"""
+This module defines the background jobs of songs.
+
+kiem_duyet_bai_hat transcribes an uploaded song and moderates the text. The
+song is created as "cho_duyet" and becomes "hoat_dong" (public, suggested by
+autocomplete) when it passes, or "bi_tu_choi" when it does not. As before the
+queue existed, a song is not blocked because the services are unavailable: on
+the last attempt it is approved with a warning in the job result.
+
+Results are cached by the SHA-256 of the audio (ket_qua_kiem_duyet), so the
+same file is only sent to the services once; fallback approvals are not cached.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.bai_hat import BaiHat
+from models.cong_viec import CongViec
+from schemas.bai_hat import BaiHatUpdateDB
+from schemas.ket_qua_kiem_duyet import KetQuaKiemDuyetCreate
+from services.crud.bai_hat import crud_bai_hat
+from services.crud.ket_qua_kiem_duyet import crud_ket_qua_kiem_duyet
+from services.jobs.providers import content_provider
+from services.jobs.queue import job_queue
+from services.search.autocomplete import autocomplete_index
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+KIEM_DUYET_BAI_HAT = "kiem_duyet_bai_hat"
+
+
+async def ap_dung_ket_qua(session: AsyncSession, bai_hat: BaiHat, phu_hop: bool) -> BaiHat:
+    """
+    Publish or reject a song according to its moderation result.
+
+    Raises:
+        RuntimeError: If the song could not be updated.
+    """
+    trang_thai = "hoat_dong" if phu_hop else "bi_tu_choi"
+    bai_hat = await crud_bai_hat.update(session, obj_in=BaiHatUpdateDB(trang_thai=trang_thai), db_obj=bai_hat)
+    if bai_hat is None:
+        raise RuntimeError("Khong cap nhat duoc trang thai bai hat")
+    if phu_hop:
+        await autocomplete_index.them_bai_hat(bai_hat)
+    return bai_hat
+
+
+@job_queue.xu_ly(KIEM_DUYET_BAI_HAT)
+async def kiem_duyet_bai_hat(session: AsyncSession, cong_viec: CongViec) -> Optional[Dict[str, Any]]:
+    """
+    Transcribe and moderate a song, then publish or reject it.
+
+    du_lieu: {"bai_hat_id": ..., "bucket": ..., "key": ..., "ma_bam": ...}
+    """
+    du_lieu = cong_viec.du_lieu
+    bai_hat = await crud_bai_hat.get(session, id=du_lieu["bai_hat_id"])
+    if bai_hat is None:
+        return {"bai_hat_id": du_lieu["bai_hat_id"], "trang_thai": None, "ly_do": "Bai hat khong ton tai"}
+    if bai_hat.trang_thai != "cho_duyet":
+        # Da xu ly o lan chay truoc
+        return {"bai_hat_id": str(bai_hat.id), "trang_thai": bai_hat.trang_thai}
+
+    ma_bam = du_lieu.get("ma_bam")
+    if ma_bam:
+        ket_qua = await crud_ket_qua_kiem_duyet.get(session, ma_bam=ma_bam)
+        if ket_qua is not None:
+            bai_hat = await ap_dung_ket_qua(session, bai_hat, ket_qua.phu_hop)
+            return {"bai_hat_id": str(bai_hat.id), "trang_thai": bai_hat.trang_thai, "ly_do": ket_qua.ly_do, "canh_bao": []}
+
+    lan_cuoi = cong_viec.so_lan_thu >= cong_viec.so_lan_thu_toi_da
+    canh_bao = []
+    try:
+        van_ban = await content_provider.phien_am(du_lieu["bucket"], du_lieu["key"])
+    except Exception as e:
+        if not lan_cuoi:
+            raise
+        logger.warning("Audio transcription failed for %s, continuing without it: %s", bai_hat.id, e)
+        van_ban = ""
+        canh_bao.append("Audio transcription service unavailable")
+    try:
+        phu_hop, ly_do = await content_provider.kiem_duyet(van_ban)
+    except Exception as e:
+        if not lan_cuoi:
+            raise
+        logger.warning("Content moderation failed for %s, approving: %s", bai_hat.id, e)
+        phu_hop, ly_do = True, ""
+        canh_bao.append(f"Content moderation service unavailable: {e}")
+
+    if ma_bam and not canh_bao:
+        await crud_ket_qua_kiem_duyet.luu(
+            session, KetQuaKiemDuyetCreate(ma_bam=ma_bam, van_ban=van_ban, phu_hop=phu_hop, ly_do=ly_do)
+        )
+    bai_hat = await ap_dung_ket_qua(session, bai_hat, phu_hop)
+    return {"bai_hat_id": str(bai_hat.id), "trang_thai": bai_hat.trang_thai, "ly_do": ly_do, "canh_bao": canh_bao}
@@ -0,0 +1,131 @@
+"""
+This module provides the transcription and moderation services used by the
+song moderation job.
+
+OpenAIProvider calls Whisper and the chat API; FakeProvider answers locally so
+the whole pipeline can be exercised without network access or an API key.
+Providers raise on failure so the job queue retries them.
+"""
+
+import logging
+import tempfile
+from typing import Iterable, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from config.config import settings
+from services.storage.s3 import tai_xuong_s3
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class ContentProvider:
+    """
+    Base interface of a transcription and moderation provider.
+    """
+
+    async def phien_am(self, bucket: str, key: str) -> str:
+        """
+        Transcribe the audio stored at bucket/key.
+        """
+        raise NotImplementedError
+
+    async def kiem_duyet(self, text: str) -> Tuple[bool, str]:
+        """
+        Moderate a text.
+
+        Returns:
+            Tuple[bool, str]: Whether the content is appropriate, and the reason if not.
+        """
+        raise NotImplementedError
+
+
+class OpenAIProvider(ContentProvider):
+    """
+    Whisper transcription and chat-based moderation through the OpenAI API.
+    The blocking client calls run in the threadpool.
+    """
+
+    def __init__(self, api_key: str) -> None:
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=api_key)
+
+    async def phien_am(self, bucket: str, key: str) -> str:
+        # Spool the audio (in memory up to 1 MB, on disk beyond) and stream it to Whisper
+        with tempfile.SpooledTemporaryFile(max_size=MB) as audio_file:
+            await tai_xuong_s3(bucket, key, audio_file)
+            transcript = await run_in_threadpool(
+                self.client.audio.transcriptions.create,
+                model="whisper-1",
+                file=(key, audio_file),
+            )
+        return transcript.text
+
+    async def kiem_duyet(self, text: str) -> Tuple[bool, str]:
+        if not text:  # If no text to moderate, consider it appropriate
+            return True, ""
+        response = await run_in_threadpool(
+            self.client.chat.completions.create,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": """You are a content moderator. Evaluate if the content is appropriate.
+                If inappropriate, explain why. Check for:
+                - Offensive language
+                - Hate speech
+                - Explicit content
+                - Violence
+                - Copyright infringement hints
+                Respond in format: 'APPROPRIATE' or 'INAPPROPRIATE: [detailed reason]'"""},
+                {"role": "user", "content": f"Evaluate the following content: {text}"}
+            ]
+        )
+        result = response.choices[0].message.content.strip()
+        logger.info("Content moderation result: %s", result)
+        is_appropriate = result.upper().startswith("APPROPRIATE")
+        reason = result.split(": ")[1] if ": " in result else ""
+        return is_appropriate, reason
+
+
+class FakeProvider(ContentProvider):
+    """
+    Local provider for development and tests.
+
+    Attributes:
+        van_ban (str): The text every transcription returns.
+        tu_cam (Tuple[str, ...]): Words that make a text inappropriate.
+    """
+
+    def __init__(self, van_ban: str = "", tu_cam: Iterable[str] = ("khong_phu_hop",)) -> None:
+        self.van_ban = van_ban
+        self.tu_cam = tuple(tu.lower() for tu in tu_cam)
+
+    async def phien_am(self, bucket: str, key: str) -> str:
+        return self.van_ban
+
+    async def kiem_duyet(self, text: str) -> Tuple[bool, str]:
+        for tu in self.tu_cam:
+            if tu in (text or "").lower():
+                return False, f"Contains '{tu}'"
+        return True, ""
+
+
+def get_provider(kind: str) -> ContentProvider:
+    """
+    Create the provider selected by configuration.
+
+    Parameters:
+        kind (str): "openai" or "fake".
+
+    Returns:
+        ContentProvider: The configured provider.
+    """
+    if kind == "fake":
+        return FakeProvider()
+    return OpenAIProvider(settings.OPENAI_API_KEY)
+
+
+content_provider = get_provider(settings.CONTENT_PROVIDER)
@@ -0,0 +1,197 @@
+"""
+This module runs background jobs stored in the cong_viec table.
+
+Each application process starts JOB_WORKERS worker tasks. A worker claims one
+due job at a time (FOR UPDATE SKIP LOCKED), runs the handler registered for its
+loai with a fresh session, and records the result. A handler that raises is
+retried after JOB_RETRY_BASE_DELAY * 2^(attempt - 1) seconds (capped at
+JOB_RETRY_MAX_DELAY, with jitter) until so_lan_thu_toi_da attempts, then the
+job is marked that_bai. While a job runs its worker renews the
+JOB_LEASE_TIMEOUT lease; a job whose worker died is picked up again once the
+lease expires, so handlers must be idempotent. The outcome is only recorded
+if the attempt still holds the lease (see CRUDCongViec.ket_thuc).
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from config.database.database import AsyncSessionLocal
+from models.cong_viec import CongViec
+from schemas.cong_viec import CongViecCreate
+from services.crud.cong_viec import crud_cong_viec
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AsyncSession, CongViec], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    """
+    A worker pool over the persistent job table.
+
+    Attributes:
+        so_worker (int): The number of worker tasks in this process.
+        poll_interval (float): Seconds an idle worker waits before looking for due jobs again.
+        thoi_gian_thue (float): The lease of a running job in seconds.
+        handlers (Dict[str, Handler]): The handler of each job type.
+    """
+
+    def __init__(
+        self,
+        so_worker: int,
+        poll_interval: float,
+        thoi_gian_thue: float,
+        base_delay: float,
+        max_delay: float,
+    ) -> None:
+        self.so_worker = so_worker
+        self.poll_interval = poll_interval
+        self.thoi_gian_thue = thoi_gian_thue
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.handlers: Dict[str, Handler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._co_viec = asyncio.Event()
+
+    def xu_ly(self, loai: str) -> Callable[[Handler], Handler]:
+        """
+        Register the handler of a job type.
+
+        The handler receives its own session and the claimed job, and returns the
+        result stored in ket_qua. Raising schedules a retry.
+        """
+        def dang_ky(handler: Handler) -> Handler:
+            self.handlers[loai] = handler
+            return handler
+        return dang_ky
+
+    async def them(
+        self,
+        session: AsyncSession,
+        loai: str,
+        du_lieu: Dict[str, Any],
+        so_lan_thu_toi_da: Optional[int] = None,
+    ) -> Optional[CongViec]:
+        """
+        Persist a new job and wake the local workers.
+
+        Parameters:
+            session (AsyncSession): The current database session.
+            loai (str): The job type.
+            du_lieu (Dict[str, Any]): The JSON input of the job.
+            so_lan_thu_toi_da (Optional[int]): Attempts before failing, JOB_MAX_ATTEMPTS by default.
+
+        Returns:
+            Optional[CongViec]: The created job, or None if it could not be stored.
+        """
+        cong_viec = await crud_cong_viec.create(
+            session,
+            obj_in=CongViecCreate(
+                loai=loai,
+                du_lieu=du_lieu,
+                so_lan_thu_toi_da=so_lan_thu_toi_da or settings.JOB_MAX_ATTEMPTS,
+            ),
+        )
+        if cong_viec is not None:
+            self._co_viec.set()
+        return cong_viec
+
+    def _thoi_gian_cho(self, so_lan_thu: int) -> float:
+        delay = min(self.base_delay * 2 ** max(so_lan_thu - 1, 0), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _gia_han(self, cong_viec: CongViec) -> None:
+        # Gia han thue dinh ky de job chay lau khong bi worker khac nhan lai
+        while True:
+            await asyncio.sleep(self.thoi_gian_thue / 3)
+            async with AsyncSessionLocal() as session:
+                con_thue = await crud_cong_viec.gia_han(
+                    session, cong_viec.id, cong_viec.so_lan_thu, self.thoi_gian_thue
+                )
+            if not con_thue:
+                logger.warning("Job %s attempt %s lost its lease", cong_viec.id, cong_viec.so_lan_thu)
+                return
+
+    async def _chay(self, cong_viec: CongViec) -> None:
+        handler = self.handlers.get(cong_viec.loai)
+        async with AsyncSessionLocal() as session:
+            if handler is None:
+                await crud_cong_viec.ket_thuc(
+                    session, cong_viec.id, cong_viec.so_lan_thu, "that_bai",
+                    loi=f"Khong co xu ly cho loai {cong_viec.loai}",
+                )
+                return
+            gia_han = asyncio.create_task(self._gia_han(cong_viec))
+            try:
+                try:
+                    ket_qua = await handler(session, cong_viec)
+                finally:
+                    gia_han.cancel()
+                    await asyncio.gather(gia_han, return_exceptions=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await session.rollback()
+                if cong_viec.so_lan_thu >= cong_viec.so_lan_thu_toi_da:
+                    logger.error("Job %s (%s) failed for good: %s", cong_viec.id, cong_viec.loai, e)
+                    await crud_cong_viec.ket_thuc(
+                        session, cong_viec.id, cong_viec.so_lan_thu, "that_bai", loi=str(e)
+                    )
+                else:
+                    delay = self._thoi_gian_cho(cong_viec.so_lan_thu)
+                    logger.warning(
+                        "Job %s (%s) attempt %s failed, retrying in %.1fs: %s",
+                        cong_viec.id, cong_viec.loai, cong_viec.so_lan_thu, delay, e,
+                    )
+                    await crud_cong_viec.ket_thuc(
+                        session, cong_viec.id, cong_viec.so_lan_thu, "cho_xu_ly", loi=str(e), thu_lai_sau=delay
+                    )
+                return
+            await crud_cong_viec.ket_thuc(
+                session, cong_viec.id, cong_viec.so_lan_thu, "hoan_thanh", ket_qua=ket_qua or {}
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    cong_viecs = await crud_cong_viec.lay_viec(session, 1, self.thoi_gian_thue)
+                if cong_viecs:
+                    await self._chay(cong_viecs[0])
+                    continue
+                self._co_viec.clear()
+                try:
+                    await asyncio.wait_for(self._co_viec.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Unexpected error in job worker: %s", e)
+                await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.so_worker)]
+
+    async def stop(self) -> None:
+        # Running jobs are abandoned; their lease expires and another worker retries them
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+job_queue = JobQueue(
+    settings.JOB_WORKERS,
+    settings.JOB_POLL_INTERVAL,
+    settings.JOB_LEASE_TIMEOUT,
+    settings.JOB_RETRY_BASE_DELAY,
+    settings.JOB_RETRY_MAX_DELAY,
+)
@@ -0,0 +1,172 @@
+"""
+This module keeps an in-memory prefix index over song names and artist names
+for search-as-you-type. It is built once at startup from the catalog, updated
+when a song is created, and kept in sync across workers through the websocket
+backplane, so suggestions never touch PostgreSQL.
+"""
+
+import bisect
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from config.database.database import AsyncSessionLocal
+from models.bai_hat import BaiHat
+from services.websocket.manager import manager as connection_manager
+from utils.text import bo_dau
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Backplane channel used to share new songs with the other workers
+KENH_GOI_Y = "__goi_y__"
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index.
+
+    Each name is stored once per word start ("son tung mtp", "tung mtp", "mtp"), so a
+    prefix of any word matches. A lookup is a binary search plus a short scan.
+
+    Attributes:
+        khoas (List[str]): The sorted accent-free keys.
+        muc (List[Tuple[int, int]]): Per key, (entry index, word position in the name).
+        entries (List[Dict[str, Any]]): The suggestions, e.g. {"loai": "bai_hat", "ten": ..., "bai_hat_id": ...}.
+    """
+
+    def __init__(self) -> None:
+        self.khoas: List[str] = []
+        self.muc: List[Tuple[int, int]] = []
+        self.entries: List[Dict[str, Any]] = []
+        self._ca_si: Dict[str, int] = {}
+        self._bai_hat: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _khoa(self, ten: str) -> List[Tuple[str, int]]:
+        tus = bo_dau(ten).split()
+        return [(" ".join(tus[i:]), i) for i in range(len(tus))]
+
+    def _them_entry(self, entry: Dict[str, Any], sap_xep: bool) -> None:
+        index = len(self.entries)
+        self.entries.append(entry)
+        for khoa, vi_tri in self._khoa(entry["ten"]):
+            if sap_xep:
+                i = bisect.bisect_right(self.khoas, khoa)
+                self.khoas.insert(i, khoa)
+                self.muc.insert(i, (index, vi_tri))
+            else:
+                self.khoas.append(khoa)
+                self.muc.append((index, vi_tri))
+
+    def them(self, bai_hat_id: Any, ten_bai_hat: Optional[str], ten_ca_si: Optional[str], sap_xep: bool = True) -> None:
+        """
+        Add a song (and its artist, if new) to the index.
+
+        Parameters:
+            bai_hat_id (Any): The ID of the song.
+            ten_bai_hat (Optional[str]): The song name.
+            ten_ca_si (Optional[str]): The artist name.
+            sap_xep (bool): Keep the arrays sorted; bulk loads pass False and call sap_xep() once.
+        """
+        bai_hat_id = str(bai_hat_id)
+        if ten_bai_hat and bai_hat_id not in self._bai_hat:
+            self._bai_hat[bai_hat_id] = len(self.entries)
+            self._them_entry(
+                {"loai": "bai_hat", "ten": ten_bai_hat, "ten_ca_si": ten_ca_si, "bai_hat_id": bai_hat_id},
+                sap_xep,
+            )
+        khoa_ca_si = bo_dau(ten_ca_si)
+        if khoa_ca_si and khoa_ca_si not in self._ca_si:
+            self._ca_si[khoa_ca_si] = len(self.entries)
+            self._them_entry({"loai": "ca_si", "ten": ten_ca_si}, sap_xep)
+
+    def sap_xep(self) -> None:
+        """
+        Sort the arrays after a bulk load.
+        """
+        thu_tu = sorted(range(len(self.khoas)), key=self.khoas.__getitem__)
+        self.khoas = [self.khoas[i] for i in thu_tu]
+        self.muc = [self.muc[i] for i in thu_tu]
+
+    def goi_y(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return suggestions whose name has a word starting with q.
+
+        Names that start with q come first, then shorter names.
+
+        Parameters:
+            q (str): The typed prefix, accents are ignored.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            List[Dict[str, Any]]: The suggestions.
+        """
+        tien_to = bo_dau(q)
+        if not tien_to:
+            return []
+        i = bisect.bisect_left(self.khoas, tien_to)
+        ket_qua: Dict[int, int] = {}
+        # Scan a bounded window so very short prefixes stay cheap
+        gioi_han = i + limit * 20
+        while i < len(self.khoas) and i < gioi_han and self.khoas[i].startswith(tien_to):
+            index, vi_tri = self.muc[i]
+            ket_qua[index] = min(vi_tri, ket_qua.get(index, vi_tri))
+            i += 1
+        xep_hang = sorted(ket_qua, key=lambda index: (ket_qua[index] > 0, len(self.entries[index]["ten"])))
+        return [self.entries[index] for index in xep_hang[:limit]]
+
+
+class AutocompleteIndex:
+    """
+    The process-wide suggestion index with its loading and cross-worker sync.
+    """
+
+    def __init__(self) -> None:
+        self.index = PrefixIndex()
+        connection_manager.add_remote_listener(self._nhan_su_kien_tu_xa)
+
+    async def tai(self, batch_size: int = 5000) -> None:
+        """
+        Build the index from the catalog, used at application startup.
+        """
+        index = PrefixIndex()
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.stream(
+                    select(BaiHat.id, BaiHat.ten_bai_hat, BaiHat.ten_ca_si)
+                    .filter(BaiHat.trang_thai == "hoat_dong")
+                    .execution_options(yield_per=batch_size)
+                )
+                async for bai_hat_id, ten_bai_hat, ten_ca_si in result:
+                    index.them(bai_hat_id, ten_bai_hat, ten_ca_si, sap_xep=False)
+        except Exception as e:
+            logger.error("Error while building the autocomplete index: %s", str(e))
+            return
+        index.sap_xep()
+        self.index = index
+        logger.info("Autocomplete index built with %s entries", len(index))
+
+    async def them_bai_hat(self, bai_hat: BaiHat) -> None:
+        """
+        Add a newly created song here and on the other workers.
+        """
+        data = {"id": str(bai_hat.id), "ten_bai_hat": bai_hat.ten_bai_hat, "ten_ca_si": bai_hat.ten_ca_si}
+        self.index.them(data["id"], data["ten_bai_hat"], data["ten_ca_si"])
+        try:
+            await connection_manager.backplane.publish(KENH_GOI_Y, data)
+        except Exception as e:
+            logger.error("Error while publishing autocomplete update: %s", str(e))
+
+    def _nhan_su_kien_tu_xa(self, room_id: str, data: Any) -> None:
+        if room_id == KENH_GOI_Y:
+            self.index.them(data["id"], data.get("ten_bai_hat"), data.get("ten_ca_si"))
+
+    def goi_y(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.index.goi_y(q, limit)
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,124 @@
+"""
+This module uploads files to S3 (and streams them back for background jobs)
+without loading them into memory or blocking the event loop.
+
+Uploads are read from the request's spooled file (Starlette keeps an upload in
+memory only up to 1 MB and spools the rest to disk) and sent with boto3's
+managed transfer: files above S3_MULTIPART_THRESHOLD go as a multipart upload
+of S3_MULTIPART_CHUNKSIZE parts, S3_MAX_CONCURRENCY at a time. The blocking
+boto3 call runs in the threadpool, so other requests keep being served.
+"""
+
+import hashlib
+import logging
+from typing import BinaryIO, Optional
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from starlette.concurrency import run_in_threadpool
+
+from config.config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+s3_client = boto3.client(
+    's3',
+    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+    region_name=settings.AWS_REGION_NAME
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD * MB,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE * MB,
+    max_concurrency=settings.S3_MAX_CONCURRENCY,
+)
+
+
+def _bam(fileobj: BinaryIO) -> str:
+    fileobj.seek(0)
+    bam = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(MB), b""):
+        bam.update(chunk)
+    fileobj.seek(0)
+    return bam.hexdigest()
+
+
+async def bam_noi_dung(fileobj: BinaryIO) -> str:
+    """
+    Hash a file in 1 MB chunks, in the threadpool.
+
+    Parameters:
+        fileobj (BinaryIO): The file, e.g. UploadFile.file; it is rewound afterwards.
+
+    Returns:
+        str: The hex SHA-256 of the content, used as its content address.
+    """
+    return await run_in_threadpool(_bam, fileobj)
+
+
+async def ton_tai_s3(bucket: str, key: str) -> bool:
+    """
+    Check whether an object exists.
+
+    Raises:
+        botocore.exceptions.ClientError: On errors other than a missing object.
+    """
+    try:
+        await run_in_threadpool(s3_client.head_object, Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def lien_ket_s3(bucket: str, key: str) -> str:
+    """
+    Return the public URL of an object.
+    """
+    return f"https://{bucket}.s3-{settings.AWS_REGION_NAME}.amazonaws.com/{key}"
+
+
+async def tai_len_s3(fileobj: BinaryIO, bucket: str, key: str, content_type: Optional[str] = None) -> str:
+    """
+    Stream a file object to S3, multipart when it is large.
+
+    The file is read from its start; its position is undefined afterwards.
+
+    Parameters:
+        fileobj (BinaryIO): The file to upload, e.g. UploadFile.file.
+        bucket (str): The target bucket.
+        key (str): The object key.
+        content_type (Optional[str]): The Content-Type stored with the object.
+
+    Returns:
+        str: The URL of the uploaded object.
+
+    Raises:
+        botocore.exceptions.NoCredentialsError: If AWS credentials are not available.
+        Exception: If the upload fails.
+    """
+    fileobj.seek(0)
+    extra_args = {"ContentType": content_type} if content_type else None
+    await run_in_threadpool(
+        s3_client.upload_fileobj, fileobj, bucket, key, ExtraArgs=extra_args, Config=transfer_config
+    )
+    return lien_ket_s3(bucket, key)
+
+
+async def tai_xuong_s3(bucket: str, key: str, fileobj: BinaryIO) -> None:
+    """
+    Stream an object from S3 into a file object, rewound afterwards.
+
+    Parameters:
+        bucket (str): The bucket of the object.
+        key (str): The object key.
+        fileobj (BinaryIO): The writable file, e.g. a SpooledTemporaryFile.
+    """
+    await run_in_threadpool(s3_client.download_fileobj, bucket, key, fileobj, Config=transfer_config)
+    fileobj.seek(0)
@@ -0,0 +1,292 @@
+"""
+This module defines the pub/sub backplanes used by the websocket ConnectionManager
+to fan room events out across worker processes and nodes.
+
+A backplane only carries messages between managers; each manager still delivers
+them to its own sockets. Two implementations are provided:
+
+- InProcessBackplane: the default, for a single worker. Several instances can share
+  an InMemoryBus to simulate multiple workers inside one process (e.g. in tests).
+- PostgresBackplane: uses PostgreSQL LISTEN/NOTIFY over a dedicated asyncpg connection.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Callback invoked with (room_id, data) for every message received from another node
+MessageHandler = Callable[[str, Any], Awaitable[None]]
+
+
+class Backplane:
+    """
+    Base interface for websocket backplanes.
+
+    Attributes:
+        node_id (str): The unique identifier of this worker on the backplane.
+    """
+
+    def __init__(self) -> None:
+        self.node_id = uuid.uuid4().hex
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        """
+        Start receiving messages published by other nodes.
+
+        Parameters:
+            handler (MessageHandler): Coroutine called for each remote message.
+        """
+        self._handler = handler
+
+    async def stop(self) -> None:
+        """
+        Stop receiving messages and release any resources.
+        """
+        self._handler = None
+
+    async def publish(self, room_id: str, data: Any) -> None:
+        """
+        Publish a room event to every other node.
+
+        Parameters:
+            room_id (str): The room the event belongs to.
+            data (Any): The JSON-serialisable event payload.
+        """
+        raise NotImplementedError
+
+    async def _deliver(self, room_id: str, data: Any) -> None:
+        if self._handler is None:
+            return
+        try:
+            await self._handler(room_id, data)
+        except Exception as e:
+            logger.error("Error while delivering backplane message: %s", e)
+
+
+class InMemoryBus:
+    """
+    A process-local message bus shared by InProcessBackplane instances.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: List["InProcessBackplane"] = []
+
+
+class InProcessBackplane(Backplane):
+    """
+    Backplane that only reaches backplanes attached to the same InMemoryBus.
+
+    With a private bus (the default) there are no other nodes and publishing is a no-op.
+    """
+
+    def __init__(self, bus: Optional[InMemoryBus] = None) -> None:
+        super().__init__()
+        self.bus = bus or InMemoryBus()
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        if self not in self.bus.subscribers:
+            self.bus.subscribers.append(self)
+
+    async def stop(self) -> None:
+        if self in self.bus.subscribers:
+            self.bus.subscribers.remove(self)
+        await super().stop()
+
+    async def publish(self, room_id: str, data: Any) -> None:
+        for subscriber in self.bus.subscribers[:]:
+            if subscriber is not self:
+                await subscriber._deliver(room_id, data)
+
+
+class PostgresBackplane(Backplane):
+    """
+    Backplane based on PostgreSQL LISTEN/NOTIFY.
+
+    NOTIFY payloads are limited to 8000 bytes, so larger messages are split into
+    chunks sent within one transaction (which PostgreSQL delivers contiguously)
+    and reassembled by the receivers.
+
+    The listener connection is watched (termination callback plus a periodic
+    ping); when it drops, it is reopened with backoff and LISTEN is issued again.
+    NOTIFY is not queued for absent listeners, so events published during the
+    gap are lost; the gap is logged.
+    """
+
+    CHANNEL = "jamcircle_websocket"
+    CHUNK_SIZE = 7000
+    PING_INTERVAL = 10.0
+    PING_TIMEOUT = 5.0
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self, dsn: str, channel: str = CHANNEL) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._publish_conn: Optional[asyncpg.Connection] = None
+        self._publish_lock = asyncio.Lock()
+        self._partial: Dict[str, List[str]] = {}
+        self._inbox: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+        self._consumer: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        await self._listen()
+        self._publish_conn = await asyncpg.connect(self.dsn)
+        self._consumer = asyncio.create_task(self._consume())
+        self._watcher = asyncio.create_task(self._watch())
+        logger.info("Listening for websocket events on channel %s", self.channel)
+
+    async def _listen(self) -> None:
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminate)
+        self._listen_conn = conn
+        self._lost.clear()
+        # Chunks of a message cut by the disconnect will never complete
+        self._partial.clear()
+
+    def _on_terminate(self, conn) -> None:
+        # Bo qua ket noi cu da dong chu dong
+        if conn is self._listen_conn:
+            self._lost.set()
+
+    async def _ping(self) -> bool:
+        conn = self._listen_conn
+        if conn is None or conn.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(conn.fetchval("SELECT 1"), self.PING_TIMEOUT)
+            return True
+        except (asyncio.TimeoutError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            return False
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), self.PING_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if not self._lost.is_set() and await self._ping():
+                continue
+            mat_luc = time.monotonic()
+            logger.warning("Backplane listener connection lost, reconnecting")
+            conn, self._listen_conn = self._listen_conn, None
+            await self._close(conn)
+            delay = 0.5
+            while True:
+                try:
+                    await self._listen()
+                    break
+                except Exception as e:
+                    logger.error("Backplane reconnect failed, retrying in %.1fs: %s", delay, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+            logger.warning(
+                "Backplane listener reconnected after %.1fs; events published meanwhile were missed",
+                time.monotonic() - mat_luc,
+            )
+
+    @staticmethod
+    async def _close(conn: Optional[asyncpg.Connection]) -> None:
+        if conn is None or conn.is_closed():
+            return
+        try:
+            await asyncio.wait_for(conn.close(), PostgresBackplane.PING_TIMEOUT)
+        except Exception:
+            conn.terminate()
+
+    async def stop(self) -> None:
+        for task in (self._watcher, self._consumer):
+            if task is not None:
+                task.cancel()
+        self._watcher = None
+        self._consumer = None
+        conns = (self._listen_conn, self._publish_conn)
+        self._listen_conn = None
+        self._publish_conn = None
+        for conn in conns:
+            await self._close(conn)
+        self._partial.clear()
+        await super().stop()
+
+    def _split(self, room_id: str, data: Any) -> List[str]:
+        body = json.dumps(
+            {"node_id": self.node_id, "room_id": room_id, "data": data}, default=str
+        )
+        message_id = uuid.uuid4().hex
+        chunks = [
+            body[i : i + self.CHUNK_SIZE] for i in range(0, len(body), self.CHUNK_SIZE)
+        ] or [""]
+        return [
+            f"{message_id}|{index}|{len(chunks)}|{chunk}"
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def _join(self, payload: str) -> Optional[Tuple[str, Any]]:
+        message_id, index, total, chunk = payload.split("|", 3)
+        parts = self._partial.setdefault(message_id, [])
+        parts.append(chunk)
+        if int(index) + 1 < int(total):
+            return None
+        del self._partial[message_id]
+        message = json.loads("".join(parts))
+        if message.get("node_id") == self.node_id:
+            return None
+        return message["room_id"], message["data"]
+
+    async def publish(self, room_id: str, data: Any) -> None:
+        if self._publish_conn is None:
+            return
+        payloads = self._split(room_id, data)
+        async with self._publish_lock:
+            if self._publish_conn.is_closed():
+                # Mo lai ket noi publish bi mat; loi se duoc tra ve cho nguoi goi
+                self._publish_conn = await asyncpg.connect(self.dsn)
+            async with self._publish_conn.transaction():
+                for payload in payloads:
+                    await self._publish_conn.execute(
+                        "SELECT pg_notify($1, $2)", self.channel, payload
+                    )
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = self._join(payload)
+        except (ValueError, KeyError) as e:
+            logger.error("Malformed backplane payload: %s", e)
+            return
+        if message is not None:
+            self._inbox.put_nowait(message)
+
+    async def _consume(self) -> None:
+        # Deliver sequentially so room events keep their publish order
+        while True:
+            room_id, data = await self._inbox.get()
+            await self._deliver(room_id, data)
+
+
+def get_backplane(kind: str, dsn: Optional[str] = None) -> Backplane:
+    """
+    Create the backplane selected by configuration.
+
+    Parameters:
+        kind (str): "in_process" or "postgres".
+        dsn (Optional[str]): The asyncpg DSN, required for the PostgreSQL backplane.
+
+    Returns:
+        Backplane: The configured backplane instance.
+    """
+    if kind == "postgres":
+        return PostgresBackplane(dsn)
+    return InProcessBackplane()
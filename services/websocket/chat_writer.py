@@ -0,0 +1,192 @@
+"""
+This module implements the write-behind ingestion of chat messages.
+
+A gui_tin_nhan event is given its id and thoi_gian_tao by the server, broadcast
+right away and queued here. A background task persists the queue with one
+multi-row INSERT every CHAT_FLUSH_INTERVAL seconds, or sooner once
+CHAT_FLUSH_BATCH_SIZE messages are waiting, and the queue is flushed when the
+application shuts down.
+
+Durability: a message is acknowledged (broadcast) before it is stored. A crash
+or kill of the worker loses at most the messages of the last interval; a
+graceful shutdown loses nothing. While PostgreSQL is unavailable messages are
+kept and retried, up to CHAT_MAX_PENDING, after which the oldest are dropped
+and logged. The REST history and search endpoints can lag the live room by one
+interval; the in-memory recent history sent on join does not.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, func
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from config.config import settings
+from config.database.database import AsyncSessionLocal
+from models.tin_nhan import TinNhan
+from utils.text import bo_dau
+
+logger = logging.getLogger(__name__)
+
+
+def _uuid_hoac_none(value: Any) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _loi_ket_noi(e: Exception) -> bool:
+    # Loi CSDL khong do du lieu (mat ket noi...): giu hang doi de thu lai
+    return isinstance(e, SQLAlchemyError) and not isinstance(e, (IntegrityError, DataError))
+
+
+class ChatWriteBehind:
+    """
+    Queues chat messages and persists them in batched INSERTs.
+
+    Attributes:
+        interval (float): Seconds between two background flushes.
+        batch_size (int): Queue length that triggers an early flush, and the rows per INSERT.
+        max_pending (int): The maximum number of unsaved messages kept while the database is down.
+        pending (List[Dict[str, Any]]): The unsaved rows, oldest first.
+    """
+
+    def __init__(self, interval: float, batch_size: int, max_pending: int) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._day = asyncio.Event()
+
+    def them(
+        self,
+        phong_nghe_nhac_id: str,
+        thanh_vien_phong_id: str,
+        noi_dung: str,
+        tin_nhan_tra_loi_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Queue a new message.
+
+        Parameters:
+            phong_nghe_nhac_id (str): The ID of the room.
+            thanh_vien_phong_id (str): The ID of the sending member.
+            noi_dung (str): The content of the message.
+            tin_nhan_tra_loi_id (Optional[str]): The ID of the message replied to, ignored if malformed.
+
+        Returns:
+            Dict[str, Any]: The message with its server-assigned id and thoi_gian_tao,
+                in the shape broadcast to room members.
+
+        Raises:
+            ValueError: If noi_dung is not a non-empty string, or the room or member ID is not a valid UUID.
+        """
+        # Kiem tra truoc khi phat: dong khong luu duoc se chan ca hang doi
+        if not isinstance(noi_dung, str) or not noi_dung.strip():
+            raise ValueError("noi_dung must be a non-empty string")
+        row = {
+            "id": uuid.uuid4(),
+            "noi_dung": noi_dung,
+            "tin_nhan_tra_loi_id": _uuid_hoac_none(tin_nhan_tra_loi_id),
+            "thoi_gian_tao": datetime.now(),
+            "thanh_vien_phong_id": uuid.UUID(str(thanh_vien_phong_id)),
+            "phong_nghe_nhac_id": uuid.UUID(str(phong_nghe_nhac_id)),
+        }
+        row["thoi_gian_cap_nhat"] = row["thoi_gian_tao"]
+        self.pending.append(row)
+        if len(self.pending) >= self.batch_size:
+            self._day.set()
+        return {
+            "id": str(row["id"]),
+            "thanh_vien_phong_id": str(row["thanh_vien_phong_id"]),
+            "noi_dung": noi_dung,
+            "tin_nhan_tra_loi_id": str(row["tin_nhan_tra_loi_id"]) if row["tin_nhan_tra_loi_id"] else None,
+            "thoi_gian_tao": str(row["thoi_gian_tao"]),
+            "phong_nghe_nhac_id": str(row["phong_nghe_nhac_id"]),
+        }
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        # Core INSERT skips the mapper events, so tim_kiem is computed here
+        return insert(TinNhan).values(
+            [{**row, "tim_kiem": func.to_tsvector("simple", bo_dau(row["noi_dung"]))} for row in rows]
+        )
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        # Bad rows are dropped, whatever the error; other database errors (database
+        # down) propagate for a retry
+        async with AsyncSessionLocal() as session:
+            try:
+                await session.execute(self._insert(rows))
+                await session.commit()
+                return
+            except Exception as e:
+                if _loi_ket_noi(e):
+                    raise
+                await session.rollback()
+                logger.warning("Batch insert of %s messages failed, retrying row by row: %s", len(rows), e)
+            # One bad row (e.g. an unknown tin_nhan_tra_loi_id) must not block the others
+            for row in rows:
+                try:
+                    await session.execute(self._insert([row]))
+                    await session.commit()
+                except Exception as e:
+                    if _loi_ket_noi(e):
+                        raise
+                    await session.rollback()
+                    logger.error("Dropping message %s that cannot be stored: %s", row["id"], e)
+
+    async def flush(self) -> None:
+        """
+        Persist every queued message now.
+        """
+        async with self._lock:
+            self._day.clear()
+            while self.pending:
+                batch = self.pending[: self.batch_size]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    logger.error("Error while flushing chat messages, %s kept for retry: %s", len(self.pending), e)
+                    if len(self.pending) > self.max_pending:
+                        bo = len(self.pending) - self.max_pending
+                        logger.error("Chat queue full, dropping the %s oldest messages", bo)
+                        del self.pending[:bo]
+                    return
+                del self.pending[: len(batch)]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._day.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Unexpected error in chat flusher: %s", e)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            # Cho task dung han truoc lan flush cuoi
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+chat_writer = ChatWriteBehind(
+    settings.CHAT_FLUSH_INTERVAL, settings.CHAT_FLUSH_BATCH_SIZE, settings.CHAT_MAX_PENDING
+)
@@ -1,30 +1,227 @@
+import asyncio
+import json
+import time
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import Any, Awaitable, Callable, List, Dict, Optional
+
+from config.config import settings
+from services.websocket.backplane import Backplane, InProcessBackplane, get_backplane
+
+
+class ThongKeGuiPhong:
+    """
+    Fan-out statistics of a room, measured from broadcast to socket write.
+
+    Attributes:
+        so_tin (int): The number of messages broadcast to the room.
+        so_lan_gui (int): The number of successful socket writes.
+        so_tin_bi_bo (int): The number of messages dropped for slow consumers.
+        so_ket_noi_bi_ngat (int): The number of connections closed as slow or broken.
+        tong_do_tre (float): The accumulated delivery latency in seconds.
+        do_tre_toi_da (float): The highest delivery latency in seconds.
+    """
+
+    def __init__(self):
+        self.so_tin = 0
+        self.so_lan_gui = 0
+        self.so_tin_bi_bo = 0
+        self.so_ket_noi_bi_ngat = 0
+        self.tong_do_tre = 0.0
+        self.do_tre_toi_da = 0.0
+
+    def ghi_nhan_gui(self, do_tre: float):
+        self.so_lan_gui += 1
+        self.tong_do_tre += do_tre
+        self.do_tre_toi_da = max(self.do_tre_toi_da, do_tre)
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "so_tin": self.so_tin,
+            "so_lan_gui": self.so_lan_gui,
+            "so_tin_bi_bo": self.so_tin_bi_bo,
+            "so_ket_noi_bi_ngat": self.so_ket_noi_bi_ngat,
+            "do_tre_trung_binh_ms": (
+                self.tong_do_tre / self.so_lan_gui * 1000 if self.so_lan_gui else 0.0
+            ),
+            "do_tre_toi_da_ms": self.do_tre_toi_da * 1000,
+        }
+
+
+class ClientConnection:
+    """
+    A websocket with its own bounded send queue and writer task, so that a slow
+    client only delays itself and never the rest of the room.
+    """
+
+    def __init__(self, manager: "ConnectionManager", room_id: str, websocket: WebSocket):
+        self.manager = manager
+        self.room_id = room_id
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[tuple]" = asyncio.Queue(
+            maxsize=settings.WEBSOCKET_SEND_QUEUE_SIZE
+        )
+        self.writer = asyncio.create_task(self._write())
+        # Giu tham chieu de task drop khong bi GC thu hoi giua chung
+        self.drop_task: Optional[asyncio.Task] = None
+
+    def enqueue(self, text: str, bat_dau: float) -> bool:
+        """
+        Queue an already serialised message without waiting.
+
+        Returns:
+            bool: False if the connection must be dropped as a slow consumer.
+        """
+        thong_ke = self.manager.get_thong_ke(self.room_id)
+        if self.queue.full():
+            if settings.WEBSOCKET_SLOW_CONSUMER_POLICY == "disconnect":
+                return False
+            # Bỏ tin cũ nhất để giữ trạng thái mới nhất cho client chậm
+            self.queue.get_nowait()
+            self.queue.task_done()
+            thong_ke.so_tin_bi_bo += 1
+        self.queue.put_nowait((text, bat_dau))
+        return True
+
+    async def _write(self):
+        thong_ke = self.manager.get_thong_ke(self.room_id)
+        while True:
+            text, bat_dau = await self.queue.get()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(text),
+                    timeout=settings.WEBSOCKET_SEND_TIMEOUT,
+                )
+            except Exception as e:
+                print(f"Error broadcasting to connection: {e}")
+                self.schedule_drop()
+                return
+            finally:
+                self.queue.task_done()
+            thong_ke.ghi_nhan_gui(time.perf_counter() - bat_dau)
+
+    def schedule_drop(self):
+        # Ngắt trong task riêng để không chặn vòng gửi của người gọi; chỉ ngắt một lần
+        if self.drop_task is None:
+            self.drop_task = asyncio.create_task(self.manager.drop(self.room_id, self))
+
+    async def close(self, flush: bool = False):
+        # Khi rời phòng bình thường, gửi nốt các tin đang chờ trước khi dừng
+        if flush and not self.writer.done():
+            try:
+                await asyncio.wait_for(
+                    self.queue.join(), timeout=settings.WEBSOCKET_SEND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                pass
+        self.writer.cancel()
+
 
 # Quản lý trạng thái phòng nghe nhạc
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, backplane: Optional[Backplane] = None):
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self.thong_ke: Dict[str, ThongKeGuiPhong] = {}
+        # Kênh trung gian để chuyển sự kiện phòng giữa các worker
+        self.backplane: Backplane = backplane or InProcessBackplane()
+        # Các hàm được gọi khi nhận sự kiện phòng từ worker khác
+        self.remote_listeners: List[Callable[[str, Any], None]] = []
+
+    async def start(self):
+        await self.backplane.start(self._receive_remote)
+
+    def add_remote_listener(self, listener: Callable[[str, Any], None]):
+        self.remote_listeners.append(listener)
+
+    async def _receive_remote(self, room_id: str, data: Any):
+        for listener in self.remote_listeners:
+            try:
+                listener(room_id, data)
+            except Exception as e:
+                print(f"Error handling remote event: {e}")
+        await self.send_local(room_id, data)
+
+    async def stop(self):
+        await self.backplane.stop()
+        for connections in list(self.active_connections.values()):
+            for connection in connections:
+                await connection.close()
+        self.active_connections.clear()
+
+    def get_thong_ke(self, room_id: str) -> ThongKeGuiPhong:
+        if room_id not in self.thong_ke:
+            self.thong_ke[room_id] = ThongKeGuiPhong()
+        return self.thong_ke[room_id]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            room_id: {
+                "so_ket_noi": len(self.active_connections.get(room_id, [])),
+                **thong_ke.dict(),
+            }
+            for room_id, thong_ke in self.thong_ke.items()
+        }
 
     async def connect(self, room_id: str, websocket: WebSocket):
         await websocket.accept()
         if room_id not in self.active_connections:
             self.active_connections[room_id] = []
-        self.active_connections[room_id].append(websocket)
+        self.active_connections[room_id].append(ClientConnection(self, room_id, websocket))
 
     async def disconnect(self, room_id: str, websocket: WebSocket):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
+        for connection in self.active_connections.get(room_id, [])[:]:
+            if connection.websocket is websocket:
+                await self._remove(room_id, connection, flush=True)
+
+    async def _remove(self, room_id: str, connection: ClientConnection, flush: bool = False):
+        connections = self.active_connections.get(room_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            await connection.close(flush=flush)
+        if room_id in self.active_connections and not self.active_connections[room_id]:
+            del self.active_connections[room_id]
+            self.thong_ke.pop(room_id, None)
 
+    async def drop(self, room_id: str, connection: ClientConnection):
+        # Ngắt kết nối client chậm hoặc lỗi; vòng nhận của endpoint sẽ tự dọn dẹp
+        self.get_thong_ke(room_id).so_ket_noi_bi_ngat += 1
+        await self._remove(room_id, connection)
+        try:
+            await connection.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def send_local(self, room_id: str, data: Any):
+        # Gửi tới các kết nối của phòng trên worker hiện tại
+        connections = self.active_connections.get(room_id)
+        if not connections:
+            return
+        bat_dau = time.perf_counter()
+        # Serialize một lần cho cả phòng
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+        self.get_thong_ke(room_id).so_tin += 1
+        for connection in connections[:]:
+            if not connection.enqueue(text, bat_dau):
+                connection.schedule_drop()
+
+    async def send_personal(self, room_id: str, websocket: WebSocket, data: Any):
+        # Gửi riêng cho một kết nối, qua cùng hàng đợi để không ghi song song lên socket
+        for connection in self.active_connections.get(room_id, []):
+            if connection.websocket is websocket:
+                text = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+                if not connection.enqueue(text, time.perf_counter()):
+                    connection.schedule_drop()
+                return
 
     async def broadcast(self, data: dict, room_id: str):
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id][:]:
-                try:
-                    await connection.send_json(data)
-                except Exception as e:
-                    # Log and remove problematic connection
-                    self.active_connections[room_id].remove(connection)
-                    print(f"Error broadcasting to connection: {e}")
-
-manager = ConnectionManager()
+        await self.send_local(room_id, data)
+        try:
+            await self.backplane.publish(room_id, data)
+        except Exception as e:
+            print(f"Error publishing to backplane: {e}")
+
+manager = ConnectionManager(
+    get_backplane(
+        settings.WEBSOCKET_BACKPLANE,
+        dsn=settings.POSTGRES_URI.replace("+asyncpg", ""),
+    )
+)
@@ -0,0 +1,115 @@
+"""
+This module implements a write-behind coalescer for the playback state of rooms.
+
+Play, pause and seek events only record the latest trang_thai_phat,
+thoi_gian_hien_tai_bai_hat and so_thu_tu_bai_hat_dang_phat of a room in memory.
+A background task then writes every changed room in one batched UPDATE per
+interval, and a room is flushed immediately when it closes or the application
+shuts down. Between flushes the database can lag behind the live room by up to
+PLAYBACK_FLUSH_INTERVAL seconds; a crash loses at most that window of playback
+position, never membership or chat data.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.config import settings
+from config.database.database import AsyncSessionLocal
+from models.phong_nghe_nhac import PhongNgheNhac
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackWriteBehind:
+    """
+    Coalesces playback updates per room and persists them in batches.
+
+    Attributes:
+        interval (float): Seconds between two background flushes.
+        pending (Dict[str, Dict[str, Any]]): The latest unsaved fields of each room.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def ghi(self, room_id: str, **fields) -> None:
+        """
+        Record the latest playback fields of a room; later calls overwrite earlier ones.
+        """
+        room_fields = self.pending.setdefault(str(room_id), {})
+        room_fields.update(fields)
+        room_fields["thoi_gian_cap_nhat"] = datetime.now()
+
+    async def _write(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        async with AsyncSessionLocal() as session:
+            try:
+                # Bulk UPDATE by primary key, sent as a single executemany
+                await session.execute(
+                    update(PhongNgheNhac),
+                    [{"id": uuid.UUID(room_id), **fields} for room_id, fields in batch.items()],
+                )
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.error("Error while flushing playback state: %s", e)
+                self._tra_lai(batch)
+
+    def _tra_lai(self, batch: Dict[str, Dict[str, Any]]) -> None:
+        # Keep the values for the next attempt unless newer ones arrived
+        for room_id, fields in batch.items():
+            newer = self.pending.get(room_id, {})
+            self.pending[room_id] = {**fields, **newer}
+
+    async def flush(self, room_id: Optional[str] = None) -> None:
+        """
+        Persist pending updates now, for one room or for every room.
+        """
+        async with self._lock:
+            if room_id is None:
+                batch, self.pending = self.pending, {}
+            else:
+                fields = self.pending.pop(str(room_id), None)
+                batch = {str(room_id): fields} if fields else {}
+            try:
+                await self._write(batch)
+            except BaseException:
+                # Bi huy giua chung (stop) hoac loi khac: giu lai lo cho lan flush sau
+                self._tra_lai(batch)
+                raise
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Unexpected error in playback flusher: %s", e)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            # Cho task dung han truoc lan flush cuoi
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+playback_writer = PlaybackWriteBehind(settings.PLAYBACK_FLUSH_INTERVAL)
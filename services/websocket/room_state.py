@@ -0,0 +1,516 @@
+"""
+This module keeps an authoritative in-memory state for every active PhongNgheNhac,
+so the websocket endpoint can answer joins and member-list broadcasts without
+re-reading the room, its members and every member's NguoiDung row each time.
+
+The state is loaded lazily with a constant number of queries, updated in place by
+the websocket actions, and writes that do not need to block the caller are
+persisted in the background.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from config.database.database import AsyncSessionLocal
+from models.nguoi_dung import NguoiDung
+from models.phong_nghe_nhac import PhongNgheNhac
+from models.thanh_vien_phong import ThanhVienPhong
+from models.tin_nhan import TinNhan
+from services.websocket.manager import manager as connection_manager
+
+logger = logging.getLogger(__name__)
+
+# Backplane channel used to invalidate member lists on the other workers
+KENH_THANH_VIEN_PHONG = "__thanh_vien_phong__"
+
+
+def tin_nhan_dict(tin_nhan: TinNhan) -> Dict[str, Any]:
+    """
+    Serialize a TinNhan the way it is broadcast to room members.
+    """
+    return {
+        "id": str(tin_nhan.id),
+        "thanh_vien_phong_id": str(tin_nhan.thanh_vien_phong_id),
+        "noi_dung": tin_nhan.noi_dung,
+        "tin_nhan_tra_loi_id": str(tin_nhan.tin_nhan_tra_loi_id) if tin_nhan.tin_nhan_tra_loi_id else None,
+        "thoi_gian_tao": str(tin_nhan.thoi_gian_tao),
+        "phong_nghe_nhac_id": str(tin_nhan.phong_nghe_nhac_id),
+    }
+
+
+def doc_so_phat(gia_tri: Any, mac_dinh: Optional[float], la_toc_do: bool = False) -> Optional[float]:
+    """
+    Coerce a playback position or rate sent by a client.
+
+    Parameters:
+        gia_tri (Any): The raw value; None or "" gives mac_dinh.
+        mac_dinh (Optional[float]): The default value.
+        la_toc_do (bool): Validate a rate (> 0) instead of a position (>= 0).
+
+    Returns:
+        Optional[float]: The validated value.
+
+    Raises:
+        ValueError: If the value is not a finite number in range.
+    """
+    if gia_tri is None or gia_tri == "":
+        return mac_dinh
+    if isinstance(gia_tri, bool):
+        raise ValueError("Gia tri phat khong hop le")
+    try:
+        so = float(gia_tri)
+    except (TypeError, ValueError):
+        raise ValueError("Gia tri phat khong hop le")
+    if not math.isfinite(so) or so < 0 or (la_toc_do and so == 0):
+        raise ValueError("Gia tri phat khong hop le")
+    return so
+
+
+class PlaybackClock:
+    """
+    Server-authoritative playback clock of a room.
+
+    The position is derived from a monotonic anchor instead of being stored, so
+    answering "where is the room now" costs O(1) and never drifts with client clocks.
+
+    Attributes:
+        dang_phat (bool): Whether the room is currently playing.
+        so_thu_tu (Optional[int]): The playlist position of the current song.
+        bai_hat_id (Optional[str]): The ID of the current song.
+        vi_tri_goc (float): The song position in seconds at the anchor.
+        moc (float): The time.monotonic() value the position was anchored at.
+        toc_do (float): The playback rate.
+    """
+
+    def __init__(self, dang_phat: bool = False, so_thu_tu: Optional[int] = None, vi_tri: float = 0.0) -> None:
+        self.dang_phat = dang_phat
+        self.so_thu_tu = so_thu_tu
+        self.bai_hat_id: Optional[str] = None
+        self.vi_tri_goc = float(vi_tri or 0)
+        self.moc = time.monotonic()
+        self.toc_do = 1.0
+
+    def vi_tri(self) -> float:
+        """
+        Return the current song position in seconds.
+        """
+        if not self.dang_phat:
+            return self.vi_tri_goc
+        return self.vi_tri_goc + (time.monotonic() - self.moc) * self.toc_do
+
+    def phat(self, so_thu_tu: Optional[int], bai_hat_id: Optional[str], vi_tri: float, toc_do: float = 1.0) -> None:
+        self.dang_phat = True
+        self.so_thu_tu = so_thu_tu
+        self.bai_hat_id = bai_hat_id
+        self.vi_tri_goc = float(vi_tri or 0)
+        self.moc = time.monotonic()
+        self.toc_do = toc_do
+
+    def dung(self, so_thu_tu: Optional[int], bai_hat_id: Optional[str], vi_tri: Optional[float] = None) -> None:
+        self.vi_tri_goc = self.vi_tri() if vi_tri is None else float(vi_tri)
+        self.dang_phat = False
+        self.so_thu_tu = so_thu_tu
+        self.bai_hat_id = bai_hat_id
+        self.moc = time.monotonic()
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "trang_thai_phat": "DangPhat" if self.dang_phat else "DungPhat",
+            "so_thu_tu": self.so_thu_tu,
+            "bai_hat_id": self.bai_hat_id,
+            "vi_tri": round(self.vi_tri(), 3),
+            "toc_do": self.toc_do,
+            "thoi_gian_may_chu": time.time(),
+        }
+
+
+class RoomState:
+    """
+    In-memory state of a single PhongNgheNhac.
+
+    Attributes:
+        room_id (str): The ID of the room.
+        phong_nghe_nhac (Dict[str, Any]): The room fields sent to clients.
+        thanh_viens (Dict[str, Dict[str, Any]]): Members keyed by ThanhVienPhong ID,
+            including the member's display name and avatar.
+        danh_sach_bai_hat (Optional[List[Dict[str, Any]]]): The ordered playlist, loaded on demand.
+        dong_ho (PlaybackClock): The playback clock of the room.
+        tin_nhan_gan_day (Deque[Dict[str, Any]]): Ring buffer of the last CHAT_HISTORY_SIZE
+            messages, oldest first, sent to members when they join.
+    """
+
+    def __init__(self, room_id: str, phong_nghe_nhac: Dict[str, Any]) -> None:
+        self.room_id = room_id
+        self.phong_nghe_nhac = phong_nghe_nhac
+        # The stored position has no start time, so the clock is anchored at load time
+        self.dong_ho = PlaybackClock(
+            dang_phat=phong_nghe_nhac.get("trang_thai_phat") == "DangPhat",
+            so_thu_tu=phong_nghe_nhac.get("so_thu_tu_bai_hat_dang_phat"),
+            vi_tri=phong_nghe_nhac.get("thoi_gian_hien_tai_bai_hat") or 0,
+        )
+        self.thanh_viens: Dict[str, Dict[str, Any]] = {}
+        self.danh_sach_bai_hat: Optional[List[Dict[str, Any]]] = None
+        self.tin_nhan_gan_day: Deque[Dict[str, Any]] = deque(maxlen=settings.CHAT_HISTORY_SIZE)
+        self._tin_nhan_da_tai = False
+        self._thanh_vien_cu = True
+        self._khoa = asyncio.Lock()
+
+    @property
+    def danh_sach_phat_id(self) -> str:
+        return self.phong_nghe_nhac["danh_sach_phat_id"]
+
+    async def _tai_thanh_vien(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(ThanhVienPhong, NguoiDung)
+            .join(NguoiDung, ThanhVienPhong.nguoi_dung_id == NguoiDung.id)
+            .where(ThanhVienPhong.phong_nghe_nhac_id == self.room_id)
+        )
+        self.thanh_viens = {
+            str(tv.id): {
+                "id": str(tv.id),
+                "nguoi_dung_id": str(nd.id),
+                "ho_ten": nd.ten_nguoi_dung,
+                "avatar": nd.anh_dai_dien,
+                "trang_thai": tv.trang_thai,
+                "quyen": tv.quyen,
+            }
+            for tv, nd in result.all()
+        }
+        self._thanh_vien_cu = False
+
+    async def lay_thanh_viens(self, session: AsyncSession) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the members, reloading them in a single query if they were invalidated.
+        """
+        if self._thanh_vien_cu:
+            async with self._khoa:
+                if self._thanh_vien_cu:
+                    await self._tai_thanh_vien(session)
+        return self.thanh_viens
+
+    async def _tai_tin_nhan(self, session: AsyncSession) -> None:
+        result = await session.execute(
+            select(TinNhan)
+            .where(TinNhan.phong_nghe_nhac_id == self.room_id)
+            .order_by(TinNhan.thoi_gian_tao.desc(), TinNhan.id.desc())
+            .limit(self.tin_nhan_gan_day.maxlen)
+        )
+        da_co = {tin_nhan["id"] for tin_nhan in self.tin_nhan_gan_day}
+        moi = [tin_nhan_dict(tn) for tn in reversed(result.scalars().all()) if str(tn.id) not in da_co]
+        # messages received while loading are newer than the stored ones
+        self.tin_nhan_gan_day.extendleft(reversed(moi))
+        self._tin_nhan_da_tai = True
+
+    async def lay_tin_nhan_gan_day(self, session: AsyncSession) -> List[Dict[str, Any]]:
+        """
+        Return the recent messages, loading them once when the room becomes active.
+        """
+        if not self._tin_nhan_da_tai:
+            async with self._khoa:
+                if not self._tin_nhan_da_tai:
+                    await self._tai_tin_nhan(session)
+        return list(self.tin_nhan_gan_day)
+
+    def them_tin_nhan(self, tin_nhan: Dict[str, Any]) -> None:
+        """
+        Append a new message to the ring buffer.
+        """
+        self.tin_nhan_gan_day.append(tin_nhan)
+
+    def danh_dau_thanh_vien_cu(self) -> None:
+        """
+        Mark the member list stale after a change made outside this state object.
+        """
+        self._thanh_vien_cu = True
+
+    def tim_thanh_vien(self, nguoi_dung_id: str) -> Optional[Dict[str, Any]]:
+        nguoi_dung_id = str(nguoi_dung_id)
+        for thanh_vien in self.thanh_viens.values():
+            if thanh_vien["nguoi_dung_id"] == nguoi_dung_id:
+                return thanh_vien
+        return None
+
+    async def xac_thuc_thanh_vien(self, session: AsyncSession, nguoi_dung_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the member of a nguoi_dung, reloading the member list once on a miss
+        in case the nguoi_dung was accepted after it was cached.
+        """
+        thanh_vien = self.tim_thanh_vien(nguoi_dung_id)
+        if thanh_vien is None:
+            self.danh_dau_thanh_vien_cu()
+            await self.lay_thanh_viens(session)
+            thanh_vien = self.tim_thanh_vien(nguoi_dung_id)
+        return thanh_vien
+
+    def cap_nhat_thanh_vien(self, thanh_vien_phong_id: str, **fields) -> None:
+        thanh_vien = self.thanh_viens.get(str(thanh_vien_phong_id))
+        if thanh_vien is not None:
+            thanh_vien.update(fields)
+
+    def xoa_thanh_vien(self, thanh_vien_phong_id: str) -> None:
+        self.thanh_viens.pop(str(thanh_vien_phong_id), None)
+
+    def tat_ca_thanh_vien(self) -> List[Dict[str, Any]]:
+        """
+        Return the member list in the shape broadcast to clients, sorted by status.
+        """
+        return [
+            {
+                "id": tv["id"],
+                "ho_ten": tv["ho_ten"],
+                "avatar": tv["avatar"],
+                "trang_thai": tv["trang_thai"],
+                "quyen": tv["quyen"],
+            }
+            for tv in sorted(self.thanh_viens.values(), key=lambda x: x["trang_thai"])
+        ]
+
+    def cap_nhat_phat(self, **fields) -> None:
+        """
+        Update the playback fields of the room (trang_thai_phat, thoi_gian_hien_tai_bai_hat, ...).
+        """
+        self.phong_nghe_nhac.update(fields)
+        self.phong_nghe_nhac["thoi_gian_cap_nhat"] = str(datetime.now())
+
+    def phat(self, so_thu_tu: Optional[int], bai_hat_id: Optional[str], vi_tri: float, toc_do: float = 1.0) -> None:
+        """
+        Start (or seek) playback and record it in the room fields.
+        """
+        self.dong_ho.phat(so_thu_tu, bai_hat_id, vi_tri, toc_do)
+        self.cap_nhat_phat(
+            trang_thai_phat="DangPhat",
+            so_thu_tu_bai_hat_dang_phat=so_thu_tu,
+            thoi_gian_hien_tai_bai_hat=int(self.dong_ho.vi_tri_goc),
+        )
+
+    def dung(self, so_thu_tu: Optional[int], bai_hat_id: Optional[str], vi_tri: Optional[float] = None) -> None:
+        """
+        Pause playback and record it in the room fields.
+        """
+        self.dong_ho.dung(so_thu_tu, bai_hat_id, vi_tri)
+        self.cap_nhat_phat(
+            trang_thai_phat="DungPhat",
+            so_thu_tu_bai_hat_dang_phat=so_thu_tu,
+            thoi_gian_hien_tai_bai_hat=int(self.dong_ho.vi_tri_goc),
+        )
+
+    def thong_tin_phong(self) -> Dict[str, Any]:
+        """
+        Return the room fields with the exact current position, for the join handshake.
+        """
+        return {
+            **self.phong_nghe_nhac,
+            "thoi_gian_hien_tai_bai_hat": int(self.dong_ho.vi_tri()),
+            "dong_ho": self.dong_ho.dict(),
+        }
+
+
+class RoomStateRegistry:
+    """
+    Registry of the RoomState of every room active on this worker.
+    """
+
+    def __init__(self) -> None:
+        self.rooms: Dict[str, RoomState] = {}
+        self._tac_vu_nen: Set[asyncio.Task] = set()
+        # Lan ghi gan nhat theo khoa, de cac lan ghi cung khoa chay dung thu tu
+        self._ghi_theo_khoa: Dict[str, asyncio.Task] = {}
+        self._dong_bo: Optional[asyncio.Task] = None
+
+    async def lay(self, session: AsyncSession, room_id: str) -> Optional[RoomState]:
+        """
+        Get the state of a room, loading it from the database on first use.
+
+        Returns:
+            Optional[RoomState]: The room state, or None if the room does not exist.
+        """
+        room_id = str(room_id)
+        state = self.rooms.get(room_id)
+        if state is None:
+            try:
+                result = await session.execute(
+                    select(PhongNgheNhac).where(PhongNgheNhac.id == room_id)
+                )
+            except SQLAlchemyError as e:
+                logger.error("Error while loading room state: %s", e)
+                return None
+            phong_nghe_nhac = result.scalars().first()
+            if phong_nghe_nhac is None:
+                return None
+            state = RoomState(
+                room_id,
+                {
+                    "id": str(phong_nghe_nhac.id),
+                    "ten_phong": phong_nghe_nhac.ten_phong,
+                    "trang_thai_phat": phong_nghe_nhac.trang_thai_phat,
+                    "thoi_gian_hien_tai_bai_hat": phong_nghe_nhac.thoi_gian_hien_tai_bai_hat,
+                    "so_thu_tu_bai_hat_dang_phat": phong_nghe_nhac.so_thu_tu_bai_hat_dang_phat,
+                    "danh_sach_phat_id": str(phong_nghe_nhac.danh_sach_phat_id),
+                    "thoi_gian_cap_nhat": str(phong_nghe_nhac.thoi_gian_cap_nhat),
+                },
+            )
+            self.rooms.setdefault(room_id, state)
+            state = self.rooms[room_id]
+        await state.lay_thanh_viens(session)
+        return state
+
+    def get(self, room_id: str) -> Optional[RoomState]:
+        return self.rooms.get(str(room_id))
+
+    def danh_dau_thanh_vien_cu(self, room_id: str) -> None:
+        """
+        Mark the member list of a room stale here and on the other workers.
+        """
+        state = self.get(room_id)
+        if state is not None:
+            state.danh_dau_thanh_vien_cu()
+
+        async def _phat():
+            try:
+                await connection_manager.backplane.publish(KENH_THANH_VIEN_PHONG, {"room_id": str(room_id)})
+            except Exception as e:
+                logger.error("Error while publishing member invalidation: %s", e)
+
+        task = asyncio.create_task(_phat())
+        self._tac_vu_nen.add(task)
+        task.add_done_callback(self._tac_vu_nen.discard)
+
+    def xoa(self, room_id: str) -> None:
+        """
+        Drop the state of a room, e.g. when its last local connection leaves.
+        """
+        self.rooms.pop(str(room_id), None)
+
+    def nhan_su_kien_tu_xa(self, room_id: str, data: Any) -> None:
+        """
+        Keep the local state coherent with events applied by other workers.
+        """
+        if room_id == KENH_THANH_VIEN_PHONG:
+            state = self.get(data["room_id"])
+            if state is not None:
+                state.danh_dau_thanh_vien_cu()
+            return
+        state = self.get(room_id)
+        if state is None or not isinstance(data, dict):
+            return
+        loai = data.get("type")
+        if loai in (
+            "thanh_vien_phong",
+            "roi_phong",
+            "xoa_thanh_vien_phong",
+            "cap_nhat_quyen_thanh_vien",
+            "yeu_cau_tham_gia_phong",
+        ):
+            state.danh_dau_thanh_vien_cu()
+        elif loai == "tin_nhan" and data.get("action") == "nhan_tin_nhan":
+            state.them_tin_nhan(data.get("data", {}))
+        elif loai == "danh_sach_phat":
+            state.danh_sach_bai_hat = data.get("data", {}).get("danh_sach_phat_bai_hat")
+        elif loai == "trang_thai_phat" and data.get("action") == "cap_nhat_trang_thai_phat":
+            du_lieu = data.get("data", {})
+            if du_lieu.get("trang_thai_phat") == "DangPhat":
+                state.phat(
+                    du_lieu.get("so_thu_tu"),
+                    du_lieu.get("bai_hat_id"),
+                    du_lieu.get("thoi_gian_bat_dau") or 0,
+                    du_lieu.get("toc_do") or 1.0,
+                )
+            else:
+                state.dung(
+                    du_lieu.get("so_thu_tu"),
+                    du_lieu.get("bai_hat_id"),
+                    du_lieu.get("thoi_gian_ket_thuc"),
+                )
+
+    def ghi_nen(self, ghi: Callable[[AsyncSession], Awaitable[None]], khoa: Optional[str] = None) -> None:
+        """
+        Run a database write in the background with its own session.
+
+        Parameters:
+            ghi (Callable): Coroutine function receiving the session to write with.
+            khoa (Optional[str]): Writes sharing a key run one after the other, in call order.
+        """
+        truoc = self._ghi_theo_khoa.get(khoa) if khoa is not None else None
+
+        async def _chay():
+            if truoc is not None:
+                await asyncio.wait([truoc])
+            async with AsyncSessionLocal() as session:
+                try:
+                    await ghi(session)
+                    await session.commit()
+                except SQLAlchemyError as e:
+                    await session.rollback()
+                    logger.error("Error while persisting room state: %s", e)
+
+        task = asyncio.create_task(_chay())
+        self._tac_vu_nen.add(task)
+        task.add_done_callback(self._tac_vu_nen.discard)
+        if khoa is not None:
+            self._ghi_theo_khoa[khoa] = task
+
+            def _xong(t: asyncio.Task) -> None:
+                if self._ghi_theo_khoa.get(khoa) is t:
+                    del self._ghi_theo_khoa[khoa]
+
+            task.add_done_callback(_xong)
+
+    def luu_trang_thai_thanh_vien(self, thanh_vien_phong_id: str, trang_thai: str) -> None:
+        """
+        Persist a member's presence status in the background, in call order per member.
+        """
+        async def _ghi(session: AsyncSession):
+            await session.execute(
+                update(ThanhVienPhong)
+                .where(ThanhVienPhong.id == thanh_vien_phong_id)
+                .values(trang_thai=trang_thai, thoi_gian_cap_nhat=datetime.now())
+            )
+
+        self.ghi_nen(_ghi, khoa=f"thanh_vien_phong:{thanh_vien_phong_id}")
+
+    async def _gui_dong_bo(self, interval: float) -> None:
+        # Only local sockets are ticked; every worker ticks its own connections
+        while True:
+            await asyncio.sleep(interval)
+            for room_id, state in list(self.rooms.items()):
+                if not state.dong_ho.dang_phat:
+                    continue
+                await connection_manager.send_local(
+                    room_id,
+                    {
+                        "type": "trang_thai_phat",
+                        "action": "dong_bo",
+                        "data": state.dong_ho.dict(),
+                    },
+                )
+
+    def bat_dau_dong_bo(self, interval: float) -> None:
+        """
+        Start emitting periodic sync ticks for rooms that are playing.
+        """
+        if self._dong_bo is None and interval > 0:
+            self._dong_bo = asyncio.create_task(self._gui_dong_bo(interval))
+
+    async def dong(self) -> None:
+        """
+        Stop the sync ticks and wait for pending background writes, used on application shutdown.
+        """
+        if self._dong_bo is not None:
+            self._dong_bo.cancel()
+            self._dong_bo = None
+        if self._tac_vu_nen:
+            await asyncio.gather(*self._tac_vu_nen, return_exceptions=True)
+
+
+room_states = RoomStateRegistry()
+connection_manager.add_remote_listener(room_states.nhan_su_kien_tu_xa)
@@ -1,12 +1,78 @@
 """
 This module provides utility functions for handling password security.
 It includes functionality for hashing passwords and verifying hashed passwords using bcrypt.
+
+bcrypt takes a few hundred milliseconds of CPU per call, so async code uses the
+*_async variants. They run on a dedicated thread pool of PASSWORD_HASH_WORKERS
+threads (bcrypt releases the GIL) and admit at most PASSWORD_HASH_QUEUE_SIZE
+waiting calls; beyond that HashingBusyError is raised at once instead of letting
+a login storm queue up without bound.
+
+Refresh tokens are not stored as is: bam_ma_lam_moi gives their HMAC-SHA256
+under REFRESH_TOKEN_HASH_KEY, a fixed 32-byte key that is cheap to index and
+useless to whoever reads the table.
 """
 
+import asyncio
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
 from passlib.context import CryptContext
 
+from config.config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+
+class HashingBusyError(Exception):
+    """
+    Raised when the password hashing queue is full; the request should be retried later.
+    """
+
+
+class HashingExecutor:
+    """
+    Bounded executor for password hashing.
+
+    Attributes:
+        max_workers (int): The number of hashing threads.
+        max_queue (int): The number of calls allowed to wait for a thread.
+        dang_cho (int): Calls currently running or waiting.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.dang_cho = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run func(*args) on a hashing thread.
+
+        Raises:
+            HashingBusyError: If max_workers + max_queue calls are already pending.
+        """
+        if self.dang_cho >= self.max_workers + self.max_queue:
+            raise HashingBusyError("Too many password operations in progress")
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(func, *args)
+        self.dang_cho += 1
+        # Giai phong khi thread xong (hoac bi huy truoc khi chay), khong phai
+        # khi nguoi goi bi huy trong luc bcrypt van dang chay
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._giai_phong))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def _giai_phong(self) -> None:
+        self.dang_cho -= 1
+
+
+hashing_executor = HashingExecutor(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
 
 def xac_thuc_mat_khau(plain_password: str, mat_khau_ma_hoa: str) -> bool:
     """
@@ -33,3 +99,38 @@ def ma_hoa_mat_khau(password: str) -> str:
         str: The hashed version of the password using bcrypt.
     """
     return pwd_context.hash(password)
+
+
+async def xac_thuc_mat_khau_async(plain_password: str, mat_khau_ma_hoa: str) -> bool:
+    """
+    xac_thuc_mat_khau on the hashing executor.
+
+    Raises:
+        HashingBusyError: If the hashing queue is full.
+    """
+    return await hashing_executor.run(xac_thuc_mat_khau, plain_password, mat_khau_ma_hoa)
+
+
+async def ma_hoa_mat_khau_async(password: str) -> str:
+    """
+    ma_hoa_mat_khau on the hashing executor.
+
+    Raises:
+        HashingBusyError: If the hashing queue is full.
+    """
+    return await hashing_executor.run(ma_hoa_mat_khau, password)
+
+
+def bam_ma_lam_moi(ma_lam_moi: str) -> bytes:
+    """
+    Digest a refresh token for storage and lookup.
+
+    Parameters:
+        ma_lam_moi (str): The refresh token.
+
+    Returns:
+        bytes: The 32-byte HMAC-SHA256 of the token under REFRESH_TOKEN_HASH_KEY.
+    """
+    return hmac.new(
+        settings.REFRESH_TOKEN_HASH_KEY.encode(), ma_lam_moi.encode(), hashlib.sha256
+    ).digest()
@@ -0,0 +1,64 @@
+"""
+This module contains text helpers shared by the search features.
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+
+_KHONG_PHAI_CHU = re.compile(r"[^0-9a-z]+")
+
+
+def bo_dau(text: Optional[str]) -> str:
+    """
+    Normalize Vietnamese text for accent-insensitive matching.
+
+    Removes diacritics (including đ -> d), lowercases and collapses whitespace,
+    so "Hà Nội Đêm" and "ha noi dem" compare equal.
+
+    Parameters:
+        text (Optional[str]): The text to normalize.
+
+    Returns:
+        str: The normalized text, empty for None.
+    """
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    return " ".join(text.lower().split())
+
+
+def tach_tu(text: Optional[str]) -> List[str]:
+    """
+    Split text into normalized search tokens (letters and digits only).
+
+    Parameters:
+        text (Optional[str]): The text to split.
+
+    Returns:
+        List[str]: The tokens.
+    """
+    return [tu for tu in _KHONG_PHAI_CHU.split(bo_dau(text)) if tu]
+
+
+def tao_tsquery(text: Optional[str], trong_so: str = "") -> Optional[str]:
+    """
+    Build a to_tsquery('simple', ...) string: every token must match, the last one
+    as a prefix so partially typed words match.
+
+    Parameters:
+        text (Optional[str]): The query text.
+        trong_so (str): tsvector weights the tokens must carry, e.g. "A"; empty for any.
+
+    Returns:
+        Optional[str]: The tsquery string, None when the text has no tokens.
+    """
+    tus = tach_tu(text)
+    if not tus:
+        return None
+    return " & ".join(
+        f"{tu}:{'*' if i == len(tus) - 1 else ''}{trong_so}" if trong_so or i == len(tus) - 1 else tu
+        for i, tu in enumerate(tus)
+    )